@@ -1,69 +1,92 @@
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager
-import os
-
-db = SQLAlchemy()
-login_manager = LoginManager()
-
-def create_app():
-    app = Flask(__name__)
-    
-    # Configuración
-    app.config['SECRET_KEY'] = 'tu_clave_secreta_aqui_cambiar_en_produccion'
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///qa_system.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    
-    # Inicializar extensiones
-    db.init_app(app)
-    login_manager.init_app(app)
-    login_manager.login_view = 'auth.login'
-    login_manager.login_message = 'Por favor inicia sesión para acceder a esta página.'
-    
-    # Registrar blueprints
-    from app.auth import auth_bp
-    from app.main import main_bp
-    from app.projects import projects_bp
-    from app.catalogs import catalogs_bp
-    
-    app.register_blueprint(auth_bp)
-    app.register_blueprint(main_bp)
-    app.register_blueprint(projects_bp)
-    app.register_blueprint(catalogs_bp)
-    
-    # Crear tablas y datos por defecto
-    with app.app_context():
-        db.create_all()
-        from app.models import User, Catalog
-        
-        # Crear usuario admin si no existe
-        if not User.query.filter_by(username='admin').first():
-            admin_user = User(
-                username='admin',
-                email='admin@qa.com',
-                role='Admin',
-                is_active=True
-            )
-            admin_user.set_password('admin123')
-            db.session.add(admin_user)
-            db.session.commit()
-            print("Usuario admin creado: admin / admin123")
-        
-        # Crear catálogos por defecto si no existen
-        default_priorities = ['Regulatorio', 'Crítico', 'Alta', 'Media', 'Baja']
-        default_statuses = ['Pendiente', 'En Progreso', 'En Revisión', 'Completado', 'Bloqueado']
-        
-        for priority in default_priorities:
-            if not Catalog.query.filter_by(name='priority', value=priority).first():
-                catalog_item = Catalog(name='priority', value=priority)
-                db.session.add(catalog_item)
-        
-        for status in default_statuses:
-            if not Catalog.query.filter_by(name='status', value=status).first():
-                catalog_item = Catalog(name='status', value=status)
-                db.session.add(catalog_item)
-        
-        db.session.commit()
-        print("Catálogos por defecto creados")
-    
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from flask_login import LoginManager
+import os
+
+db = SQLAlchemy()
+login_manager = LoginManager()
+
+def create_app(test_config=None, instance_path=None):
+    app = Flask(__name__, instance_path=instance_path, instance_relative_config=True)
+    
+    # Configuración: valores por defecto < instance/config.py < archivo en QA_SYSTEM_CONFIG
+    # < variables FLASK_* (p. ej. FLASK_DB_POOL_SIZE=20) < DATABASE_URL < test_config
+    app.config['SECRET_KEY'] = 'tu_clave_secreta_aqui_cambiar_en_produccion'
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///qa_system.db'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.from_pyfile('config.py', silent=True)
+    app.config.from_envvar('QA_SYSTEM_CONFIG', silent=True)
+    app.config.from_prefixed_env()
+    if os.environ.get('DATABASE_URL'):
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.environ['DATABASE_URL']
+    if test_config:
+        app.config.update(test_config)
+    
+    from app.database import normalize_database_url, engine_options, init_engine
+    app.config['SQLALCHEMY_DATABASE_URI'] = normalize_database_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    
+    # Inicializar extensiones
+    db.init_app(app)
+    init_engine(app, db)
+    login_manager.init_app(app)
+    login_manager.login_view = 'auth.login'
+    login_manager.login_message = 'Por favor inicia sesión para acceder a esta página.'
+    
+    from app.utils.cache import catalog_cache, user_cache
+    catalog_cache.init_app(app)
+    user_cache.init_app(app)
+    
+    from app.utils.http_cache import row_cache
+    row_cache.init_app(app)
+    
+    from app.audit import audit_log
+    audit_log.init_app(app)
+    
+    from app.stats import dashboard_stats
+    dashboard_stats.init_app(app)
+    
+    from app.archive import log_archiver
+    log_archiver.init_app(app)
+    
+    from app.history import project_snapshotter, as_of_cache
+    project_snapshotter.init_app(app)
+    as_of_cache.init_app(app)
+    
+    from app.storage import blob_store
+    blob_store.init_app(app)
+    
+    from app.passwords import password_hasher
+    password_hasher.init_app(app)
+    
+    from app.profiler import profiler
+    profiler.init_app(app, db)
+    
+    from app.metrics import metrics
+    metrics.init_app(app, db)
+    
+    from app.notifications import unread_counter
+    unread_counter.init_app(app)
+    
+    # Registrar blueprints
+    from app.auth import auth_bp
+    from app.main import main_bp
+    from app.projects import projects_bp
+    from app.catalogs import catalogs_bp
+    from app.notifications import notifications_bp
+    from app.api import api_bp
+    from app.metrics import metrics_bp
+    
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(main_bp)
+    app.register_blueprint(projects_bp)
+    app.register_blueprint(catalogs_bp)
+    app.register_blueprint(notifications_bp)
+    app.register_blueprint(api_bp)
+    app.register_blueprint(metrics_bp)
+    
+    from app.commands import register_commands
+    register_commands(app)
+    
+    # El esquema y los datos por defecto se crean con `flask init-db` (no al crear la app)
     return app
\ No newline at end of file
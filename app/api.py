@@ -0,0 +1,240 @@
+from datetime import timezone
+from flask import Blueprint, jsonify, request, current_app, url_for, Response
+from flask_login import current_user
+from sqlalchemy.orm import joinedload, selectinload
+from werkzeug.exceptions import HTTPException
+from app import db
+from app.models import Project, ProjectAnalyst
+from app.utils.http_cache import row_cache
+from app.queries import scoped_projects_query, scope_version, filter_projects, keyset_page, SORT_COLUMNS
+from app.search import search_projects
+from app.history import parse_as_of, projects_as_of, SNAPSHOT_FIELDS
+from app.projects import (can_view, can_view_project, parse_date, apply_progress_update, apply_project_edit,
+                          apply_progress_batch, project_etag,
+                          get_catalog_options)
+
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+@api_bp.before_request
+def require_login():
+    if not current_user.is_authenticated:
+        return jsonify({'error': 'Autenticación requerida.'}), 401
+
+@api_bp.errorhandler(HTTPException)
+def json_error(error):
+    return jsonify({'error': error.description}), error.code
+
+def error_response(message, status):
+    return jsonify({'error': message}), status
+
+def with_validators(response, project_id, updated_at):
+    response.set_etag(project_etag(project_id, updated_at))
+    if updated_at:
+        response.last_modified = updated_at.replace(tzinfo=timezone.utc)
+    return response
+
+def project_to_dict(project, summary=False):
+    data = {
+        'id': project.id,
+        'gsf_code': project.gsf_code,
+        'invgate_code': project.invgate_code,
+        'name': project.name,
+        'priority': project.priority,
+        'status': project.status,
+        'progress': project.progress,
+        'test_cases': project.test_cases,
+        'executed_cases': project.executed_cases,
+        'end_date': project.end_date.isoformat() if project.end_date else None,
+        'updated_at': project.updated_at.isoformat() if project.updated_at else None,
+        'created_by': {'id': project.creator.id, 'username': project.creator.username},
+        'analysts': [{'id': pa.analyst.id, 'username': pa.analyst.username} for pa in project.analysts],
+        'etag': project_etag(project.id, project.updated_at),
+        'url': url_for('api.get_project', project_id=project.id),
+    }
+    if not summary:
+        data.update({
+            'estimated_hours': project.estimated_hours,
+            'start_date': project.start_date.isoformat() if project.start_date else None,
+            'observation': project.observation,
+            'created_at': project.created_at.isoformat() if project.created_at else None,
+        })
+    return data
+
+def with_api_loading(query):
+    return query.options(
+        joinedload(Project.creator),
+        selectinload(Project.analysts).joinedload(ProjectAnalyst.analyst),
+    )
+
+def load_project(project_id, for_update=False):
+    """Proyecto con creador y analistas; 404 si no existe y 403 si no es visible"""
+    query = with_api_loading(Project.query).filter(Project.id == project_id)
+    if for_update:
+        query = query.with_for_update(of=Project)
+    project = query.first()
+    if project is None:
+        return None, error_response('Proyecto no encontrado.', 404)
+    if not can_view_project(project):
+        return None, error_response('No tienes permisos para ver este proyecto.', 403)
+    return project, None
+
+def precondition_failed(project):
+    """If-Match: la escritura solo procede si el cliente tiene la versión actual"""
+    if not request.if_match:
+        return None
+    etag = project_etag(project.id, project.updated_at)
+    if request.if_match.contains(etag):
+        return None
+    response = jsonify({'error': 'El proyecto fue modificado por otro usuario.',
+                        'project': project_to_dict(project)})
+    response.status_code = 412
+    return with_validators(response, project.id, project.updated_at)
+
+@api_bp.route('/projects')
+def list_projects():
+    """Proyectos visibles con los filtros del listado y paginación por cursor"""
+    sort = request.args.get('sort', 'updated_at')
+    if sort not in SORT_COLUMNS:
+        sort = 'updated_at'
+    direction = 'asc' if request.args.get('direction') == 'asc' else 'desc'
+    page_size = current_app.config.get('PROJECTS_PER_PAGE', 25)
+    limit = min(request.args.get('limit', page_size, type=int) or page_size, 200)
+
+    query = filter_projects(
+        with_api_loading(scoped_projects_query(current_user)),
+        status=request.args.get('status'),
+        priority=request.args.get('priority'),
+        analyst_id=request.args.get('analyst', type=int) if current_user.role != 'Analista' else None,
+        date_from=parse_date(request.args.get('date_from')),
+        date_to=parse_date(request.args.get('date_to')),
+    )
+    page = keyset_page(query, sort=sort, direction=direction, cursor=request.args.get('cursor'), per_page=limit)
+    response = jsonify({
+        'items': [project_to_dict(project, summary=True) for project in page.items],
+        'next_cursor': page.next_cursor,
+    })
+    # ETag del contenido: un sondeo sin cambios recibe 304 sin cuerpo
+    response.add_etag()
+    return response.make_conditional(request)
+
+@api_bp.route('/projects/search')
+def search():
+    """Proyectos visibles que coinciden con `q`, ordenados por relevancia"""
+    limit = min(request.args.get('limit', 50, type=int) or 50, 200)
+    projects = search_projects(current_user, request.args.get('q'), limit=limit,
+                               rank_limit=current_app.config.get('SEARCH_RANK_LIMIT', 2000))
+    return jsonify({'items': [project_to_dict(project, summary=True) for project in projects]})
+
+@api_bp.route('/projects/as-of')
+def list_projects_as_of():
+    """Estado de los proyectos visibles en la fecha `at` ('AAAA-MM-DD' o fecha y hora ISO, UTC)"""
+    at = parse_as_of(request.args.get('at'))
+    if at is None:
+        return error_response('El parámetro at debe tener formato AAAA-MM-DD o fecha y hora ISO.', 400)
+    limit = min(request.args.get('limit', 100, type=int) or 100, 1000)
+    offset = max(request.args.get('offset', 0, type=int) or 0, 0)
+    page = projects_as_of(scoped_projects_query(current_user), at, status=request.args.get('status'),
+                          priority=request.args.get('priority'), offset=offset, limit=limit,
+                          version=scope_version(current_user))
+    response = jsonify({
+        'at': page.at.isoformat(),
+        'total': page.total,
+        'summary': page.summary,
+        'items': [dict({field: getattr(project, field) for field in SNAPSHOT_FIELDS},
+                       id=project.id, gsf_code=project.gsf_code, invgate_code=project.invgate_code,
+                       url=url_for('api.get_project', project_id=project.id))
+                  for project in page.items],
+        'next_offset': page.next_offset,
+    })
+    response.add_etag()
+    return response.make_conditional(request)
+
+@api_bp.route('/projects/<int:project_id>')
+def get_project(project_id):
+    # Respuesta condicional sin cargar el proyecto completo
+    row = db.session.query(Project.updated_at, Project.created_by_id).filter(Project.id == project_id).first()
+    if row is None:
+        return error_response('Proyecto no encontrado.', 404)
+    if not can_view(project_id, row.created_by_id):
+        return error_response('No tienes permisos para ver este proyecto.', 403)
+    conditional = with_validators(Response(), project_id, row.updated_at).make_conditional(request)
+    if conditional.status_code == 304:
+        return conditional
+
+    project, error = load_project(project_id)
+    if error:
+        return error
+    return with_validators(jsonify(project_to_dict(project)), project.id, project.updated_at)
+
+@api_bp.route('/projects/progress', methods=['PATCH'])
+def update_projects_progress():
+    """Actualizar el avance de varios proyectos en una sola transacción.
+
+    Recibe {"updates": [{"id": ..., "progress": ..., "etag": ...}, ...]} y
+    responde con los proyectos modificados y los errores de cada fila.
+    """
+    payload = request.get_json(silent=True)
+    updates = payload.get('updates') if isinstance(payload, dict) else None
+    if not isinstance(updates, list) or not all(isinstance(values, dict) for values in updates):
+        return error_response('Se esperaba {"updates": [objetos]}.', 400)
+    max_updates = current_app.config.get('BATCH_UPDATE_LIMIT', 200)
+    if len(updates) > max_updates:
+        return error_response(f'Máximo {max_updates} proyectos por petición.', 413)
+    
+    updated, errors = apply_progress_batch(updates, current_user)
+    # Los ids antes del commit: después cada objeto expirado se recargaría por separado
+    updated_ids = [project.id for project in updated]
+    db.session.commit()
+    for project_id in updated_ids:
+        row_cache.invalidate(project_id)
+    projects = with_api_loading(Project.query).filter(Project.id.in_(updated_ids)).all()
+    return jsonify({
+        'updated': [project_to_dict(project, summary=True) for project in projects],
+        'errors': errors,
+    })
+
+def update_response(project, apply):
+    """Aplicar una modificación respetando If-Match y devolver la nueva representación"""
+    failed = precondition_failed(project)
+    if failed:
+        return failed
+    values = request.get_json(silent=True)
+    if not isinstance(values, dict):
+        return error_response('Se esperaba un objeto JSON.', 400)
+    try:
+        apply(project, values, current_user.id)
+    except ValueError as e:
+        db.session.rollback()
+        return error_response(str(e), 422)
+    db.session.commit()
+    row_cache.invalidate(project.id)
+    project, _ = load_project(project.id)
+    return with_validators(jsonify(project_to_dict(project)), project.id, project.updated_at)
+
+@api_bp.route('/projects/<int:project_id>', methods=['PATCH'])
+def update_project(project_id):
+    """Modificar los datos del proyecto (creador o admin); `analysts` reemplaza la lista completa"""
+    project, error = load_project(project_id, for_update=True)
+    if error:
+        return error
+    if project.created_by_id != current_user.id and current_user.role != 'Admin':
+        return error_response('No tienes permisos para editar este proyecto.', 403)
+    return update_response(project, apply_project_edit)
+
+@api_bp.route('/projects/<int:project_id>/progress', methods=['PATCH'])
+def update_project_progress(project_id):
+    """Actualizar avance, estado, casos y observación (analistas asignados, creador o admin)"""
+    project, error = load_project(project_id, for_update=True)
+    if error:
+        return error
+    return update_response(project, apply_progress_update)
+
+@api_bp.route('/catalogs')
+def list_catalogs():
+    """Valores válidos de prioridad y estado"""
+    response = jsonify({
+        'priority': get_catalog_options('priority'),
+        'status': get_catalog_options('status'),
+    })
+    response.add_etag()
+    return response.make_conditional(request)
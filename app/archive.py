@@ -0,0 +1,149 @@
+import json
+import zlib
+from collections import namedtuple
+from datetime import datetime, timedelta
+from itertools import groupby
+from sqlalchemy import delete, select, tuple_
+from app import db
+from app.models import Log, LogArchive, ProjectSnapshot, User
+from app.utils.jobs import PeriodicJob
+
+# Registro del historial, venga de la tabla log o del archivo
+HistoryEntry = namedtuple('HistoryEntry', 'id changed_at changed_field old_value new_value username archived')
+
+LOG_COLUMNS = (Log.id, Log.project_id, Log.user_id, Log.changed_field, Log.old_value, Log.new_value, Log.changed_at)
+
+def pack_entries(rows):
+    """Registros de un segmento como JSON comprimido"""
+    entries = [[row.id, row.changed_at.isoformat(), row.user_id, row.changed_field, row.old_value, row.new_value]
+               for row in rows]
+    return zlib.compress(json.dumps(entries, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+def unpack_entries(data):
+    """Registros de un segmento, del más antiguo al más reciente: (id, changed_at, user_id, campo, anterior, nuevo)"""
+    return [(log_id, datetime.fromisoformat(changed_at), user_id, field, old_value, new_value)
+            for log_id, changed_at, user_id, field, old_value, new_value in json.loads(zlib.decompress(data))]
+
+def _take_chunk(connection, before, after, chunk_size):
+    # Borrar y leer en la misma sentencia: dos procesos archivando a la vez no duplican registros
+    ids = select(Log.id).where(Log.changed_at < before)
+    if after:
+        ids = ids.where(tuple_(Log.project_id, Log.changed_at, Log.id) > after)
+    ids = ids.order_by(Log.project_id, Log.changed_at, Log.id).limit(chunk_size)
+    if connection.dialect.delete_returning:
+        rows = connection.execute(delete(Log).where(Log.id.in_(ids)).returning(*LOG_COLUMNS)).all()
+    else:
+        rows = connection.execute(select(*LOG_COLUMNS).where(Log.id.in_(ids))).all()
+        connection.execute(delete(Log).where(Log.id.in_([row.id for row in rows])))
+    return sorted(rows, key=lambda row: (row.project_id, row.changed_at, row.id))
+
+def _segments(rows, segment_size, archived_at):
+    for project_id, project_rows in groupby(rows, key=lambda row: row.project_id):
+        project_rows = list(project_rows)
+        for start in range(0, len(project_rows), segment_size):
+            segment = project_rows[start:start + segment_size]
+            yield {
+                'project_id': project_id,
+                'first_at': segment[0].changed_at,
+                'first_log_id': segment[0].id,
+                'last_at': segment[-1].changed_at,
+                'last_log_id': segment[-1].id,
+                'entry_count': len(segment),
+                'data': pack_entries(segment),
+                'archived_at': archived_at,
+            }
+
+def archive_logs(before, chunk_size=5000, segment_size=500):
+    """Mover a log_archive los registros anteriores a `before`.
+
+    Cada lote de `chunk_size` registros es una transacción corta, para no
+    retener el bloqueo de escritura. Devuelve (registros archivados,
+    segmentos creados).
+    """
+    moved = segments = 0
+    after = None
+    while True:
+        with db.engine.begin() as connection:
+            rows = _take_chunk(connection, before, after, chunk_size)
+            if not rows:
+                break
+            records = list(_segments(rows, segment_size, datetime.utcnow()))
+            connection.execute(LogArchive.__table__.insert(), records)
+        moved += len(rows)
+        segments += len(records)
+        after = (rows[-1].project_id, rows[-1].changed_at, rows[-1].id)
+    return moved, segments
+
+def archived_history(project_id, before=None, limit=50):
+    """Registros archivados del proyecto anteriores a `before` (changed_at, id), del más reciente al más antiguo"""
+    query = select(LogArchive.data).where(LogArchive.project_id == project_id)
+    if before:
+        before = tuple(before)
+        query = query.where(tuple_(LogArchive.first_at, LogArchive.first_log_id) < before)
+    query = query.order_by(LogArchive.last_at.desc(), LogArchive.last_log_id.desc())
+
+    entries = []
+    result = db.session.execute(query.execution_options(yield_per=8))
+    try:
+        for (data,) in result:
+            entries.extend(entry for entry in reversed(unpack_entries(data))
+                           if before is None or (entry[1], entry[0]) < before)
+            if len(entries) >= limit:
+                break
+    finally:
+        result.close()
+    entries = entries[:limit]
+
+    user_ids = {entry[2] for entry in entries}
+    usernames = dict(db.session.query(User.id, User.username).filter(User.id.in_(user_ids)).all()) if user_ids else {}
+    return [HistoryEntry(log_id, changed_at, field, old_value, new_value, usernames.get(user_id), True)
+            for log_id, changed_at, user_id, field, old_value, new_value in entries]
+
+def delete_project_history(project_id, chunk_size=5000):
+    """Borrar el historial de un proyecto en lotes.
+
+    Los lotes completos se confirman uno a uno para no bloquear a los demás
+    escritores; el último lote, los segmentos archivados y las fotos quedan
+    en la transacción actual, que se confirma junto con el borrado del proyecto.
+    Devuelve la cantidad de registros borrados.
+    """
+    deleted = 0
+    while True:
+        ids = select(Log.id).where(Log.project_id == project_id).limit(chunk_size)
+        count = db.session.execute(delete(Log).where(Log.id.in_(ids))).rowcount
+        deleted += count
+        if count < chunk_size:
+            break
+        db.session.commit()
+    db.session.execute(delete(LogArchive).where(LogArchive.project_id == project_id))
+    db.session.execute(delete(ProjectSnapshot).where(ProjectSnapshot.project_id == project_id))
+    return deleted
+
+class LogArchiver:
+    """Archivado periódico del historial más antiguo que LOG_RETENTION_DAYS"""
+    def __init__(self):
+        self.job = PeriodicJob('logs-archive', self._scheduled)
+        self.retention_days = 180
+        self.chunk_size = 5000
+        self.segment_size = 500
+
+    def init_app(self, app):
+        app.extensions['log_archiver'] = self
+        self.retention_days = app.config.get('LOG_RETENTION_DAYS', 180)
+        self.chunk_size = app.config.get('LOG_ARCHIVE_CHUNK_SIZE', 5000)
+        self.segment_size = app.config.get('LOG_ARCHIVE_SEGMENT_SIZE', 500)
+        self.job.init_app(app, app.config.get('LOG_ARCHIVE_INTERVAL', 0))
+
+    def cutoff(self, days=None):
+        return datetime.utcnow() - timedelta(days=self.retention_days if days is None else days)
+
+    def run(self, days=None):
+        """Archivar lo anterior a la retención; devuelve (registros, segmentos)"""
+        return archive_logs(self.cutoff(days), self.chunk_size, self.segment_size)
+
+    def _scheduled(self, app):
+        moved, segments = self.run()
+        if moved:
+            app.logger.info('Historial archivado: %s registros en %s segmentos', moved, segments)
+
+log_archiver = LogArchiver()
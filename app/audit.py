@@ -0,0 +1,195 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Log
+
+PENDING_KEY = 'audit_pending'
+COMMITTING_KEY = 'audit_committing'
+
+def record_change(project_id, user_id, field, old_value, new_value, session=None):
+    """Acumular un cambio de la petición actual; se escribe junto con el commit"""
+    session = session or db.session
+    session.info.setdefault(PENDING_KEY, []).append({
+        'project_id': project_id,
+        'user_id': user_id,
+        'changed_field': field,
+        'old_value': str(old_value) if old_value is not None else '',
+        'new_value': str(new_value) if new_value is not None else '',
+        'changed_at': datetime.utcnow(),
+    })
+
+def write_entries(connection, entries):
+    """Insertar los registros en una sola sentencia executemany"""
+    if entries:
+        connection.execute(Log.__table__.insert(), entries)
+
+class AuditBatcher:
+    """Escritor en segundo plano con cola acotada.
+
+    Si la cola se llena, quien registra espera. Los lotes que no se pueden
+    escribir se guardan en un archivo de respaldo que se vuelve a procesar
+    al iniciar el hilo. Solo se descartan (con una advertencia) los
+    registros de un proyecto o usuario que se eliminó antes de escribirlos.
+
+    El hilo se inicia con el primer registro de cada proceso: los workers
+    creados con fork (gunicorn --preload) no heredan los hilos del padre.
+    """
+    def __init__(self, app, max_queue=10000, batch_size=500, flush_interval=1.0):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.spool_path = os.path.join(app.instance_path, 'audit_spool.jsonl')
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        atexit.register(self.stop)
+
+    def put_many(self, entries):
+        self._ensure_thread()
+        for entry in entries:
+            self.queue.put(entry)
+
+    def _ensure_thread(self):
+        pid = os.getpid()
+        if self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != pid:
+                # La cola copiada del padre la sigue escribiendo su propio hilo
+                self.queue = queue.Queue(maxsize=self.queue.maxsize)
+                self._stopped = threading.Event()
+                self._pid = pid
+                self._thread = None
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='audit-batcher', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=30):
+        """Vaciar la cola y detener el hilo (se llama también al apagar el proceso)"""
+        if self._stopped.is_set() or self._pid != os.getpid():
+            return
+        self._stopped.set()
+        self._thread.join(timeout)
+
+    def _next_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.queue.get(timeout=max(remaining, 0.01)) if remaining > 0
+                             else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        with self.app.app_context():
+            self._replay_spool()
+            while not (self._stopped.is_set() and self.queue.empty()):
+                batch = self._next_batch()
+                if batch:
+                    self._write(batch)
+
+    def _write(self, batch, attempts=3):
+        for attempt in range(attempts):
+            try:
+                with db.engine.begin() as connection:
+                    write_entries(connection, batch)
+                return
+            except IntegrityError:
+                # Reintentarlo no sirve: se separan los registros que ya no tienen proyecto o usuario
+                self._write_each(batch)
+                return
+            except Exception:
+                current_app.logger.exception('Error escribiendo el log de auditoría (intento %s)', attempt + 1)
+                time.sleep(0.5 * (attempt + 1))
+        self._spill(batch)
+
+    def _write_each(self, batch):
+        failed = []
+        for entry in batch:
+            try:
+                with db.engine.begin() as connection:
+                    write_entries(connection, [entry])
+            except IntegrityError:
+                current_app.logger.warning('Registro de auditoría descartado (proyecto %s o usuario %s eliminado): %s',
+                                           entry['project_id'], entry['user_id'], entry['changed_field'])
+            except Exception:
+                current_app.logger.exception('Error escribiendo el log de auditoría')
+                failed.append(entry)
+        if failed:
+            self._spill(failed)
+
+    def _spill(self, batch):
+        with open(self.spool_path, 'a', encoding='utf-8') as f:
+            for entry in batch:
+                f.write(json.dumps(dict(entry, changed_at=entry['changed_at'].isoformat())) + '\n')
+
+    def _replay_spool(self):
+        if not os.path.exists(self.spool_path):
+            return
+        replay_path = self.spool_path + '.replay'
+        try:
+            os.replace(self.spool_path, replay_path)
+        except FileNotFoundError:
+            # Lo tomó otro worker
+            return
+        with open(replay_path, encoding='utf-8') as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        for entry in entries:
+            entry['changed_at'] = datetime.fromisoformat(entry['changed_at'])
+        for start in range(0, len(entries), self.batch_size):
+            self._write(entries[start:start + self.batch_size])
+        os.remove(replay_path)
+
+class AuditLog:
+    """Escritura del log de auditoría al hacer commit (síncrona o en segundo plano)"""
+    def __init__(self):
+        self.batcher = None
+
+    def init_app(self, app):
+        app.extensions['audit_log'] = self
+        if app.config.get('AUDIT_LOG_MODE', 'sync') == 'background':
+            self.batcher = AuditBatcher(
+                app,
+                max_queue=app.config.get('AUDIT_QUEUE_SIZE', 10000),
+                batch_size=app.config.get('AUDIT_BATCH_SIZE', 500),
+                flush_interval=app.config.get('AUDIT_FLUSH_INTERVAL', 1.0),
+            )
+
+    def before_commit(self, session):
+        entries = session.info.pop(PENDING_KEY, None)
+        if not entries:
+            return
+        if self.batcher:
+            # Se encolan solo si el commit termina bien
+            session.info[COMMITTING_KEY] = entries
+        else:
+            session.flush()
+            write_entries(session.connection(), entries)
+
+    def after_commit(self, session):
+        entries = session.info.pop(COMMITTING_KEY, None)
+        if entries and self.batcher:
+            self.batcher.put_many(entries)
+
+    def after_rollback(self, session):
+        session.info.pop(PENDING_KEY, None)
+        session.info.pop(COMMITTING_KEY, None)
+
+audit_log = AuditLog()
+
+event.listen(db.session, 'before_commit', audit_log.before_commit)
+event.listen(db.session, 'after_commit', audit_log.after_commit)
+event.listen(db.session, 'after_rollback', audit_log.after_rollback)
@@ -0,0 +1,117 @@
+import click
+from app import db
+
+def _echo_seed(admin_created, catalogs_created):
+    if admin_created:
+        click.echo('Usuario admin creado: admin / admin123')
+    click.echo(f'{catalogs_created} valor(es) de catálogo creado(s).')
+
+def register_commands(app):
+    """Registrar los comandos de mantenimiento en la CLI de Flask"""
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Crear o actualizar el esquema y cargar los datos por defecto."""
+        from app.seed import init_db
+        applied, (admin_created, catalogs_created) = init_db()
+        for version, description in applied:
+            click.echo(f'Migración {version} aplicada: {description}')
+        _echo_seed(admin_created, catalogs_created)
+
+    @app.cli.command('seed')
+    def seed_command():
+        """Cargar el usuario admin y los catálogos por defecto que falten."""
+        from app.seed import seed
+        _echo_seed(*seed())
+
+    @app.cli.command('db-upgrade')
+    def db_upgrade():
+        """Crear tablas y aplicar migraciones pendientes."""
+        from app.migrations import upgrade
+        applied = upgrade()
+        for version, description in applied:
+            click.echo(f'Migración {version} aplicada: {description}')
+        if not applied:
+            click.echo('La base de datos ya está actualizada.')
+
+    @app.cli.command('db-explain')
+    @click.option('--check', is_flag=True, help='Terminar con error si alguna consulta recorre una tabla completa.')
+    def db_explain(check):
+        """Mostrar el plan de ejecución de las consultas críticas."""
+        from app.migrations import explain_hot_queries
+        failures = 0
+        for name, lines, uses_index in explain_hot_queries():
+            click.echo(f'{"OK " if uses_index else "SCAN"} {name}')
+            for line in lines:
+                click.echo(f'      {line}')
+            failures += not uses_index
+        db.session.rollback()
+        if check and failures:
+            raise click.ClickException(f'{failures} consulta(s) sin índice.')
+
+    @app.cli.command('stats-reconcile')
+    def stats_reconcile():
+        """Recalcular los agregados de los dashboards y corregir desvíos."""
+        from app.stats import reconcile_stats
+        with db.engine.begin() as connection:
+            drift = reconcile_stats(connection)
+        click.echo(f'{len(drift)} contador(es) corregido(s).')
+        for key in sorted(drift):
+            click.echo(f'  {key}')
+
+    @app.cli.command('logs-archive')
+    @click.option('--days', type=int, default=None, help='Retención en días (por defecto LOG_RETENTION_DAYS).')
+    def logs_archive(days):
+        """Mover a log_archive el historial más antiguo que la retención."""
+        from app.archive import log_archiver
+        moved, segments = log_archiver.run(days)
+        click.echo(f'{moved} registro(s) archivado(s) en {segments} segmento(s).')
+
+    @app.cli.command('evidence-sweep')
+    def evidence_sweep():
+        """Eliminar los archivos de evidencia que ya no usa ninguna evidencia."""
+        from app.storage import blob_store
+        removed = blob_store.sweep()
+        click.echo(f'{removed} archivo(s) eliminado(s).')
+
+    @app.cli.command('projects-snapshot')
+    @click.option('--backfill', 'days', type=int, default=None,
+                  help='Reconstruir también fotos históricas cada N días antes de la primera.')
+    def projects_snapshot(days):
+        """Guardar una foto del estado de los proyectos modificados."""
+        from app.history import project_snapshotter
+        if days:
+            def report(at, saved):
+                click.echo(f'  {at:%Y-%m-%d}: {saved} foto(s)')
+            points, saved = project_snapshotter.backfill(days, report)
+            click.echo(f'{saved} foto(s) histórica(s) en {points} fecha(s).')
+        saved = project_snapshotter.run()
+        click.echo(f'{saved} foto(s) guardada(s).')
+
+    @app.cli.command('import-projects')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--user', 'username', required=True, help='Usuario (Supervisor o Admin) que figura como creador.')
+    @click.option('--batch-size', default=1000, show_default=True, help='Filas por transacción.')
+    def import_projects(path, username, batch_size):
+        """Importar proyectos desde un archivo CSV o XLSX."""
+        from app.models import User
+        from app.importer import ProjectImporter, ImportFormatError, iter_rows
+        user = User.query.filter_by(username=username).first()
+        if not user or user.role not in ('Admin', 'Supervisor'):
+            raise click.ClickException(f'El usuario {username} no existe o no es Supervisor/Admin.')
+
+        def report(row_number, message):
+            click.echo(f'Fila {row_number}: {message}', err=True)
+
+        # Sin límite en memoria: cada error se informa al momento
+        importer = ProjectImporter(user.id, batch_size=batch_size, error_limit=0, on_error=report)
+        try:
+            with open(path, 'rb') as f:
+                importer.run(iter_rows(f, path))
+        except ImportFormatError as e:
+            db.session.rollback()
+            raise click.ClickException(f'{e} ({importer.result.created} proyecto(s) ya importado(s))')
+        result = importer.result
+        click.echo(f'{result.created} proyecto(s) importado(s), {result.failed} fila(s) con errores.')
+        if result.failed:
+            raise SystemExit(1)
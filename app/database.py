@@ -0,0 +1,60 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+def normalize_database_url(url):
+    """Usar psycopg (v3) en las URL de PostgreSQL sin driver explícito.
+
+    Acepta también el esquema 'postgres://' que usan algunos proveedores.
+    SQLAlchemy 2.0 elige psycopg2 si la URL no nombra el driver.
+    """
+    for scheme in ('postgres://', 'postgresql://'):
+        if url and url.startswith(scheme):
+            return 'postgresql+psycopg://' + url[len(scheme):]
+    return url
+
+def engine_options(config):
+    """Opciones del engine según el motor configurado en SQLALCHEMY_DATABASE_URI.
+
+    Las opciones explícitas de SQLALCHEMY_ENGINE_OPTIONS tienen prioridad.
+    """
+    backend = make_url(config['SQLALCHEMY_DATABASE_URI']).get_backend_name()
+    options = {}
+    if backend == 'sqlite':
+        # Espera del lado de Python además del busy_timeout del PRAGMA
+        options['connect_args'] = {'timeout': config.get('SQLITE_BUSY_TIMEOUT', 5000) / 1000}
+    else:
+        options.update(
+            pool_size=config.get('DB_POOL_SIZE', 10),
+            max_overflow=config.get('DB_MAX_OVERFLOW', 20),
+            pool_timeout=config.get('DB_POOL_TIMEOUT', 30),
+            pool_recycle=config.get('DB_POOL_RECYCLE', 1800),
+            pool_pre_ping=config.get('DB_POOL_PRE_PING', True),
+        )
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return options
+
+def configure_sqlite(engine, config):
+    """Aplicar los PRAGMA de concurrencia en cada conexión nueva.
+
+    WAL permite leer mientras otro proceso escribe; busy_timeout hace que
+    un escritor espere el bloqueo en lugar de fallar con "database is locked".
+    """
+    journal_mode = config.get('SQLITE_JOURNAL_MODE', 'WAL')
+    synchronous = config.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    busy_timeout = int(config.get('SQLITE_BUSY_TIMEOUT', 5000))
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'PRAGMA busy_timeout = {busy_timeout}')
+        if journal_mode:
+            cursor.execute(f'PRAGMA journal_mode = {journal_mode}')
+        if synchronous:
+            cursor.execute(f'PRAGMA synchronous = {synchronous}')
+        cursor.close()
+
+def init_engine(app, db):
+    """Ajustes que dependen del engine ya creado (llamar después de db.init_app)"""
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            configure_sqlite(db.engine, app.config)
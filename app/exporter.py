@@ -0,0 +1,97 @@
+import csv
+import io
+import tempfile
+from datetime import timedelta
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+from app.models import Project, ProjectAnalyst, User, Log
+from app.queries import scoped_projects_query, filter_projects
+
+# Los encabezados coinciden con los que acepta la importación
+PROJECT_HEADERS = ['id', 'codigo_gsf', 'codigo_invgate', 'nombre', 'prioridad', 'estado',
+                   'horas_estimadas', 'fecha_inicio', 'fecha_fin', 'avance', 'casos_prueba',
+                   'casos_ejecutados', 'observacion', 'analistas', 'creador', 'creado', 'actualizado']
+LOG_HEADERS = ['fecha', 'proyecto_id', 'codigo_gsf', 'proyecto', 'usuario', 'campo',
+               'valor_anterior', 'valor_nuevo']
+
+# Límite de filas de una hoja de Excel (incluye el encabezado)
+XLSX_MAX_ROWS = 1048576
+
+def project_export_query(user, status=None, priority=None, analyst_id=None, date_from=None, date_to=None):
+    """Proyectos visibles para el usuario como filas planas (analistas agregados en SQL)"""
+    creator = aliased(User)
+    analysts = select(func.aggregate_strings(User.username, ', ')) \
+        .join(ProjectAnalyst, ProjectAnalyst.analyst_id == User.id) \
+        .where(ProjectAnalyst.project_id == Project.id) \
+        .scalar_subquery()
+    query = filter_projects(scoped_projects_query(user), status=status, priority=priority,
+                            analyst_id=analyst_id, date_from=date_from, date_to=date_to)
+    return query.outerjoin(creator, creator.id == Project.created_by_id).with_entities(
+        Project.id, Project.gsf_code, Project.invgate_code, Project.name, Project.priority,
+        Project.status, Project.estimated_hours, Project.start_date, Project.end_date,
+        Project.progress, Project.test_cases, Project.executed_cases, Project.observation,
+        analysts, creator.username, Project.created_at, Project.updated_at,
+    ).order_by(Project.id)
+
+def log_export_query(user, status=None, priority=None, analyst_id=None, date_from=None, date_to=None):
+    """Historial de los proyectos visibles; el rango de fechas filtra por fecha del cambio"""
+    query = filter_projects(scoped_projects_query(user), status=status, priority=priority, analyst_id=analyst_id)
+    query = query.join(Log, Log.project_id == Project.id).outerjoin(User, User.id == Log.user_id)
+    if date_from:
+        query = query.filter(Log.changed_at >= date_from)
+    if date_to:
+        query = query.filter(Log.changed_at < date_to + timedelta(days=1))
+    return query.with_entities(
+        Log.changed_at, Project.id, Project.gsf_code, Project.name, User.username,
+        Log.changed_field, Log.old_value, Log.new_value,
+    ).order_by(Log.project_id, Log.changed_at, Log.id)
+
+def stream_rows(query, batch_size=1000):
+    """Recorrer la consulta con un cursor del servidor, `batch_size` filas a la vez"""
+    return query.execution_options(stream_results=True).yield_per(batch_size)
+
+def _cell(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat(sep=' ', timespec='seconds') if hasattr(value, 'hour') else value.isoformat()
+    return value
+
+def iter_csv(headers, rows, rows_per_chunk=500):
+    """Generar el CSV por bloques de texto; nunca se arma el archivo completo"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM para que Excel reconozca UTF-8
+    buffer.write('\ufeff')
+    writer.writerow(headers)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([_cell(value) for value in row])
+        if count % rows_per_chunk == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def write_xlsx(headers, rows, title):
+    """Escribir un XLSX en modo write_only sobre un archivo temporal y devolverlo al inicio.
+
+    Las filas se vuelcan a disco a medida que llegan; si se supera el límite
+    de filas de Excel se continúa en una hoja nueva.
+    """
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = None
+    written = XLSX_MAX_ROWS
+    for row in rows:
+        if written >= XLSX_MAX_ROWS:
+            sheet = workbook.create_sheet(title if sheet is None else f'{title} {len(workbook.worksheets) + 1}')
+            sheet.append(headers)
+            written = 1
+        sheet.append(list(row))
+        written += 1
+    if sheet is None:
+        workbook.create_sheet(title).append(headers)
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
@@ -0,0 +1,286 @@
+import threading
+from collections import Counter, OrderedDict, namedtuple
+from datetime import date, datetime, time, timedelta, timezone
+from sqlalchemy import and_, func, insert, literal, or_, select, true, union_all
+from app import db
+from app.models import Project, ProjectSnapshot, Log, LogArchive
+from app.archive import unpack_entries
+from app.utils.jobs import PeriodicJob
+
+# Campos que guardan las fotos y que se reconstruyen desde el historial
+SNAPSHOT_FIELDS = ('name', 'priority', 'status', 'progress', 'test_cases', 'executed_cases')
+INT_FIELDS = ('progress', 'test_cases', 'executed_cases')
+
+ProjectAsOf = namedtuple('ProjectAsOf', ('id', 'gsf_code', 'invgate_code', 'created_by_id') + SNAPSHOT_FIELDS)
+AsOfPage = namedtuple('AsOfPage', 'at items total summary offset next_offset')
+
+def parse_as_of(value):
+    """Fecha de consulta: 'AAAA-MM-DD' es el final de ese día; también acepta fecha y hora ISO (UTC)"""
+    if not value:
+        return None
+    try:
+        if len(value) == 10:
+            return datetime.combine(date.fromisoformat(value), time.max)
+        at = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if at.tzinfo:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    return at
+
+def parse_value(field, value):
+    """Valor de un campo tal como lo guarda el historial ('' es None)"""
+    if value is None or value == '':
+        return None
+    if field in INT_FIELDS:
+        try:
+            return int(value)
+        except ValueError:
+            return None
+    return value
+
+def _changes(bounds):
+    """Cambios de los campos de las fotos dentro de la ventana (after, until] de cada proyecto.
+
+    `bounds` es una subconsulta con project_id, after y until (NULL: sin
+    límite). Incluye los registros archivados. Devuelve (project_id,
+    changed_at, id, campo, anterior, nuevo) del más antiguo al más reciente.
+    """
+    live = select(Log.project_id, Log.changed_at, Log.id, Log.changed_field, Log.old_value, Log.new_value) \
+        .join(bounds, Log.project_id == bounds.c.project_id) \
+        .where(Log.changed_field.in_(SNAPSHOT_FIELDS), Log.changed_at > bounds.c.after,
+               or_(bounds.c.until.is_(None), Log.changed_at <= bounds.c.until))
+    changes = [tuple(row) for row in db.session.execute(live)]
+
+    segments = select(LogArchive.project_id, LogArchive.data, bounds.c.after, bounds.c.until) \
+        .join(bounds, LogArchive.project_id == bounds.c.project_id) \
+        .where(LogArchive.last_at > bounds.c.after,
+               or_(bounds.c.until.is_(None), LogArchive.first_at <= bounds.c.until))
+    for project_id, data, after, until in db.session.execute(segments):
+        changes.extend((project_id, changed_at, log_id, field, old_value, new_value)
+                       for log_id, changed_at, _, field, old_value, new_value in unpack_entries(data)
+                       if field in SNAPSHOT_FIELDS and after < changed_at and (until is None or changed_at <= until))
+    changes.sort(key=lambda change: (change[1], change[2]))
+    return changes
+
+def states_as_of(scope, at):
+    """Estado de los proyectos de `scope` (consulta de Project) en la fecha `at`.
+
+    Cada proyecto parte de la foto más cercana y solo se aplican los cambios
+    entre la foto y `at`: hacia adelante desde la última foto anterior a
+    `at` o, si no la hay, hacia atrás desde la primera posterior (o desde el
+    estado actual). Devuelve {id: {campo: valor}} de los proyectos que ya
+    existían en `at`.
+    """
+    ids = scope.with_entities(Project.id.label('project_id')).order_by(None) \
+        .filter(Project.created_at <= at).cte('scope_ids')
+    fields = [getattr(ProjectSnapshot, field) for field in SNAPSHOT_FIELDS]
+    at_value = literal(at, db.DateTime)
+
+    # Hacia adelante: la última foto cuya ventana terminó antes de `at`
+    latest = select(ProjectSnapshot.project_id, func.max(ProjectSnapshot.window_end).label('window_end')) \
+        .where(ProjectSnapshot.project_id.in_(select(ids.c.project_id)), ProjectSnapshot.window_end <= at) \
+        .group_by(ProjectSnapshot.project_id).cte('latest')
+    forward = select(ProjectSnapshot.project_id, literal(True).label('forward'),
+                     ProjectSnapshot.window_start.label('after'), at_value.label('until'), *fields) \
+        .join(latest, and_(ProjectSnapshot.project_id == latest.c.project_id,
+                           ProjectSnapshot.window_end == latest.c.window_end))
+
+    # Hacia atrás: la primera foto cuya ventana empieza después de `at` o, si no hay, el proyecto actual
+    rest = select(ids.c.project_id).where(ids.c.project_id.not_in(select(latest.c.project_id)))
+    earliest = select(ProjectSnapshot.project_id, func.min(ProjectSnapshot.window_start).label('window_start')) \
+        .where(ProjectSnapshot.project_id.in_(rest), ProjectSnapshot.window_start >= at) \
+        .group_by(ProjectSnapshot.project_id).cte('earliest')
+    backward = select(ProjectSnapshot.project_id, literal(False).label('forward'),
+                      at_value.label('after'), ProjectSnapshot.window_end.label('until'), *fields) \
+        .join(earliest, and_(ProjectSnapshot.project_id == earliest.c.project_id,
+                             ProjectSnapshot.window_start == earliest.c.window_start))
+    current = select(Project.id, literal(False).label('forward'), at_value.label('after'),
+                     literal(None, db.DateTime).label('until'),
+                     *[getattr(Project, field) for field in SNAPSHOT_FIELDS]) \
+        .where(Project.id.in_(rest), Project.id.not_in(select(earliest.c.project_id)))
+    bounds = union_all(forward, backward, current).cte('bounds')
+
+    states, forward_ids = {}, set()
+    for row in db.session.execute(select(bounds)):
+        states[row.project_id] = {field: getattr(row, field) for field in SNAPSHOT_FIELDS}
+        if row.forward:
+            forward_ids.add(row.project_id)
+
+    # Hacia adelante vale el último valor nuevo; hacia atrás, el valor anterior del primer cambio
+    reverted = set()
+    for project_id, _, _, field, old_value, new_value in _changes(bounds):
+        if project_id in forward_ids:
+            states[project_id][field] = parse_value(field, new_value)
+        elif (project_id, field) not in reverted:
+            states[project_id][field] = parse_value(field, old_value)
+            reverted.add((project_id, field))
+    return states
+
+class AsOfStates:
+    """Estados reconstruidos de un alcance en una fecha, con los filtros ya calculados"""
+    def __init__(self, states):
+        self.states = {project_id: tuple(state[field] for field in SNAPSHOT_FIELDS)
+                       for project_id, state in states.items()}
+        self.summary = dict(Counter(state['status'] or '' for state in states.values()))
+        self._lock = threading.Lock()
+        self._matching = {}
+
+    def matching(self, status=None, priority=None):
+        """Ids que cumplen los filtros, en orden de creación (se calcula una vez por combinación)"""
+        key = (status or None, priority or None)
+        with self._lock:
+            ids = self._matching.get(key)
+        if ids is None:
+            status_at, priority_at = SNAPSHOT_FIELDS.index('status'), SNAPSHOT_FIELDS.index('priority')
+            ids = sorted(project_id for project_id, values in self.states.items()
+                         if (not status or values[status_at] == status)
+                         and (not priority or values[priority_at] == priority))
+            with self._lock:
+                self._matching[key] = ids
+        return ids
+
+class AsOfCache:
+    """Caché LRU en memoria de estados reconstruidos.
+
+    La clave incluye la versión de los datos del alcance (último updated_at
+    y cantidad de proyectos), así que una entrada desactualizada nunca se
+    vuelve a usar.
+    """
+    def __init__(self, max_size=4):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def init_app(self, app):
+        app.extensions['as_of_cache'] = self
+        self.max_size = app.config.get('AS_OF_CACHE_SIZE', 4)
+        self.clear()
+
+    def get_or_build(self, key, scope, at):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = AsOfStates(states_as_of(scope, at))
+        if self.max_size:
+            with self._lock:
+                self._entries[key] = entry
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+as_of_cache = AsOfCache()
+
+def projects_as_of(scope, at, status=None, priority=None, offset=0, limit=25, version=None):
+    """Página de proyectos de `scope` con su estado en `at`, en orden de creación.
+
+    Con `version` (identifica el alcance y sus datos) la reconstrucción se
+    guarda en la caché y las páginas siguientes solo leen los códigos de la
+    página. `summary` cuenta los proyectos por estado antes de aplicar los
+    filtros. Los códigos y el creador son los actuales.
+    """
+    if version is None:
+        entry = AsOfStates(states_as_of(scope, at))
+    else:
+        entry = as_of_cache.get_or_build((version, at), scope, at)
+    matching = entry.matching(status, priority)
+    page_ids = matching[offset:offset + limit]
+    current = {row.id: row for row in db.session.execute(
+        select(Project.id, Project.gsf_code, Project.invgate_code, Project.created_by_id)
+        .where(Project.id.in_(page_ids)))} if page_ids else {}
+    items = [ProjectAsOf(project_id, current[project_id].gsf_code, current[project_id].invgate_code,
+                         current[project_id].created_by_id, *entry.states[project_id])
+             for project_id in page_ids if project_id in current]
+    next_offset = offset + limit if offset + limit < len(matching) else None
+    return AsOfPage(at, items, len(matching), entry.summary, offset, next_offset)
+
+def take_snapshot(margin, chunk_size=5000):
+    """Guardar la foto de los proyectos modificados desde la foto anterior (de todos, la primera vez).
+
+    Cada lote de `chunk_size` proyectos se copia con INSERT ... SELECT en su
+    propia transacción. `margin` debe superar la duración de la transacción
+    más larga. Devuelve la cantidad de fotos guardadas.
+    """
+    with db.engine.connect() as connection:
+        last = connection.execute(select(func.max(ProjectSnapshot.taken_at))).scalar()
+    changed = Project.updated_at > last - margin if last else true()
+    columns = ['project_id', 'taken_at', 'window_start', 'window_end'] + list(SNAPSHOT_FIELDS)
+    saved, after = 0, 0
+    while True:
+        with db.engine.begin() as connection:
+            ids = connection.execute(select(Project.id).where(changed, Project.id > after)
+                                     .order_by(Project.id).limit(chunk_size)).scalars().all()
+            if not ids:
+                break
+            taken_at = datetime.utcnow()
+            rows = select(Project.id, literal(taken_at, db.DateTime), literal(taken_at - margin, db.DateTime),
+                          literal(taken_at + margin, db.DateTime), *[getattr(Project, field) for field in SNAPSHOT_FIELDS]) \
+                .where(changed, Project.id > after, Project.id <= ids[-1])
+            connection.execute(insert(ProjectSnapshot).from_select(columns, rows))
+        saved += len(ids)
+        after = ids[-1]
+    return saved
+
+def backfill_snapshots(step, chunk_size=5000, report=None):
+    """Fotos históricas cada `step`, desde el primer proyecto hasta la primera foto existente.
+
+    Cada fecha se reconstruye desde el historial y solo se guardan los
+    proyectos que cambiaron desde la fecha anterior. Devuelve (fechas, fotos).
+    """
+    first = db.session.query(func.min(ProjectSnapshot.window_start)).scalar()
+    at = db.session.query(func.min(Project.created_at)).scalar()
+    if first is None or at is None:
+        return 0, 0
+    previous = {}
+    points = saved = 0
+    while at < first:
+        rows = []
+        for project_id, state in states_as_of(Project.query, at).items():
+            if previous.get(project_id) != state:
+                rows.append(dict(state, project_id=project_id, taken_at=at, window_start=at, window_end=at))
+                previous[project_id] = state
+        for start in range(0, len(rows), chunk_size):
+            db.session.execute(insert(ProjectSnapshot), rows[start:start + chunk_size])
+        db.session.commit()
+        points += 1
+        saved += len(rows)
+        if report:
+            report(at, len(rows))
+        at += step
+    return points, saved
+
+class ProjectSnapshotter:
+    """Fotos periódicas del estado de los proyectos cada SNAPSHOT_INTERVAL segundos"""
+    def __init__(self):
+        self.job = PeriodicJob('projects-snapshot', self._scheduled)
+        self.margin = timedelta(seconds=300)
+        self.chunk_size = 5000
+
+    def init_app(self, app):
+        app.extensions['project_snapshotter'] = self
+        self.margin = timedelta(seconds=app.config.get('SNAPSHOT_MARGIN', 300))
+        self.chunk_size = app.config.get('SNAPSHOT_CHUNK_SIZE', 5000)
+        self.job.init_app(app, app.config.get('SNAPSHOT_INTERVAL', 0))
+
+    def run(self):
+        """Guardar una foto de los proyectos modificados; devuelve la cantidad de fotos"""
+        return take_snapshot(self.margin, self.chunk_size)
+
+    def backfill(self, days, report=None):
+        """Fotos históricas cada `days` días antes de la primera; devuelve (fechas, fotos)"""
+        if not db.session.query(ProjectSnapshot.id).first():
+            self.run()
+        return backfill_snapshots(timedelta(days=days), self.chunk_size, report)
+
+    def _scheduled(self, app):
+        saved = self.run()
+        if saved:
+            app.logger.info('Fotos de proyectos guardadas: %s', saved)
+
+project_snapshotter = ProjectSnapshotter()
@@ -0,0 +1,253 @@
+import csv
+import io
+import itertools
+import unicodedata
+from datetime import date, datetime
+from sqlalchemy import insert
+from app import db
+from app.models import Project, ProjectAnalyst, User
+from app.audit import record_change
+from app.notifications import notify_assigned
+from app.stats import apply_deltas, new_projects_deltas
+from app.utils.cache import catalog_cache
+
+# Encabezados aceptados (normalizados: minúsculas, sin tildes, espacios -> _)
+HEADER_ALIASES = {
+    'gsf_code': ('gsf_code', 'codigo_gsf', 'gsf'),
+    'invgate_code': ('invgate_code', 'codigo_invgate', 'invgate'),
+    'name': ('name', 'nombre', 'nombre_del_proyecto', 'proyecto'),
+    'priority': ('priority', 'prioridad', 'priorizacion'),
+    'status': ('status', 'estado'),
+    'estimated_hours': ('estimated_hours', 'horas_estimadas', 'horas'),
+    'start_date': ('start_date', 'fecha_inicio'),
+    'end_date': ('end_date', 'fecha_fin'),
+    'progress': ('progress', 'avance', '%_avance', 'porcentaje_avance'),
+    'test_cases': ('test_cases', 'casos_prueba', 'casos_de_prueba'),
+    'executed_cases': ('executed_cases', 'casos_ejecutados'),
+    'observation': ('observation', 'observacion'),
+    'analysts': ('analysts', 'analistas'),
+}
+
+class ImportFormatError(Exception):
+    """El archivo no se puede leer o le faltan columnas obligatorias"""
+
+class ImportResult:
+    """Resumen de una importación; guarda como máximo `error_limit` errores"""
+    def __init__(self, error_limit=1000):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self.error_limit = error_limit
+
+    def add_error(self, row_number, message):
+        self.failed += 1
+        if len(self.errors) < self.error_limit:
+            self.errors.append((row_number, message))
+
+    @property
+    def truncated(self):
+        return self.failed > len(self.errors)
+
+def _normalize(header):
+    text = unicodedata.normalize('NFKD', str(header or '')).encode('ascii', 'ignore').decode()
+    return '_'.join(text.strip().lower().split())
+
+def _map_headers(headers):
+    lookup = {alias: field for field, aliases in HEADER_ALIASES.items() for alias in aliases}
+    mapping = [lookup.get(_normalize(h)) for h in headers]
+    missing = {'gsf_code', 'invgate_code', 'name'} - set(mapping)
+    if missing:
+        raise ImportFormatError('Faltan columnas obligatorias: ' + ', '.join(sorted(missing)))
+    return mapping
+
+def _iter_csv(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    header_line = text.readline()
+    # Excel en español suele exportar con ';'
+    delimiter = ';' if header_line.count(';') > header_line.count(',') else ','
+    return csv.reader(itertools.chain([header_line], text), delimiter=delimiter)
+
+def _iter_xlsx(stream):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFormatError('Para importar archivos XLSX se requiere el paquete openpyxl.')
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except Exception:
+        raise ImportFormatError('No se pudo leer el archivo XLSX.')
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield row
+    finally:
+        workbook.close()
+
+def iter_rows(stream, filename):
+    """Leer el archivo fila a fila: genera (número_de_fila, dict) sin cargarlo completo"""
+    if filename.lower().endswith('.xlsx'):
+        reader = _iter_xlsx(stream)
+    elif filename.lower().endswith('.csv'):
+        reader = _iter_csv(stream)
+    else:
+        raise ImportFormatError('Formato no soportado; usa CSV o XLSX.')
+
+    try:
+        try:
+            headers = next(reader)
+        except StopIteration:
+            raise ImportFormatError('El archivo está vacío.')
+        mapping = _map_headers(headers)
+        for row_number, values in enumerate(reader, start=2):
+            if not any(v not in (None, '') for v in values):
+                continue
+            yield row_number, {field: value for field, value in zip(mapping, values) if field}
+    except UnicodeDecodeError:
+        raise ImportFormatError('El archivo CSV debe estar codificado en UTF-8.')
+    except csv.Error as e:
+        raise ImportFormatError(f'Error leyendo el CSV: {e}')
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+# Rango de las columnas INTEGER (32 bits en PostgreSQL)
+INT_MIN, INT_MAX = -2 ** 31, 2 ** 31 - 1
+
+def _int(value, field, default=None):
+    text = _text(value)
+    if not text:
+        return default
+    try:
+        number = int(float(text))
+    except (ValueError, OverflowError):
+        # OverflowError: 'inf' o '1e400'
+        raise ValueError(f'{field} debe ser un número')
+    if not INT_MIN <= number <= INT_MAX:
+        raise ValueError(f'{field} está fuera de rango')
+    return number
+
+def _date(value, field):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = _text(value)
+    if not text:
+        return None
+    for fmt in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f'{field} debe tener formato AAAA-MM-DD o DD/MM/AAAA')
+
+class ProjectImporter:
+    """Valida filas contra catálogos y analistas cargados una vez e inserta en bloques"""
+    def __init__(self, user_id, batch_size=1000, error_limit=1000, on_error=None):
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.on_error = on_error
+        self.result = ImportResult(error_limit)
+        self.priorities = set(catalog_cache.options('priority'))
+        self.statuses = set(catalog_cache.options('status'))
+        self.analysts = dict(db.session.query(User.username, User.id)
+                             .filter_by(role='Analista', is_active=True).all())
+
+    def _error(self, row_number, message):
+        self.result.add_error(row_number, message)
+        if self.on_error:
+            self.on_error(row_number, message)
+
+    def parse(self, data):
+        """Convertir una fila en (valores del proyecto, ids de analistas); ValueError si no es válida"""
+        errors = []
+        gsf_code, invgate_code, name = (_text(data.get(f)) for f in ('gsf_code', 'invgate_code', 'name'))
+        if not all([gsf_code, invgate_code, name]):
+            errors.append('Código GSF, Código Invgate y Nombre son obligatorios')
+        if len(gsf_code) > 50 or len(invgate_code) > 50 or len(name) > 200:
+            errors.append('Los códigos admiten 50 caracteres y el nombre 200')
+
+        priority = _text(data.get('priority')) or None
+        if priority and priority not in self.priorities:
+            errors.append(f'Prioridad no válida: {priority}')
+        status = _text(data.get('status')) or 'Pendiente'
+        if status not in self.statuses:
+            errors.append(f'Estado no válido: {status}')
+
+        values = {}
+        for field, label in (('estimated_hours', 'Horas estimadas'), ('progress', 'Avance'),
+                             ('test_cases', 'Casos de prueba'), ('executed_cases', 'Casos ejecutados')):
+            try:
+                values[field] = _int(data.get(field), label, None if field == 'estimated_hours' else 0)
+            except ValueError as e:
+                errors.append(str(e))
+        for field, label in (('start_date', 'Fecha inicio'), ('end_date', 'Fecha fin')):
+            try:
+                values[field] = _date(data.get(field), label)
+            except ValueError as e:
+                errors.append(str(e))
+
+        if not errors:
+            if not 0 <= values['progress'] <= 100:
+                errors.append('El avance debe estar entre 0 y 100')
+            if values['executed_cases'] > values['test_cases']:
+                errors.append('Los casos ejecutados no pueden ser mayores que los casos de prueba')
+
+        analyst_ids = []
+        for username in _text(data.get('analysts')).replace(';', ',').split(','):
+            username = username.strip()
+            if not username:
+                continue
+            if username not in self.analysts:
+                errors.append(f'Analista no encontrado o inactivo: {username}')
+            elif self.analysts[username] not in analyst_ids:
+                analyst_ids.append(self.analysts[username])
+
+        if errors:
+            raise ValueError('; '.join(errors))
+
+        now = datetime.utcnow()
+        values.update(gsf_code=gsf_code, invgate_code=invgate_code, name=name, priority=priority,
+                      status=status, observation=_text(data.get('observation')) or None,
+                      created_by_id=self.user_id, created_at=now, updated_at=now)
+        return values, analyst_ids
+
+    def _flush(self, batch):
+        """Insertar un bloque en su propia transacción"""
+        projects = [values for values, _ in batch]
+        ids = db.session.execute(
+            insert(Project).returning(Project.id, sort_by_parameter_order=True), projects
+        ).scalars().all()
+
+        assignments = []
+        for project_id, values, (_, analyst_ids) in zip(ids, projects, batch):
+            values['id'] = project_id
+            assignments += [{'project_id': project_id, 'analyst_id': a, 'assigned_at': values['created_at']}
+                            for a in analyst_ids]
+            record_change(project_id, self.user_id, 'PROYECTO CREADO', None, values['name'])
+            notify_assigned(project_id, analyst_ids, self.user_id)
+        if assignments:
+            db.session.execute(insert(ProjectAnalyst), assignments)
+
+        apply_deltas(db.session.connection(), new_projects_deltas(
+            projects, [(a['project_id'], a['analyst_id']) for a in assignments]))
+        db.session.commit()
+        self.result.created += len(batch)
+
+    def run(self, rows):
+        batch = []
+        for row_number, data in rows:
+            try:
+                batch.append(self.parse(data))
+            except ValueError as e:
+                self._error(row_number, str(e))
+                continue
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+        return self.result
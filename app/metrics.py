@@ -0,0 +1,511 @@
+import bisect
+import hmac
+try:
+    import fcntl
+except ImportError:     # Windows: un solo proceso, no hay archivos de otros que unir
+    fcntl = None
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from flask import Blueprint, Response, abort, current_app, g, request
+from sqlalchemy import event
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# Segundos; el último bucket (+Inf) se agrega al exponer
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Endpoints que no se miden: la propia exposición y las conexiones SSE (duran minutos)
+DEFAULT_EXCLUDED = ('metrics.exposition', 'static', 'notifications.notification_stream')
+
+# Contadores de los procesos terminados, unidos en un solo archivo
+AGGREGATE_FILE = 'counter_aggregate.db'
+
+_HEADER = struct.Struct('<I4x')     # bytes usados del archivo
+_LENGTH = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+_INITIAL_SIZE = 64 * 1024
+
+def _encode_key(key):
+    name, labels = key
+    return json.dumps([name, labels], separators=(',', ':')).encode('utf-8')
+
+def _decode_key(raw):
+    name, labels = json.loads(raw)
+    return name, tuple(tuple(pair) for pair in labels)
+
+def _read_entries(data, used):
+    # Entrada: largo de la clave (uint32), clave JSON, relleno hasta 8 bytes, valor (float64)
+    position = _HEADER.size
+    while position < used:
+        length = _LENGTH.unpack_from(data, position)[0]
+        key_end = position + _LENGTH.size + length
+        value_position = key_end + (-key_end % 8)
+        yield bytes(data[position + _LENGTH.size:key_end]), _VALUE.unpack_from(data, value_position)[0], value_position
+        position = value_position + _VALUE.size
+
+def _read_file(path):
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return []
+    if len(data) < _HEADER.size:
+        return []
+    used = min(_HEADER.unpack_from(data, 0)[0], len(data))
+    return [(_decode_key(raw), value) for raw, value, _ in _read_entries(data, used)]
+
+def _alive(pid):
+    if os.name == 'nt':
+        # En Windows os.kill terminaría el proceso; ahí se usa un solo proceso
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class _MemoryStore:
+    """Valores de este proceso, sin carpeta compartida"""
+    def __init__(self):
+        self._values = {}
+
+    def add(self, key, amount):
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, key, value):
+        self._values[key] = value
+
+    def items(self):
+        return list(self._values.items())
+
+    def close(self):
+        pass
+
+class _FileStore:
+    """Archivo de valores de un proceso mapeado en memoria.
+
+    Solo el proceso dueño escribe en él: cada valor se actualiza en su
+    lugar y las claves nuevas se agregan al final, actualizando el
+    encabezado después de escribir la entrada completa. /metrics lee los
+    archivos de todos los procesos sin bloquearlos.
+    """
+    def __init__(self, path, reset=False):
+        self.path = path
+        self._file = open(path, 'a+b')
+        if reset:
+            self._file.truncate(0)
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _INITIAL_SIZE:
+            self._file.truncate(_INITIAL_SIZE)
+            size = _INITIAL_SIZE
+        self._capacity = size
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._used = _HEADER.unpack_from(self._map, 0)[0] or _HEADER.size
+        self._offsets = {_decode_key(raw): offset for raw, _, offset in _read_entries(self._map, self._used)}
+
+    def _grow(self, needed):
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        self._map.close()
+        self._file.truncate(capacity)
+        self._map = mmap.mmap(self._file.fileno(), capacity)
+        self._capacity = capacity
+
+    def _append(self, key):
+        encoded = _encode_key(key)
+        start = self._used
+        key_end = start + _LENGTH.size + len(encoded)
+        value_position = key_end + (-key_end % 8)
+        end = value_position + _VALUE.size
+        if end > self._capacity:
+            self._grow(end)
+        _LENGTH.pack_into(self._map, start, len(encoded))
+        self._map[start + _LENGTH.size:key_end] = encoded
+        _VALUE.pack_into(self._map, value_position, 0.0)
+        self._used = end
+        _HEADER.pack_into(self._map, 0, end)
+        self._offsets[key] = value_position
+        return value_position
+
+    def add(self, key, amount):
+        offset = self._offsets.get(key) or self._append(key)
+        _VALUE.pack_into(self._map, offset, _VALUE.unpack_from(self._map, offset)[0] + amount)
+
+    def set(self, key, value):
+        offset = self._offsets.get(key) or self._append(key)
+        _VALUE.pack_into(self._map, offset, value)
+
+    def items(self):
+        return [(key, _VALUE.unpack_from(self._map, offset)[0]) for key, offset in self._offsets.items()]
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+class _Metric:
+    type = None
+    kind = 'counter'
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _labels(self, labels):
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        self.registry._add(self.kind, (self.name, self._labels(labels)), amount)
+
+class Gauge(_Metric):
+    """Valor por proceso; al exponer se suman los de los procesos vivos"""
+    type = 'gauge'
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        self.registry._add(self.kind, (self.name, self._labels(labels)), amount)
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        self.registry._set(self.kind, (self.name, self._labels(labels)), value)
+
+class Histogram(_Metric):
+    """Se guarda la cuenta de cada bucket por separado (una escritura por observación) y se acumula al exponer.
+
+    Sin `buckets` usa los del registro (METRICS_LATENCY_BUCKETS).
+    """
+    type = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=None):
+        super().__init__(registry, name, documentation, labelnames)
+        self._buckets = tuple(sorted(buckets)) if buckets else None
+
+    @property
+    def buckets(self):
+        return self._buckets or self.registry.buckets
+
+    def observe(self, value, **labels):
+        labels = self._labels(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        le = repr(float(self.buckets[index])) if index < len(self.buckets) else '+Inf'
+        self.registry._add_many(self.kind, [
+            ((self.name + '_bucket', labels + (('le', le),)), 1),
+            ((self.name + '_sum', labels), value),
+            ((self.name + '_count', labels), 1),
+        ])
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _sample(name, labels, value):
+    if labels:
+        name += '{' + ','.join(f'{key}="{_escape(label)}"' for key, label in labels) + '}'
+    return f'{name} {repr(float(value))}'
+
+class MetricsRegistry:
+    """Métricas en formato Prometheus, sumadas entre los procesos del servidor.
+
+    Con METRICS_SHARED (por defecto) cada proceso escribe sus valores en
+    archivos propios mapeados en memoria dentro de METRICS_DIR
+    (instance/metrics): no hay bloqueos entre procesos, solo uno corto
+    dentro del proceso. La exposición suma contadores e histogramas de
+    todos los archivos y los gauges de los procesos que siguen vivos. Cada
+    proceso abre sus archivos con la primera escritura y en ese momento une
+    los contadores de los procesos terminados en AGGREGATE_FILE. Sin
+    METRICS_SHARED los valores quedan en memoria del proceso.
+
+    Las métricas son globales del proceso: la carpeta y los buckets los
+    define la primera app con METRICS_ENABLED que llama a init_app.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = []
+        self._stores = {'counter': _MemoryStore(), 'gauge': _MemoryStore()}
+        self._pid = os.getpid()
+        self._configured = False
+        self.directory = None
+        self.buckets = DEFAULT_BUCKETS
+        self.enabled = True
+        self.excluded = set(DEFAULT_EXCLUDED)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=None):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def init_app(self, app, db):
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        app.extensions['metrics'] = self
+        if not self.enabled:
+            # Sin carpeta, archivos ni eventos
+            return
+        self.excluded = set(app.config.get('METRICS_EXCLUDED_ENDPOINTS', DEFAULT_EXCLUDED))
+        buckets = tuple(sorted(app.config.get('METRICS_LATENCY_BUCKETS', DEFAULT_BUCKETS)))
+        directory = None
+        if app.config.get('METRICS_SHARED', True):
+            directory = app.config.get('METRICS_DIR') or os.path.join(app.instance_path, 'metrics')
+        with self._lock:
+            configured, self._configured = self._configured, True
+            if not configured:
+                self.buckets = buckets
+                self.directory = directory
+                # Los archivos se abren con la primera escritura de cada proceso (ver _store)
+                self._pid = None
+        if configured and (directory, buckets) != (self.directory, self.buckets):
+            app.logger.warning('Las métricas ya se configuraron en este proceso; se mantienen %s', self.directory)
+        with app.app_context():
+            self._instrument_pool(db.engine)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+
+    def _open_stores(self):
+        for store in self._stores.values():
+            store.close()
+        self._pid = os.getpid()
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._clean_dead_processes()
+            self._stores = {
+                'counter': _FileStore(os.path.join(self.directory, f'counter_{self._pid}.db')),
+                # Un proceso nuevo con el mismo pid no hereda las conexiones del anterior
+                'gauge': _FileStore(os.path.join(self.directory, f'gauge_{self._pid}.db'), reset=True),
+            }
+        else:
+            self._stores = {'counter': _MemoryStore(), 'gauge': _MemoryStore()}
+
+    def _dead_files(self):
+        """(tipo, ruta) de los archivos de procesos que ya no existen"""
+        for filename in os.listdir(self.directory):
+            kind, _, pid = filename[:-len('.db')].partition('_')
+            if filename.endswith('.db') and pid.isdigit() and not _alive(int(pid)):
+                yield kind, os.path.join(self.directory, filename)
+
+    def _clean_dead_processes(self):
+        """Borrar los gauges de los procesos terminados y unir sus contadores en AGGREGATE_FILE.
+
+        Así la carpeta no crece con cada reinicio de los workers. Un lock de
+        archivo evita que dos procesos que inician a la vez sumen el mismo
+        archivo dos veces.
+        """
+        if fcntl is None:
+            return
+        with open(os.path.join(self.directory, 'merge.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            aggregate = None
+            try:
+                for kind, path in self._dead_files():
+                    if kind == 'counter':
+                        aggregate = aggregate or _FileStore(os.path.join(self.directory, AGGREGATE_FILE))
+                        for key, value in _read_file(path):
+                            aggregate.add(key, value)
+                        aggregate.flush()
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            finally:
+                if aggregate:
+                    aggregate.close()
+
+    def _store(self, kind):
+        # Cada proceso (también los workers creados con fork) abre sus archivos al escribir por primera vez
+        if self.directory and os.getpid() != self._pid:
+            self._open_stores()
+        return self._stores[kind]
+
+    def _add(self, kind, key, amount):
+        if self.enabled:
+            with self._lock:
+                self._store(kind).add(key, amount)
+
+    def _add_many(self, kind, items):
+        if self.enabled:
+            with self._lock:
+                store = self._store(kind)
+                for key, amount in items:
+                    store.add(key, amount)
+
+    def _set(self, kind, key, value):
+        if self.enabled:
+            with self._lock:
+                self._store(kind).set(key, value)
+
+    def collect(self):
+        """{'counter': {clave: valor}, 'gauge': {clave: valor}} de todos los procesos"""
+        totals = {'counter': {}, 'gauge': {}}
+        if not self.directory:
+            with self._lock:
+                for kind, store in self._stores.items():
+                    totals[kind].update(store.items())
+            return totals
+        try:
+            filenames = sorted(os.listdir(self.directory))
+        except FileNotFoundError:
+            # Ningún proceso escribió todavía
+            return totals
+        for filename in filenames:
+            kind, _, pid = filename[:-len('.db')].partition('_')
+            if not filename.endswith('.db') or kind not in totals or not (pid.isdigit() or filename == AGGREGATE_FILE):
+                continue
+            if kind == 'gauge' and not _alive(int(pid)):
+                continue
+            values = totals[kind]
+            for key, value in _read_file(os.path.join(self.directory, filename)):
+                values[key] = values.get(key, 0.0) + value
+        return totals
+
+    def exposition(self):
+        """Texto en el formato de exposición de Prometheus (0.0.4)"""
+        totals = self.collect()
+        by_name = {}
+        for values in totals.values():
+            for (name, labels), value in values.items():
+                by_name.setdefault(name, []).append((labels, value))
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            if isinstance(metric, Histogram):
+                lines.extend(self._histogram_lines(metric, by_name))
+            else:
+                for labels, value in sorted(by_name.get(metric.name, [])):
+                    lines.append(_sample(metric.name, labels, value))
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _histogram_lines(metric, by_name):
+        buckets = {}
+        for labels, value in by_name.get(metric.name + '_bucket', []):
+            le = dict(labels)['le']
+            series = tuple(pair for pair in labels if pair[0] != 'le')
+            counts_by_le = buckets.setdefault(series, {})
+            counts_by_le[le] = counts_by_le.get(le, 0.0) + value
+        sums = dict(by_name.get(metric.name + '_sum', []))
+        counts = dict(by_name.get(metric.name + '_count', []))
+        lines = []
+        for series in sorted(counts):
+            # Se exponen los buckets configurados; cuentas guardadas con otros límites caen en el siguiente
+            cumulative = 0.0
+            observed = sorted(((float(le), value) for le, value in buckets.get(series, {}).items()))
+            position = 0
+            for bound in metric.buckets:
+                while position < len(observed) and observed[position][0] <= bound:
+                    cumulative += observed[position][1]
+                    position += 1
+                lines.append(_sample(metric.name + '_bucket', series + (('le', repr(float(bound))),), cumulative))
+            lines.append(_sample(metric.name + '_bucket', series + (('le', '+Inf'),), counts[series]))
+            lines.append(_sample(metric.name + '_sum', series, sums.get(series, 0.0)))
+            lines.append(_sample(metric.name + '_count', series, counts[series]))
+        return lines
+
+    def _instrument_pool(self, engine):
+        pool = engine.pool
+
+        def on_connect(dbapi_connection, connection_record):
+            db_pool_connections.inc(state='open')
+            if hasattr(pool, 'size'):
+                db_pool_size.set(pool.size())
+
+        def on_close(dbapi_connection, connection_record):
+            db_pool_connections.dec(state='open')
+
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            db_pool_connections.inc(state='checked_out')
+            db_pool_checkouts.inc()
+
+        def on_checkin(dbapi_connection, connection_record):
+            db_pool_connections.dec(state='checked_out')
+
+        event.listen(engine, 'connect', on_connect)
+        event.listen(engine, 'close', on_close)
+        event.listen(engine, 'close_detached', lambda dbapi_connection: on_close(dbapi_connection, None))
+        event.listen(engine, 'checkout', on_checkout)
+        event.listen(engine, 'checkin', on_checkin)
+
+    def _endpoint(self):
+        # Las rutas inexistentes comparten una etiqueta para no crear series sin límite
+        return request.endpoint or '<unmatched>'
+
+    def _start(self):
+        g._metrics_start = time.perf_counter()
+
+    def _record(self, status):
+        start = g.pop('_metrics_start', None)
+        endpoint = self._endpoint()
+        if start is None or endpoint in self.excluded:
+            return
+        http_latency.observe(time.perf_counter() - start, endpoint=endpoint, method=request.method)
+        http_requests.inc(endpoint=endpoint, method=request.method, status=status)
+        if status >= 500:
+            http_errors.inc(endpoint=endpoint, kind='server')
+        elif status >= 400:
+            http_errors.inc(endpoint=endpoint, kind='client')
+
+    def _finish(self, response):
+        self._record(response.status_code)
+        return response
+
+    def _teardown(self, exc):
+        if exc is None:
+            return
+        if self._endpoint() not in self.excluded:
+            http_errors.inc(endpoint=self._endpoint(), kind='exception')
+        # Si la excepción se propagó sin pasar por after_request
+        if '_metrics_start' in g:
+            self._record(500)
+
+metrics = MetricsRegistry()
+
+http_requests = metrics.counter(
+    'qa_http_requests_total', 'Peticiones atendidas por endpoint, método y código de estado',
+    ('endpoint', 'method', 'status'))
+http_latency = metrics.histogram(
+    'qa_http_request_duration_seconds', 'Duración de las peticiones por endpoint', ('endpoint', 'method'))
+http_errors = metrics.counter(
+    'qa_http_request_errors_total', 'Respuestas 4xx (client), 5xx (server) y excepciones no controladas por endpoint',
+    ('endpoint', 'kind'))
+db_pool_connections = metrics.gauge(
+    'qa_db_pool_connections', 'Conexiones del pool abiertas y en uso (suma de los procesos vivos)', ('state',))
+db_pool_size = metrics.gauge('qa_db_pool_size', 'Tamaño configurado del pool (suma de los procesos vivos)')
+db_pool_checkouts = metrics.counter('qa_db_pool_checkouts_total', 'Conexiones tomadas del pool')
+login_attempts = metrics.counter('qa_login_attempts_total', 'Intentos de inicio de sesión por resultado', ('result',))
+cache_requests = metrics.counter(
+    'qa_cache_requests_total', 'Lecturas de las cachés en memoria por resultado (hit/miss)', ('cache', 'result'))
+
+@metrics_bp.route('/metrics')
+def exposition():
+    # Con METRICS_TOKEN se exige "Authorization: Bearer <token>". Sin él solo se responde en modo debug
+    # y desde la misma máquina: detrás de un proxy inverso todas las peticiones llegan desde 127.0.0.1.
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        expected = f'Bearer {token}'.encode('utf-8')
+        if not hmac.compare_digest(request.headers.get('Authorization', '').encode('utf-8'), expected):
+            abort(401)
+    elif not (current_app.debug or current_app.testing) or request.remote_addr not in ('127.0.0.1', '::1'):
+        abort(403)
+    return Response(metrics.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,129 @@
+from datetime import datetime
+from sqlalchemy import inspect, text
+from app import db
+
+# Registro de migraciones aplicadas
+schema_migration = db.Table(
+    'schema_migration',
+    db.Column('version', db.Integer, primary_key=True),
+    db.Column('description', db.String(200), nullable=False),
+    db.Column('applied_at', db.DateTime, default=datetime.utcnow),
+)
+
+MIGRATIONS = []
+
+def migration(version, description):
+    """Registrar una migración; se aplican en orden de versión y una sola vez"""
+    def decorator(f):
+        MIGRATIONS.append((version, description, f))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return f
+    return decorator
+
+def create_missing_indexes(connection):
+    """Crear los índices declarados en los modelos que aún no existen.
+
+    Se omiten los índices sobre columnas que una migración posterior todavía
+    debe agregar.
+    """
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        columns = {c['name'] for c in inspector.get_columns(table.name)}
+        for index in table.indexes:
+            if all(column.name in columns for column in index.columns):
+                index.create(connection, checkfirst=True)
+
+def add_column_if_missing(connection, table_name, column_name, ddl):
+    """ALTER TABLE ADD COLUMN solo si la columna no existe (create_all no altera tablas)"""
+    columns = {c['name'] for c in inspect(connection).get_columns(table_name)}
+    if column_name not in columns:
+        connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl}'))
+
+@migration(1, 'Índices para las consultas frecuentes')
+def _add_hot_path_indexes(connection):
+    create_missing_indexes(connection)
+
+@migration(2, 'Agregados de los dashboards')
+def _backfill_dashboard_stats(connection):
+    from app.stats import reconcile_stats
+    reconcile_stats(connection)
+
+@migration(3, 'Evidencias direccionadas por contenido')
+def _add_evidence_content_columns(connection):
+    add_column_if_missing(connection, 'evidence', 'content_hash', 'VARCHAR(64)')
+    add_column_if_missing(connection, 'evidence', 'content_type', 'VARCHAR(100)')
+    create_missing_indexes(connection)
+
+@migration(4, 'Índice de notificaciones sin leer')
+def _add_notification_index(connection):
+    create_missing_indexes(connection)
+
+@migration(5, 'Búsqueda de texto completo en proyectos')
+def _add_project_search_index(connection):
+    from app.search import create_search_index
+    create_search_index(connection)
+
+def pending_migrations(connection):
+    applied = {row[0] for row in connection.execute(db.select(schema_migration.c.version))}
+    return [m for m in MIGRATIONS if m[0] not in applied]
+
+def upgrade():
+    """Crear tablas nuevas y aplicar las migraciones pendientes; es idempotente"""
+    db.create_all()
+    with db.engine.connect() as connection:
+        pending = pending_migrations(connection)
+    applied = []
+    for version, description, apply in pending:
+        with db.engine.begin() as connection:
+            apply(connection)
+            connection.execute(schema_migration.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow()))
+        applied.append((version, description))
+    return applied
+
+def hot_queries():
+    """Consultas críticas (nombre, sentencia) para revisar su plan de ejecución"""
+    from app.models import Project, ProjectAnalyst, Log, LogArchive, ProjectSnapshot, Catalog, DashboardStatDelta
+    from app.queries import scoped_projects_query
+    from types import SimpleNamespace
+
+    analyst = SimpleNamespace(id=1, role='Analista')
+    supervisor = SimpleNamespace(id=1, role='Supervisor')
+    return [
+        ('Dashboard de analista', scoped_projects_query(analyst).statement),
+        ('Permiso de analista', ProjectAnalyst.query.filter_by(project_id=1, analyst_id=1).limit(1).statement),
+        ('Proyectos de supervisor', scoped_projects_query(supervisor)
+            .order_by(Project.updated_at.desc(), Project.id.desc()).statement),
+        ('Historial del proyecto', Log.query.filter_by(project_id=1)
+            .order_by(Log.changed_at.desc(), Log.id.desc()).statement),
+        ('Historial archivado', LogArchive.query.filter_by(project_id=1)
+            .order_by(LogArchive.last_at.desc(), LogArchive.last_log_id.desc()).statement),
+        ('Foto anterior a una fecha', ProjectSnapshot.query.filter(ProjectSnapshot.project_id == 1,
+            ProjectSnapshot.window_end <= datetime(2025, 1, 1)).order_by(ProjectSnapshot.window_end.desc()).limit(1).statement),
+        ('Catálogo activo', Catalog.query.filter_by(name='status', is_active=True).statement),
+        ('Estado en uso', Project.query.filter_by(status='Pendiente').limit(1).statement),
+        ('Prioridad en uso', Project.query.filter_by(priority='Alta').limit(1).statement),
+        ('Listado por fecha fin', Project.query.filter(Project.end_date.isnot(None))
+            .order_by(Project.end_date.asc(), Project.id.asc()).limit(26).statement),
+        ('Contador pendiente', DashboardStatDelta.query.filter_by(key='projects:total')
+            .with_entities(DashboardStatDelta.count).statement),
+    ]
+
+def explain_hot_queries():
+    """Plan de ejecución de cada consulta crítica: lista de (nombre, líneas, usa_indice)"""
+    connection = db.session.connection()
+    dialect = connection.dialect
+    results = []
+    for name, statement in hot_queries():
+        sql = str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+        if dialect.name == 'sqlite':
+            lines = [row[-1] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql)]
+            full_scan = any(line.startswith('SCAN') and 'INDEX' not in line for line in lines)
+        else:
+            lines = [row[0] for row in connection.exec_driver_sql('EXPLAIN ' + sql)]
+            full_scan = any('Seq Scan' in line for line in lines)
+        results.append((name, lines, not full_scan))
+    return results
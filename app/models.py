@@ -1,124 +1,248 @@
-from app import db, login_manager
-from flask_login import UserMixin
-from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
-
-class User(UserMixin, db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(64), unique=True, nullable=False)
-    email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(256), nullable=False)
-    role = db.Column(db.String(20), nullable=False)  # Admin, Supervisor, Analista
-    is_active = db.Column(db.Boolean, default=False)  # False=pending approval
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    # Relaciones
-    projects_created = db.relationship('Project', backref='creator', lazy=True, foreign_keys='Project.created_by_id')
-    projects_assigned = db.relationship('ProjectAnalyst', backref='analyst', lazy=True, foreign_keys='ProjectAnalyst.analyst_id')
-    
-    def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
-    
-    def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
-    
-    def __repr__(self):
-        return f'<User {self.username} - {self.role}>'
-
-class Project(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    gsf_code = db.Column(db.String(50), nullable=False)
-    invgate_code = db.Column(db.String(50), nullable=False)
-    name = db.Column(db.String(200), nullable=False)
-    priority = db.Column(db.String(20))  # Regulatorio, Crítico, Alta, Media, Baja
-    estimated_hours = db.Column(db.Integer)
-    start_date = db.Column(db.Date)
-    end_date = db.Column(db.Date)
-    status = db.Column(db.String(50))
-    progress = db.Column(db.Integer, default=0)  # 0-100
-    test_cases = db.Column(db.Integer, default=0)
-    executed_cases = db.Column(db.Integer, default=0)
-    observation = db.Column(db.Text)  # <- NUEVO CAMPO: Observación del analista
-    
-    # Claves foráneas
-    created_by_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    
-    # Tiempo
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
-    # Relaciones
-    analysts = db.relationship('ProjectAnalyst', backref='project', lazy=True, cascade='all, delete-orphan')
-    evidences = db.relationship('Evidence', backref='project', lazy=True, cascade='all, delete-orphan')
-    logs = db.relationship('Log', backref='project', lazy=True, cascade='all, delete-orphan')
-    
-    def __repr__(self):
-        return f'<Project {self.gsf_code} - {self.name}>'
-
-class ProjectAnalyst(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
-    analyst_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    assigned_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    def __repr__(self):
-        return f'<ProjectAnalyst project:{self.project_id} analyst:{self.analyst_id}>'
-
-class Evidence(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    filename = db.Column(db.String(255), nullable=False)
-    file_path = db.Column(db.String(500), nullable=False)
-    file_size = db.Column(db.Integer)  # Tamaño en bytes
-    uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    # Claves foráneas
-    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
-    uploaded_by_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    
-    # Relación
-    uploader = db.relationship('User', backref='evidences')
-    
-    def __repr__(self):
-        return f'<Evidence {self.filename}>'
-
-class Log(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    changed_field = db.Column(db.String(100), nullable=False)
-    old_value = db.Column(db.Text)
-    new_value = db.Column(db.Text)
-    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    # Relación
-    user = db.relationship('User', backref='logs')
-    
-    def __repr__(self):
-        return f'<Log {self.changed_field} by user:{self.user_id}>'
-
-class Notification(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    message = db.Column(db.Text, nullable=False)
-    is_read = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    # Relación
-    user = db.relationship('User', backref='notifications')
-    
-    def __repr__(self):
-        return f'<Notification for user:{self.user_id}>'
-
-class Catalog(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(50), nullable=False)  # 'priority', 'status'
-    value = db.Column(db.String(100), nullable=False)
-    is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    def __repr__(self):
-        return f'<Catalog {self.name}: {self.value}>'
-
-@login_manager.user_loader
-def load_user(id):
-    return User.query.get(int(id))
\ No newline at end of file
+from app import db, login_manager
+from flask_login import UserMixin
+from datetime import datetime
+from app.passwords import password_hasher
+
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(64), unique=True, nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    password_hash = db.Column(db.String(256), nullable=False)
+    role = db.Column(db.String(20), nullable=False)  # Admin, Supervisor, Analista
+    is_active = db.Column(db.Boolean, default=False)  # False=pending approval
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relaciones
+    projects_created = db.relationship('Project', backref='creator', lazy=True, foreign_keys='Project.created_by_id')
+    projects_assigned = db.relationship('ProjectAnalyst', backref='analyst', lazy=True, foreign_keys='ProjectAnalyst.analyst_id')
+    
+    def set_password(self, password):
+        self.password_hash = password_hasher.hash(password)
+    
+    def check_password(self, password):
+        return password_hasher.verify(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
+    
+    def __repr__(self):
+        return f'<User {self.username} - {self.role}>'
+
+class Project(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    gsf_code = db.Column(db.String(50), nullable=False)
+    invgate_code = db.Column(db.String(50), nullable=False)
+    name = db.Column(db.String(200), nullable=False)
+    priority = db.Column(db.String(20))  # Regulatorio, Crítico, Alta, Media, Baja
+    estimated_hours = db.Column(db.Integer)
+    start_date = db.Column(db.Date)
+    end_date = db.Column(db.Date)
+    status = db.Column(db.String(50))
+    progress = db.Column(db.Integer, default=0)  # 0-100
+    test_cases = db.Column(db.Integer, default=0)
+    executed_cases = db.Column(db.Integer, default=0)
+    observation = db.Column(db.Text)  # <- NUEVO CAMPO: Observación del analista
+    
+    # Claves foráneas
+    created_by_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    
+    # Tiempo
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relaciones
+    analysts = db.relationship('ProjectAnalyst', backref='project', lazy=True, cascade='all, delete-orphan')
+    evidences = db.relationship('Evidence', backref='project', lazy=True, cascade='all, delete-orphan')
+    logs = db.relationship('Log', backref='project', lazy=True, cascade='all, delete-orphan')
+    
+    # Índices para los filtros y ordenamientos frecuentes
+    __table_args__ = (
+        db.Index('ix_project_created_by_updated', 'created_by_id', 'updated_at', 'id'),
+        db.Index('ix_project_updated_at', 'updated_at', 'id'),
+        db.Index('ix_project_end_date', 'end_date', 'id'),
+        db.Index('ix_project_progress', 'progress', 'id'),
+        db.Index('ix_project_status', 'status'),
+        db.Index('ix_project_priority', 'priority'),
+    )
+    
+    def __repr__(self):
+        return f'<Project {self.gsf_code} - {self.name}>'
+
+class ProjectAnalyst(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    analyst_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    assigned_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_project_analyst_analyst', 'analyst_id', 'project_id'),
+        db.Index('ix_project_analyst_project', 'project_id', 'analyst_id'),
+    )
+    
+    def __repr__(self):
+        return f'<ProjectAnalyst project:{self.project_id} analyst:{self.analyst_id}>'
+
+class Evidence(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)
+    file_path = db.Column(db.String(500), nullable=False)
+    file_size = db.Column(db.Integer)  # Tamaño en bytes
+    content_hash = db.Column(db.String(64))  # SHA-256 del contenido (blob compartido)
+    content_type = db.Column(db.String(100))
+    uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Claves foráneas
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    uploaded_by_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    
+    # Relación
+    uploader = db.relationship('User', backref='evidences')
+    
+    __table_args__ = (
+        db.Index('ix_evidence_project', 'project_id', 'uploaded_at'),
+        db.Index('ix_evidence_content_hash', 'content_hash'),
+    )
+    
+    def __repr__(self):
+        return f'<Evidence {self.filename}>'
+
+class Log(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    changed_field = db.Column(db.String(100), nullable=False)
+    old_value = db.Column(db.Text)
+    new_value = db.Column(db.Text)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relación
+    user = db.relationship('User', backref='logs')
+    
+    __table_args__ = (
+        db.Index('ix_log_project_changed', 'project_id', 'changed_at', 'id'),
+    )
+    
+    def __repr__(self):
+        return f'<Log {self.changed_field} by user:{self.user_id}>'
+
+class LogArchive(db.Model):
+    """Segmento comprimido del historial de un proyecto (registros más antiguos que la retención)"""
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    # Posición (changed_at, id) del primer y último registro: la misma que usa el cursor del historial
+    first_at = db.Column(db.DateTime, nullable=False)
+    first_log_id = db.Column(db.Integer, nullable=False)
+    last_at = db.Column(db.DateTime, nullable=False)
+    last_log_id = db.Column(db.Integer, nullable=False)
+    entry_count = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)  # JSON comprimido con zlib
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_log_archive_project_last', 'project_id', 'last_at', 'last_log_id'),
+    )
+    
+    def __repr__(self):
+        return f'<LogArchive project:{self.project_id} ({self.entry_count})>'
+
+class ProjectSnapshot(db.Model):
+    """Foto del estado de un proyecto, punto de partida para reconstruirlo a una fecha"""
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    taken_at = db.Column(db.DateTime, nullable=False)
+    # Los cambios registrados entre window_start y window_end pueden estar o no en la foto
+    window_start = db.Column(db.DateTime, nullable=False)
+    window_end = db.Column(db.DateTime, nullable=False)
+    name = db.Column(db.String(200))
+    priority = db.Column(db.String(20))
+    status = db.Column(db.String(50))
+    progress = db.Column(db.Integer)
+    test_cases = db.Column(db.Integer)
+    executed_cases = db.Column(db.Integer)
+    
+    __table_args__ = (
+        db.Index('ix_project_snapshot_project_end', 'project_id', 'window_end'),
+        db.Index('ix_project_snapshot_project_start', 'project_id', 'window_start'),
+        db.Index('ix_project_snapshot_taken', 'taken_at'),
+    )
+    
+    def __repr__(self):
+        return f'<ProjectSnapshot project:{self.project_id} {self.taken_at}>'
+
+class Notification(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    is_read = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relación
+    user = db.relationship('User', backref='notifications')
+    
+    __table_args__ = (
+        db.Index('ix_notification_user_read', 'user_id', 'is_read', 'created_at'),
+    )
+    
+    def __repr__(self):
+        return f'<Notification for user:{self.user_id}>'
+
+class Catalog(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False)  # 'priority', 'status'
+    value = db.Column(db.String(100), nullable=False)
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_catalog_name_active', 'name', 'is_active'),
+    )
+    
+    def __repr__(self):
+        return f'<Catalog {self.name}: {self.value}>'
+
+class DashboardStat(db.Model):
+    """Contadores agregados para los dashboards (se mantienen con eventos de SQLAlchemy)"""
+    key = db.Column(db.String(120), primary_key=True)  # p. ej. 'analyst:7:completed'
+    count = db.Column(db.Integer, nullable=False, default=0)
+    progress_sum = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<DashboardStat {self.key}: {self.count}>'
+
+class DashboardStatDelta(db.Model):
+    """Cambio de un contador pendiente de sumar a DashboardStat.
+
+    Las escrituras solo insertan filas aquí, así no esperan el bloqueo de
+    las claves que comparten todos (p. ej. 'projects:total').
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(120), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    progress_sum = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.Index('ix_dashboard_stat_delta_key', 'key'),
+    )
+    
+    def __repr__(self):
+        return f'<DashboardStatDelta {self.key}: {self.count:+d}>'
+
+class CachedUser(UserMixin):
+    """Identidad del usuario en sesión (sin conexión a la base de datos)"""
+    def __init__(self, id, username, role, active):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.active = active
+    
+    @property
+    def is_active(self):
+        return bool(self.active)
+    
+    def __repr__(self):
+        return f'<CachedUser {self.username} - {self.role}>'
+
+@login_manager.user_loader
+def load_user(id):
+    from app.utils.cache import user_cache
+    return user_cache.get(int(id))
\ No newline at end of file
@@ -0,0 +1,231 @@
+import os
+import threading
+import time
+from datetime import datetime
+from flask import Blueprint, render_template, redirect, url_for, request, jsonify, current_app, Response, \
+    stream_with_context, abort
+from flask_login import login_required, current_user
+from sqlalchemy import event, func, select, union
+from app import db
+from app.models import Notification, Project, ProjectAnalyst
+from app.utils.cache import VersionSignal
+
+notifications_bp = Blueprint('notifications', __name__)
+
+PENDING_KEY = 'notifications_pending'
+NOTIFIED_KEY = 'notifications_notified'
+
+# Cambios que se avisan al creador y a los analistas del proyecto
+NOTIFIED_FIELDS = {'progress': 'avance', 'status': 'estado'}
+
+def notify_assigned(project_id, analyst_ids, actor_id, session=None):
+    """Avisar a los analistas recién asignados; se escribe junto con el commit"""
+    if analyst_ids:
+        session = session or db.session
+        session.info.setdefault(PENDING_KEY, []).append(('assigned', project_id, actor_id, set(analyst_ids)))
+
+def notify_changes(project_id, actor_id, changes, session=None):
+    """Avisar cambios de avance o estado ({campo: (anterior, nuevo)}) al equipo del proyecto"""
+    changes = {field: values for field, values in changes.items() if field in NOTIFIED_FIELDS}
+    if changes:
+        session = session or db.session
+        session.info.setdefault(PENDING_KEY, []).append(('changed', project_id, actor_id, changes))
+
+def _format_value(field, value):
+    if field == 'progress':
+        return f'{value or 0}%'
+    return value or '—'
+
+def _change_message(changes):
+    return '; '.join(f'{NOTIFIED_FIELDS[field]} {_format_value(field, old)} → {_format_value(field, new)}'
+                     for field, (old, new) in changes.items())
+
+def build_notifications(connection, pending):
+    """Filas de notificación para los avisos acumulados.
+
+    Los destinatarios de los cambios (creador y analistas asignados) y los
+    datos de cada proyecto salen de una sola consulta para todos los
+    proyectos involucrados.
+    """
+    project_ids = {project_id for _, project_id, _, _ in pending}
+    changed_ids = {project_id for kind, project_id, _, _ in pending if kind == 'changed'}
+    members = union(
+        select(Project.id.label('project_id'), Project.created_by_id.label('user_id'))
+        .where(Project.id.in_(project_ids)),
+        select(ProjectAnalyst.project_id, ProjectAnalyst.analyst_id)
+        .where(ProjectAnalyst.project_id.in_(changed_ids)),
+    ).subquery()
+    labels, team = {}, {}
+    for project_id, user_id, gsf_code, name in connection.execute(
+            select(members.c.project_id, members.c.user_id, Project.gsf_code, Project.name)
+            .join(Project, Project.id == members.c.project_id)):
+        labels[project_id] = f'{gsf_code} · {name}'
+        team.setdefault(project_id, set()).add(user_id)
+
+    # Un aviso por proyecto y destinatario aunque haya varios cambios en el commit
+    assigned, changed = {}, {}
+    for kind, project_id, actor_id, payload in pending:
+        if kind == 'assigned':
+            assigned.setdefault(project_id, (actor_id, set()))[1].update(payload)
+        else:
+            fields = changed.setdefault(project_id, (actor_id, {}))[1]
+            for field, (old, new) in payload.items():
+                fields[field] = (fields[field][0] if field in fields else old, new)
+
+    now = datetime.utcnow()
+    rows = []
+    for project_id, (actor_id, analyst_ids) in assigned.items():
+        if project_id in labels:
+            rows += [{'user_id': user_id, 'message': f'Te asignaron al proyecto {labels[project_id]}.',
+                      'is_read': False, 'created_at': now} for user_id in analyst_ids - {actor_id}]
+    for project_id, (actor_id, fields) in changed.items():
+        fields = {field: values for field, values in fields.items() if values[0] != values[1]}
+        if project_id in labels and fields:
+            message = f'{labels[project_id]}: {_change_message(fields)}.'
+            rows += [{'user_id': user_id, 'message': message, 'is_read': False, 'created_at': now}
+                     for user_id in team[project_id] - {actor_id}]
+    return rows
+
+class UnreadCounter:
+    """Cantidad de notificaciones sin leer por usuario, en memoria.
+
+    Cada usuario tiene su propio archivo de versión en instance/notifications;
+    la cantidad se vuelve a contar solo cuando ese archivo cambia, así el
+    badge del menú y el stream no consultan la base de datos sin novedades.
+    """
+    def __init__(self):
+        self.directory = None
+        self._lock = threading.Lock()
+        self._counts = {}   # id -> (versión, cantidad)
+
+    def init_app(self, app):
+        # La carpeta se crea con la primera invalidación (VersionSignal.bump)
+        self.directory = os.path.join(app.instance_path, 'notifications')
+        with self._lock:
+            self._counts.clear()
+        app.extensions['unread_counter'] = self
+
+    def signal(self, user_id):
+        signal = VersionSignal(f'{user_id}.version')
+        if self.directory:
+            signal.path = os.path.join(self.directory, signal.filename)
+        return signal
+
+    def get(self, user_id):
+        version = self.signal(user_id).current()
+        cached = self._counts.get(user_id)
+        if cached and cached[0] == version:
+            return cached[1]
+        # Conexión propia: el stream no debe retener la sesión de la petición
+        with db.engine.connect() as connection:
+            count = connection.execute(
+                select(func.count()).select_from(Notification)
+                .where(Notification.user_id == user_id, Notification.is_read.is_(False))
+            ).scalar()
+        with self._lock:
+            self._counts[user_id] = (version, count)
+        return count
+
+    def invalidate(self, user_ids):
+        """Avisar a todos los procesos; llamar después del commit"""
+        for user_id in user_ids:
+            with self._lock:
+                self._counts.pop(user_id, None)
+            self.signal(user_id).bump()
+
+unread_counter = UnreadCounter()
+
+class NotificationEngine:
+    """Escritura en bloque de las notificaciones acumuladas en la sesión"""
+    def before_commit(self, session):
+        pending = session.info.pop(PENDING_KEY, None)
+        if not pending:
+            return
+        session.flush()
+        connection = session.connection()
+        rows = build_notifications(connection, pending)
+        if rows:
+            connection.execute(Notification.__table__.insert(), rows)
+            session.info.setdefault(NOTIFIED_KEY, set()).update(row['user_id'] for row in rows)
+
+    def after_commit(self, session):
+        user_ids = session.info.pop(NOTIFIED_KEY, None)
+        if user_ids:
+            unread_counter.invalidate(user_ids)
+
+    def after_rollback(self, session):
+        session.info.pop(PENDING_KEY, None)
+        session.info.pop(NOTIFIED_KEY, None)
+
+notification_engine = NotificationEngine()
+
+event.listen(db.session, 'before_commit', notification_engine.before_commit)
+event.listen(db.session, 'after_commit', notification_engine.after_commit)
+event.listen(db.session, 'after_rollback', notification_engine.after_rollback)
+
+@notifications_bp.route('/notifications')
+@login_required
+def list_notifications():
+    limit = current_app.config.get('NOTIFICATIONS_PAGE_SIZE', 50)
+    notifications = Notification.query.filter_by(user_id=current_user.id) \
+        .order_by(Notification.created_at.desc(), Notification.id.desc()).limit(limit).all()
+    return render_template('notifications/list.html', notifications=notifications,
+                         unread=unread_counter.get(current_user.id))
+
+@notifications_bp.route('/notifications/read', methods=['POST'])
+@login_required
+def mark_read():
+    """Marcar como leídas todas las notificaciones (o solo `id`)"""
+    query = Notification.query.filter_by(user_id=current_user.id, is_read=False)
+    if request.form.get('id', type=int):
+        query = query.filter_by(id=request.form.get('id', type=int))
+    updated = query.update({'is_read': True}, synchronize_session=False)
+    db.session.commit()
+    if updated:
+        unread_counter.invalidate([current_user.id])
+    return redirect(url_for('notifications.list_notifications'))
+
+@notifications_bp.route('/notifications/unread-count')
+@login_required
+def unread_count():
+    return jsonify({'unread': unread_counter.get(current_user.id)})
+
+@notifications_bp.route('/notifications/stream')
+@login_required
+def notification_stream():
+    """Server-Sent Events con la cantidad sin leer; se envía solo cuando cambia.
+
+    Solo con NOTIFICATIONS_STREAM activado: cada conexión ocupa un worker
+    hasta NOTIFICATIONS_STREAM_TIMEOUT segundos, así que requiere workers
+    gevent o gthread. El navegador (EventSource) se reconecta solo.
+    """
+    if not current_app.config.get('NOTIFICATIONS_STREAM'):
+        abort(404)
+    user_id = current_user.id
+    interval = current_app.config.get('NOTIFICATIONS_POLL_INTERVAL', 2)
+    timeout = current_app.config.get('NOTIFICATIONS_STREAM_TIMEOUT', 60)
+    # No retener una conexión del pool mientras dura el stream
+    db.session.close()
+
+    def events():
+        signal = unread_counter.signal(user_id)
+        deadline = time.monotonic() + timeout
+        version = sent_at = None
+        yield f'retry: {int(interval * 1000)}\n\n'
+        while True:
+            now = time.monotonic()
+            current = signal.current()
+            if sent_at is None or current != version:
+                version, sent_at = current, now
+                yield f'event: unread\ndata: {unread_counter.get(user_id)}\n\n'
+            elif now - sent_at >= 15:
+                sent_at = now
+                yield ': ping\n\n'
+            if now >= deadline:
+                return
+            time.sleep(interval)
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,73 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Parámetros por defecto de Werkzeug 2.3 para cada método
+METHOD_DEFAULTS = {
+    'pbkdf2': ['sha256', '600000'],
+    'scrypt': ['32768', '8', '1'],
+}
+
+def normalize_method(method):
+    """Completar los parámetros omitidos tal como los escribe Werkzeug en el hash
+    ('pbkdf2' -> 'pbkdf2:sha256:600000')"""
+    name, *args = method.split(':')
+    defaults = METHOD_DEFAULTS.get(name)
+    if defaults is None:
+        return method
+    return ':'.join([name] + args + defaults[len(args):])
+
+class PasswordHasherBusy(Exception):
+    """Hay demasiadas verificaciones de contraseña en curso"""
+
+class PasswordHasher:
+    """Hash de contraseñas con método y costo configurables.
+
+    PASSWORD_HASH_METHOD acepta los métodos de Werkzeug, por ejemplo
+    'pbkdf2:sha256:600000' o 'scrypt:32768:8:1'. Con PASSWORD_HASH_WORKERS > 0
+    las verificaciones corren en un pool acotado (hashlib libera el GIL);
+    si hay más de PASSWORD_HASH_QUEUE pendientes se rechaza el intento en
+    lugar de bloquear todos los hilos de peticiones.
+    """
+    def __init__(self):
+        self.method = 'pbkdf2:sha256:600000'
+        self.salt_length = 16
+        self.wait_timeout = 5
+        self._normalized_method = normalize_method(self.method)
+        self._executor = None
+        self._slots = None
+
+    def init_app(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+        self.salt_length = app.config.get('PASSWORD_SALT_LENGTH', 16)
+        self.wait_timeout = app.config.get('PASSWORD_HASH_WAIT', 5)
+        self._normalized_method = normalize_method(self.method)
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = self._slots = None
+        workers = app.config.get('PASSWORD_HASH_WORKERS', 0)
+        if workers:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+            self._slots = threading.BoundedSemaphore(workers + app.config.get('PASSWORD_HASH_QUEUE', workers * 4))
+        app.extensions['password_hasher'] = self
+
+    def hash(self, password):
+        return generate_password_hash(password, method=self.method, salt_length=self.salt_length)
+
+    def verify(self, pwhash, password):
+        """Comparar contraseña y hash; PasswordHasherBusy si el pool está saturado"""
+        if not self._executor:
+            return check_password_hash(pwhash, password)
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise PasswordHasherBusy()
+        try:
+            return self._executor.submit(check_password_hash, pwhash, password).result()
+        finally:
+            self._slots.release()
+
+    def needs_rehash(self, pwhash):
+        """True si el hash se generó con otro método, costo o largo de sal"""
+        parts = pwhash.split('$')
+        return len(parts) != 3 or parts[0] != self._normalized_method or len(parts[1]) != self.salt_length
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,205 @@
+import heapq
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from flask import g, request, has_app_context, before_render_template, template_rendered
+from sqlalchemy import event
+
+logger = logging.getLogger('app.profiler')
+
+class QueryBudgetExceeded(Exception):
+    """Un endpoint ejecutó más consultas que las permitidas por QUERY_BUDGET(S)"""
+
+def _redact(value):
+    # Los hashes de contraseña no deben quedar en la página de métricas ni en los logs
+    if isinstance(value, str) and value.startswith(('pbkdf2:', 'scrypt:')):
+        return '<hash>'
+    return value
+
+def _format_params(parameters, max_length=200):
+    if isinstance(parameters, dict):
+        parameters = {key: _redact(value) for key, value in parameters.items()}
+    elif isinstance(parameters, (list, tuple)) and parameters and isinstance(parameters[0], (list, tuple, dict)):
+        return f'<{len(parameters)} filas>'
+    elif isinstance(parameters, (list, tuple)):
+        parameters = tuple(_redact(value) for value in parameters)
+    text = repr(parameters)
+    return text if len(text) <= max_length else text[:max_length] + '…'
+
+class EndpointStats:
+    """Acumulado de un endpoint en este proceso"""
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.max_repeated = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.over_budget = 0
+        self.slowest = []   # heap de (ms, sentencia, parámetros)
+
+    def as_dict(self):
+        requests = self.requests or 1
+        return {
+            'requests': self.requests,
+            'avg_queries': self.queries / requests,
+            'max_queries': self.max_queries,
+            'max_repeated': self.max_repeated,
+            'avg_db_ms': self.db_time / requests,
+            'avg_render_ms': self.render_time / requests,
+            'avg_ms': self.total_time / requests,
+            'max_ms': self.max_time,
+            'over_budget': self.over_budget,
+            'slowest': [{'ms': ms, 'statement': statement, 'params': params}
+                        for ms, statement, params in sorted(self.slowest, reverse=True)],
+        }
+
+class RequestProfiler:
+    """Cantidad y tiempo de consultas, tiempo de render y sentencias más lentas por endpoint.
+
+    Se engancha a los eventos de cursor de SQLAlchemy y a las señales de
+    Flask. Los datos son de este proceso y se ven en /admin/metrics. Con
+    PROFILER_LOG_REQUESTS cada petición se escribe como JSON en el logger
+    'app.profiler'; las lentas o que superan su presupuesto se registran
+    siempre. Con PROFILER_ENFORCE_BUDGET (activo en modo testing) superar
+    el presupuesto lanza QueryBudgetExceeded.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self.enabled = False
+
+    def init_app(self, app, db):
+        self.enabled = app.config.get('PROFILER_ENABLED', True)
+        self.top_statements = app.config.get('PROFILER_TOP_STATEMENTS', 5)
+        self.slow_request_ms = app.config.get('PROFILER_SLOW_REQUEST_MS', 500)
+        self.log_requests = app.config.get('PROFILER_LOG_REQUESTS', False)
+        self.default_budget = app.config.get('QUERY_BUDGET')
+        self.budgets = app.config.get('QUERY_BUDGETS', {})
+        self.enforce = app.config.get('PROFILER_ENFORCE_BUDGET', app.testing)
+        self.reset()
+        if self.log_requests:
+            logger.setLevel(logging.INFO)
+        app.extensions['profiler'] = self
+        if not self.enabled:
+            return
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(db.engine, 'after_cursor_execute', self._after_cursor_execute)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+
+    def snapshot(self):
+        """Estadísticas por endpoint, de la más costosa en base de datos a la menos"""
+        with self._lock:
+            stats = {endpoint: stats.as_dict() for endpoint, stats in self._endpoints.items()}
+        return sorted(stats.items(), key=lambda item: item[1]['avg_db_ms'] * item[1]['requests'], reverse=True)
+
+    def budget_for(self, endpoint):
+        return self.budgets.get(endpoint, self.default_budget)
+
+    @staticmethod
+    def _current():
+        # Solo las consultas de una petición (no las de hilos en segundo plano ni comandos)
+        return g.get('_profile') if has_app_context() else None
+
+    def _start(self):
+        g._profile = {'start': time.perf_counter(), 'queries': 0, 'db_time': 0.0, 'render_time': 0.0,
+                      'render_depth': 0, 'render_start': 0.0, 'statements': [], 'counts': Counter()}
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self._current() is not None:
+            context._profiler_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        profile = self._current()
+        start = getattr(context, '_profiler_start', None)
+        if profile is None or start is None:
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        profile['queries'] += 1
+        profile['db_time'] += elapsed
+        profile['counts'][statement] += 1
+        if len(profile['statements']) < self.top_statements:
+            heapq.heappush(profile['statements'], (elapsed, statement, _format_params(parameters)))
+        elif elapsed > profile['statements'][0][0]:
+            heapq.heapreplace(profile['statements'], (elapsed, statement, _format_params(parameters)))
+
+    def _before_render(self, sender, template, context, **extra):
+        profile = self._current()
+        if profile is not None:
+            # Las plantillas anidadas (p. ej. las filas del listado) se cuentan dentro de la externa
+            if profile['render_depth'] == 0:
+                profile['render_start'] = time.perf_counter()
+            profile['render_depth'] += 1
+
+    def _after_render(self, sender, template, context, **extra):
+        profile = self._current()
+        if profile is not None and profile['render_depth']:
+            profile['render_depth'] -= 1
+            if profile['render_depth'] == 0:
+                profile['render_time'] += (time.perf_counter() - profile['render_start']) * 1000
+
+    def _finish(self, response):
+        profile = g.pop('_profile', None)
+        if profile is None or request.endpoint is None:
+            return response
+        endpoint = request.endpoint
+        total = (time.perf_counter() - profile['start']) * 1000
+        repeated = max(profile['counts'].values(), default=0)
+        budget = self.budget_for(endpoint)
+        over_budget = budget is not None and profile['queries'] > budget
+        slowest = [(ms, ' '.join(statement.split()), params) for ms, statement, params in profile['statements']]
+
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, EndpointStats())
+            stats.requests += 1
+            stats.queries += profile['queries']
+            stats.max_queries = max(stats.max_queries, profile['queries'])
+            stats.max_repeated = max(stats.max_repeated, repeated)
+            stats.db_time += profile['db_time']
+            stats.render_time += profile['render_time']
+            stats.total_time += total
+            stats.max_time = max(stats.max_time, total)
+            stats.over_budget += over_budget
+            for entry in slowest:
+                if len(stats.slowest) < self.top_statements:
+                    heapq.heappush(stats.slowest, entry)
+                elif entry[0] > stats.slowest[0][0]:
+                    heapq.heapreplace(stats.slowest, entry)
+
+        if self.log_requests or over_budget or total >= self.slow_request_ms:
+            record = {
+                'endpoint': endpoint,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'ms': round(total, 2),
+                'queries': profile['queries'],
+                'db_ms': round(profile['db_time'], 2),
+                'render_ms': round(profile['render_time'], 2),
+                'max_repeated': repeated,
+                'budget': budget,
+            }
+            if over_budget or total >= self.slow_request_ms:
+                record['slowest'] = [{'ms': round(ms, 2), 'statement': statement[:500], 'params': params}
+                                     for ms, statement, params in sorted(slowest, reverse=True)]
+            level = logging.WARNING if over_budget or total >= self.slow_request_ms else logging.INFO
+            logger.log(level, json.dumps(record, ensure_ascii=False))
+
+        if over_budget and self.enforce:
+            raise QueryBudgetExceeded(
+                f'{endpoint} ejecutó {profile["queries"]} consultas (presupuesto: {budget})')
+        return response
+
+profiler = RequestProfiler()
@@ -1,297 +1,799 @@
-from flask import Blueprint, render_template, flash, redirect, url_for, request, jsonify
-from flask_login import login_required, current_user
-from app import db
-from app.models import Project, User, ProjectAnalyst, Log, Catalog  # <- Asegurar que ProjectAnalyst esté importado
-from app.utils.decorators import supervisor_required, admin_required
-from datetime import datetime
-
-projects_bp = Blueprint('projects', __name__)
-
-def get_catalog_options(catalog_name):
-    """Obtener opciones activas de un catálogo"""
-    return [c.value for c in Catalog.query.filter_by(name=catalog_name, is_active=True).all()]
-
-def log_project_change(project_id, user_id, field, old_value, new_value):
-    """Función auxiliar para registrar cambios en el log"""
-    log = Log(
-        project_id=project_id,
-        user_id=user_id,
-        changed_field=field,
-        old_value=str(old_value) if old_value is not None else '',
-        new_value=str(new_value) if new_value is not None else ''
-    )
-    db.session.add(log)
-
-@projects_bp.route('/projects')
-@login_required
-def projects_list():
-    if current_user.role == 'Admin':
-        projects = Project.query.all()
-    elif current_user.role == 'Supervisor':
-        projects = Project.query.filter_by(created_by_id=current_user.id).all()
-    else:  # Analista
-        # CORREGIDO: Obtener proyectos asignados al analista actual
-        projects = Project.query.join(ProjectAnalyst).filter(
-            ProjectAnalyst.analyst_id == current_user.id
-        ).all()
-    
-    return render_template('projects/list.html', projects=projects)
-
-@projects_bp.route('/projects/create', methods=['GET', 'POST'])
-@login_required
-@supervisor_required
-def create_project():
-    if request.method == 'POST':
-        # Validar campos obligatorios
-        gsf_code = request.form.get('gsf_code')
-        invgate_code = request.form.get('invgate_code')
-        name = request.form.get('name')
-        
-        if not all([gsf_code, invgate_code, name]):
-            flash('Los campos Código GSF, Código Invgate y Nombre son obligatorios.', 'danger')
-            return render_template('projects/create.html')
-        
-        # Validar que la priorización y estado sean válidos
-        priority = request.form.get('priority')
-        status = request.form.get('status', 'Pendiente')
-        
-        if priority and priority not in get_catalog_options('priority'):
-            flash('La priorización seleccionada no es válida.', 'danger')
-            return render_template('projects/create.html')
-        
-        if status not in get_catalog_options('status'):
-            flash('El estado seleccionado no es válido.', 'danger')
-            return render_template('projects/create.html')
-        
-        # Crear proyecto
-        project = Project(
-            gsf_code=gsf_code,
-            invgate_code=invgate_code,
-            name=name,
-            priority=priority,
-            estimated_hours=request.form.get('estimated_hours'),
-            start_date=datetime.strptime(request.form.get('start_date'), '%Y-%m-%d').date() if request.form.get('start_date') else None,
-            end_date=datetime.strptime(request.form.get('end_date'), '%Y-%m-%d').date() if request.form.get('end_date') else None,
-            status=status,
-            progress=request.form.get('progress', 0),
-            test_cases=request.form.get('test_cases', 0),
-            executed_cases=request.form.get('executed_cases', 0),
-            created_by_id=current_user.id
-        )
-        
-        db.session.add(project)
-        db.session.flush()  # Para obtener el ID del proyecto
-        
-        # Asignar analistas
-        analyst_ids = request.form.getlist('analysts')
-        for analyst_id in analyst_ids:
-            project_analyst = ProjectAnalyst(
-                project_id=project.id,
-                analyst_id=analyst_id
-            )
-            db.session.add(project_analyst)
-        
-        db.session.commit()
-        
-        # Log de creación
-        log_project_change(project.id, current_user.id, 'PROYECTO CREADO', None, project.name)
-        
-        flash(f'Proyecto "{name}" creado exitosamente.', 'success')
-        return redirect(url_for('projects.projects_list'))
-    
-    # Obtener datos para el formulario
-    analysts = User.query.filter_by(role='Analista', is_active=True).all()
-    priorities = get_catalog_options('priority')
-    statuses = get_catalog_options('status')
-    return render_template('projects/create.html', analysts=analysts, priorities=priorities, statuses=statuses)
-
-@projects_bp.route('/projects/<int:project_id>')
-@login_required
-def project_detail(project_id):
-    project = Project.query.get_or_404(project_id)
-    
-    # Verificar permisos
-    if current_user.role == 'Analista':
-        assigned = ProjectAnalyst.query.filter_by(project_id=project_id, analyst_id=current_user.id).first()
-        if not assigned:
-            flash('No tienes permisos para ver este proyecto.', 'danger')
-            return redirect(url_for('projects.projects_list'))
-    
-    elif current_user.role == 'Supervisor':
-        if project.created_by_id != current_user.id:
-            flash('No tienes permisos para ver este proyecto.', 'danger')
-            return redirect(url_for('projects.projects_list'))
-    
-    logs = Log.query.filter_by(project_id=project_id).order_by(Log.changed_at.desc()).all()
-    return render_template('projects/detail.html', project=project, logs=logs)
-
-@projects_bp.route('/projects/<int:project_id>/edit', methods=['GET', 'POST'])
-@login_required
-@supervisor_required
-def edit_project(project_id):
-    project = Project.query.get_or_404(project_id)
-    
-    # Verificar que el supervisor es el creador
-    if project.created_by_id != current_user.id and current_user.role != 'Admin':
-        flash('No tienes permisos para editar este proyecto.', 'danger')
-        return redirect(url_for('projects.projects_list'))
-    
-    if request.method == 'POST':
-        # Guardar valores antiguos para el log
-        old_values = {
-            'name': project.name,
-            'priority': project.priority,
-            'status': project.status,
-            'progress': project.progress
-        }
-        
-        # Validar catálogos
-        priority = request.form.get('priority')
-        status = request.form.get('status')
-        
-        if priority and priority not in get_catalog_options('priority'):
-            flash('La priorización seleccionada no es válida.', 'danger')
-            return redirect(url_for('projects.edit_project', project_id=project_id))
-        
-        if status not in get_catalog_options('status'):
-            flash('El estado seleccionado no es válido.', 'danger')
-            return redirect(url_for('projects.edit_project', project_id=project_id))
-        
-        # Actualizar proyecto
-        project.gsf_code = request.form.get('gsf_code')
-        project.invgate_code = request.form.get('invgate_code')
-        project.name = request.form.get('name')
-        project.priority = priority
-        
-        # Manejar campos numéricos que pueden estar vacíos
-        estimated_hours = request.form.get('estimated_hours')
-        project.estimated_hours = int(estimated_hours) if estimated_hours else None
-        
-        project.status = status
-        project.progress = int(request.form.get('progress', 0))
-        project.test_cases = int(request.form.get('test_cases', 0))
-        project.executed_cases = int(request.form.get('executed_cases', 0))
-        
-        # Fechas - manejar campos vacíos
-        start_date = request.form.get('start_date')
-        end_date = request.form.get('end_date')
-        
-        if start_date:
-            project.start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        else:
-            project.start_date = None
-            
-        if end_date:
-            project.end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-        else:
-            project.end_date = None
-        
-        # Actualizar analistas
-        ProjectAnalyst.query.filter_by(project_id=project_id).delete()
-        analyst_ids = request.form.getlist('analysts')
-        for analyst_id in analyst_ids:
-            project_analyst = ProjectAnalyst(
-                project_id=project_id,
-                analyst_id=analyst_id
-            )
-            db.session.add(project_analyst)
-        
-        # Log de cambios
-        for field, old_value in old_values.items():
-            new_value = getattr(project, field)
-            if str(old_value) != str(new_value):
-                log_project_change(project_id, current_user.id, field, old_value, new_value)
-        
-        db.session.commit()
-        flash(f'Proyecto "{project.name}" actualizado exitosamente.', 'success')
-        return redirect(url_for('projects.project_detail', project_id=project_id))
-    
-    analysts = User.query.filter_by(role='Analista', is_active=True).all()
-    assigned_analysts = [pa.analyst_id for pa in project.analysts]
-    priorities = get_catalog_options('priority')
-    statuses = get_catalog_options('status')
-    return render_template('projects/edit.html', project=project, analysts=analysts, 
-                         assigned_analysts=assigned_analysts, priorities=priorities, statuses=statuses)
-
-@projects_bp.route('/projects/<int:project_id>/update-progress', methods=['GET', 'POST'])
-@login_required
-def update_progress(project_id):
-    project = Project.query.get_or_404(project_id)
-    
-    # Verificar permisos (solo analistas asignados o supervisores/admin)
-    if current_user.role == 'Analista':
-        assigned = ProjectAnalyst.query.filter_by(project_id=project_id, analyst_id=current_user.id).first()
-        if not assigned:
-            flash('No tienes permisos para actualizar este proyecto.', 'danger')
-            return redirect(url_for('projects.projects_list'))
-    
-    if request.method == 'POST':
-        # Guardar valores antiguos
-        old_progress = project.progress
-        old_status = project.status
-        old_executed = project.executed_cases
-        old_test_cases = project.test_cases
-        old_observation = project.observation
-        
-        # Validar estado
-        new_status = request.form.get('status')
-        if new_status not in get_catalog_options('status'):
-            flash('El estado seleccionado no es válido.', 'danger')
-            return redirect(url_for('projects.project_detail', project_id=project_id))
-        
-        # Actualizar campos
-        project.progress = int(request.form.get('progress', project.progress))
-        project.status = new_status
-        project.test_cases = int(request.form.get('test_cases', project.test_cases))
-        project.executed_cases = int(request.form.get('executed_cases', project.executed_cases))
-        project.observation = request.form.get('observation', '')
-        
-        # Validar progreso
-        if project.progress < 0 or project.progress > 100:
-            flash('El porcentaje de avance debe estar entre 0 y 100.', 'danger')
-            return redirect(url_for('projects.project_detail', project_id=project_id))
-        
-        # Validar que casos ejecutados no sean mayores que casos de prueba
-        if project.executed_cases > project.test_cases:
-            flash('Los casos ejecutados no pueden ser mayores que los casos de prueba.', 'danger')
-            return redirect(url_for('projects.project_detail', project_id=project_id))
-        
-        # Log de cambios
-        if old_progress != project.progress:
-            log_project_change(project_id, current_user.id, 'progress', old_progress, project.progress)
-        if old_status != project.status:
-            log_project_change(project_id, current_user.id, 'status', old_status, project.status)
-        if old_test_cases != project.test_cases:
-            log_project_change(project_id, current_user.id, 'test_cases', old_test_cases, project.test_cases)
-        if old_executed != project.executed_cases:
-            log_project_change(project_id, current_user.id, 'executed_cases', old_executed, project.executed_cases)
-        if old_observation != project.observation:
-            log_project_change(project_id, current_user.id, 'observation', old_observation, project.observation)
-        
-        db.session.commit()
-        flash('Progreso del proyecto actualizado exitosamente.', 'success')
-        return redirect(url_for('projects.project_detail', project_id=project_id))
-    
-    # Si es GET, mostrar formulario de actualización
-    statuses = get_catalog_options('status')
-    return render_template('projects/update_progress.html', project=project, statuses=statuses)
-
-@projects_bp.route('/projects/<int:project_id>/delete', methods=['POST'])
-@login_required
-@supervisor_required
-def delete_project(project_id):
-    project = Project.query.get_or_404(project_id)
-    
-    # Verificar permisos
-    if project.created_by_id != current_user.id and current_user.role != 'Admin':
-        flash('No tienes permisos para eliminar este proyecto.', 'danger')
-        return redirect(url_for('projects.projects_list'))
-    
-    project_name = project.name
-    
-    # Eliminar proyecto y relaciones (cascade se encarga de esto)
-    db.session.delete(project)
-    db.session.commit()
-    
-    flash(f'Proyecto "{project_name}" eliminado exitosamente.', 'info')
-    return redirect(url_for('projects.projects_list'))
\ No newline at end of file
+from flask import (Blueprint, render_template, flash, redirect, url_for, request, jsonify, current_app, send_file, abort,
+                   Response, stream_with_context)
+from flask_login import login_required, current_user
+from app import db
+from app.models import Project, User, ProjectAnalyst, Log, Catalog, Evidence  # <- Asegurar que ProjectAnalyst esté importado
+from app.storage import blob_store, QuotaExceededError
+from app.utils.decorators import supervisor_required, admin_required
+from app.utils.cache import catalog_cache, user_cache
+from app.utils.http_cache import conditional_page, row_cache
+from app.audit import record_change
+from app.archive import delete_project_history
+from app.history import parse_as_of, projects_as_of, SNAPSHOT_FIELDS
+from app.notifications import notify_assigned, notify_changes
+from app.search import search_projects
+from app.importer import ProjectImporter, ImportFormatError, iter_rows
+from app.exporter import (PROJECT_HEADERS, LOG_HEADERS, project_export_query, log_export_query,
+                          stream_rows, iter_csv, write_xlsx)
+from app.queries import (project_list_query, filter_projects, keyset_page, SORT_COLUMNS,
+                         history_page, decode_history_cursor, scoped_projects_query, scope_stat_key,
+                         scope_validators, scope_version, project_validators)
+from datetime import datetime
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+import mimetypes
+import os
+
+projects_bp = Blueprint('projects', __name__)
+
+def get_catalog_options(catalog_name):
+    """Obtener opciones activas de un catálogo (desde la caché en memoria)"""
+    return catalog_cache.options(catalog_name)
+
+def log_project_change(project_id, user_id, field, old_value, new_value):
+    """Función auxiliar para registrar cambios en el log (se escriben en bloque al hacer commit)"""
+    record_change(project_id, user_id, field, old_value, new_value)
+
+def parse_date(value):
+    """Convertir 'YYYY-MM-DD' a fecha; None si está vacío o es inválido"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
+@projects_bp.app_template_global()
+def project_row(project):
+    """Fila del listado de proyectos, renderizada una vez por versión del proyecto"""
+    if current_user.role == 'Admin':
+        variant = 'admin'
+    elif current_user.role == 'Supervisor' and project.created_by_id == current_user.id:
+        variant = 'owner'
+    else:
+        variant = 'viewer'
+    key = (project.id, project.updated_at, variant, user_cache.signal.current())
+    return row_cache.get_or_render(key, 'projects/_row.html', project=project, variant=variant)
+
+def list_validators():
+    return scope_validators(scoped_projects_query(current_user), [scope_stat_key(current_user)])
+
+def detail_validators(project_id):
+    row = project_validators(project_id)
+    # Sin proyecto o sin acceso, la vista responde como siempre
+    if row is None or not can_view(project_id, row.created_by_id):
+        return None
+    return tuple(row)
+
+@projects_bp.route('/projects')
+@login_required
+@conditional_page(list_validators)
+def projects_list():
+    # Filtros y orden desde la URL
+    filters = {
+        'status': request.args.get('status', ''),
+        'priority': request.args.get('priority', ''),
+        'analyst': request.args.get('analyst', type=int),
+        'date_from': request.args.get('date_from', ''),
+        'date_to': request.args.get('date_to', ''),
+    }
+    sort = request.args.get('sort', 'updated_at')
+    if sort not in SORT_COLUMNS:
+        sort = 'updated_at'
+    direction = 'asc' if request.args.get('direction') == 'asc' else 'desc'
+    
+    query = filter_projects(
+        project_list_query(current_user),
+        status=filters['status'],
+        priority=filters['priority'],
+        analyst_id=filters['analyst'] if current_user.role != 'Analista' else None,
+        date_from=parse_date(filters['date_from']),
+        date_to=parse_date(filters['date_to'])
+    )
+    page = keyset_page(query, sort=sort, direction=direction,
+                       cursor=request.args.get('cursor'),
+                       per_page=current_app.config.get('PROJECTS_PER_PAGE', 25))
+    
+    # Parámetros activos (sin cursor) para construir los enlaces de paginación
+    list_args = {key: value for key, value in request.args.items() if key != 'cursor' and value}
+    
+    analysts = []
+    if current_user.role != 'Analista':
+        analysts = User.query.filter_by(role='Analista', is_active=True).order_by(User.username).all()
+    
+    return render_template('projects/list.html', projects=page.items, page=page,
+                         filters=filters, sort=sort, direction=direction, list_args=list_args,
+                         analysts=analysts, priorities=get_catalog_options('priority'),
+                         statuses=get_catalog_options('status'))
+
+@projects_bp.route('/projects/as-of')
+@login_required
+@conditional_page(list_validators)
+def projects_as_of_list():
+    """Estado de los proyectos visibles al final de una fecha (o en una fecha y hora UTC)"""
+    at_arg = request.args.get('at', '')
+    at = parse_as_of(at_arg)
+    filters = {'status': request.args.get('status', ''), 'priority': request.args.get('priority', '')}
+    page = None
+    if at_arg and at is None:
+        flash('La fecha no es válida.', 'warning')
+    elif at:
+        per_page = current_app.config.get('PROJECTS_PER_PAGE', 25)
+        page = projects_as_of(scoped_projects_query(current_user), at, status=filters['status'],
+                              priority=filters['priority'], offset=max(request.args.get('offset', 0, type=int), 0),
+                              limit=per_page, version=scope_version(current_user))
+    list_args = {key: value for key, value in request.args.items() if key != 'offset' and value}
+    return render_template('projects/as_of.html', page=page, at_arg=at_arg, filters=filters, list_args=list_args,
+                         priorities=get_catalog_options('priority'), statuses=get_catalog_options('status'))
+
+@projects_bp.route('/projects/search')
+@login_required
+def search():
+    """Búsqueda por código GSF, código Invgate, nombre u observación"""
+    q = request.args.get('q', '').strip()
+    limit = current_app.config.get('SEARCH_RESULTS_LIMIT', 50)
+    projects = search_projects(current_user, q, limit=limit,
+                               rank_limit=current_app.config.get('SEARCH_RANK_LIMIT', 2000)) if q else []
+    return render_template('projects/search.html', q=q, projects=projects, limit=limit)
+
+@projects_bp.route('/projects/create', methods=['GET', 'POST'])
+@login_required
+@supervisor_required
+def create_project():
+    if request.method == 'POST':
+        # Validar campos obligatorios
+        gsf_code = request.form.get('gsf_code')
+        invgate_code = request.form.get('invgate_code')
+        name = request.form.get('name')
+        
+        if not all([gsf_code, invgate_code, name]):
+            flash('Los campos Código GSF, Código Invgate y Nombre son obligatorios.', 'danger')
+            return render_template('projects/create.html')
+        
+        # Validar que la priorización y estado sean válidos
+        priority = request.form.get('priority')
+        status = request.form.get('status', 'Pendiente')
+        
+        if priority and priority not in get_catalog_options('priority'):
+            flash('La priorización seleccionada no es válida.', 'danger')
+            return render_template('projects/create.html')
+        
+        if status not in get_catalog_options('status'):
+            flash('El estado seleccionado no es válido.', 'danger')
+            return render_template('projects/create.html')
+        
+        # Crear proyecto
+        project = Project(
+            gsf_code=gsf_code,
+            invgate_code=invgate_code,
+            name=name,
+            priority=priority,
+            estimated_hours=request.form.get('estimated_hours'),
+            start_date=datetime.strptime(request.form.get('start_date'), '%Y-%m-%d').date() if request.form.get('start_date') else None,
+            end_date=datetime.strptime(request.form.get('end_date'), '%Y-%m-%d').date() if request.form.get('end_date') else None,
+            status=status,
+            progress=request.form.get('progress', 0),
+            test_cases=request.form.get('test_cases', 0),
+            executed_cases=request.form.get('executed_cases', 0),
+            created_by_id=current_user.id
+        )
+        
+        db.session.add(project)
+        db.session.flush()  # Para obtener el ID del proyecto
+        
+        # Asignar analistas
+        analyst_ids = request.form.getlist('analysts')
+        for analyst_id in analyst_ids:
+            project_analyst = ProjectAnalyst(
+                project_id=project.id,
+                analyst_id=analyst_id
+            )
+            db.session.add(project_analyst)
+        
+        # Log de creación y avisos (se escriben en el mismo commit)
+        log_project_change(project.id, current_user.id, 'PROYECTO CREADO', None, project.name)
+        notify_assigned(project.id, {int(analyst_id) for analyst_id in analyst_ids}, current_user.id)
+        
+        db.session.commit()
+        
+        flash(f'Proyecto "{name}" creado exitosamente.', 'success')
+        return redirect(url_for('projects.projects_list'))
+    
+    # Obtener datos para el formulario
+    analysts = User.query.filter_by(role='Analista', is_active=True).all()
+    priorities = get_catalog_options('priority')
+    statuses = get_catalog_options('status')
+    return render_template('projects/create.html', analysts=analysts, priorities=priorities, statuses=statuses)
+
+@projects_bp.route('/projects/import', methods=['GET', 'POST'])
+@login_required
+@supervisor_required
+def import_projects():
+    """Carga masiva de proyectos desde CSV/XLSX"""
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('Selecciona un archivo CSV o XLSX.', 'danger')
+            return redirect(url_for('projects.import_projects'))
+
+        importer = ProjectImporter(current_user.id,
+                                   batch_size=current_app.config.get('IMPORT_BATCH_SIZE', 1000),
+                                   error_limit=current_app.config.get('IMPORT_ERROR_LIMIT', 1000))
+        try:
+            importer.run(iter_rows(upload.stream, upload.filename))
+        except ImportFormatError as e:
+            db.session.rollback()
+            flash(str(e), 'danger')
+            if not importer.result.created:
+                return redirect(url_for('projects.import_projects'))
+
+        result = importer.result
+        flash(f'{result.created} proyecto(s) importado(s), {result.failed} fila(s) con errores.',
+              'success' if not result.failed else 'warning')
+        return render_template('projects/import.html', result=result)
+
+    return render_template('projects/import.html', result=None)
+
+def export_response(headers, query, basename, title):
+    """Respuesta de descarga en CSV (en streaming) o XLSX según ?format="""
+    rows = stream_rows(query, current_app.config.get('EXPORT_BATCH_SIZE', 1000))
+    filename = f'{basename}_{datetime.now().strftime("%Y%m%d")}'
+    if request.args.get('format') == 'xlsx':
+        return send_file(write_xlsx(headers, rows, title), as_attachment=True,
+                         download_name=f'{filename}.xlsx',
+                         mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    response = Response(stream_with_context(iter_csv(headers, rows)), mimetype='text/csv; charset=utf-8')
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}.csv'
+    return response
+
+def export_filters():
+    """Mismos filtros que el listado de proyectos"""
+    return {
+        'status': request.args.get('status', ''),
+        'priority': request.args.get('priority', ''),
+        'analyst_id': request.args.get('analyst', type=int) if current_user.role != 'Analista' else None,
+        'date_from': parse_date(request.args.get('date_from', '')),
+        'date_to': parse_date(request.args.get('date_to', '')),
+    }
+
+@projects_bp.route('/projects/export')
+@login_required
+def export_projects():
+    """Exportar los proyectos visibles con sus analistas"""
+    query = project_export_query(current_user, **export_filters())
+    return export_response(PROJECT_HEADERS, query, 'proyectos', 'Proyectos')
+
+@projects_bp.route('/projects/export/history')
+@login_required
+def export_history():
+    """Exportar el historial de cambios de los proyectos visibles"""
+    query = log_export_query(current_user, **export_filters())
+    return export_response(LOG_HEADERS, query, 'historial', 'Historial')
+
+def can_view(project_id, created_by_id):
+    """Reglas de acceso de project_detail: admin, supervisor creador o analista asignado"""
+    if current_user.role == 'Analista':
+        return ProjectAnalyst.query.filter_by(project_id=project_id, analyst_id=current_user.id).first() is not None
+    if current_user.role == 'Supervisor':
+        return created_by_id == current_user.id
+    return True
+
+def can_view_project(project):
+    return can_view(project.id, project.created_by_id)
+
+def project_etag(project_id, updated_at):
+    """Versión del proyecto (ETag de la API): cambia con cada modificación"""
+    return f'{project_id}-{updated_at.strftime("%Y%m%d%H%M%S%f") if updated_at else "0"}'
+
+PROGRESS_FIELDS = ('progress', 'status', 'test_cases', 'executed_cases', 'observation')
+EDIT_FIELDS = ('gsf_code', 'invgate_code', 'name', 'priority', 'estimated_hours', 'start_date', 'end_date',
+               'status', 'progress', 'test_cases', 'executed_cases')
+# Todos los campos que reconstruye el estado a una fecha deben quedar en el historial
+LOGGED_EDIT_FIELDS = SNAPSHOT_FIELDS
+
+def int_value(values, key, default):
+    """Entero de un formulario o JSON; `default` si falta o está vacío"""
+    value = values.get(key)
+    if value is None or value == '':
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'El campo {key} debe ser un número entero.')
+
+def date_value(values, key, default):
+    """Fecha 'YYYY-MM-DD'; `default` si falta y None si está vacía"""
+    if key not in values:
+        return default
+    value = values.get(key)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError(f'El campo {key} debe tener formato AAAA-MM-DD.')
+
+def validate_progress(progress, test_cases, executed_cases):
+    if progress < 0 or progress > 100:
+        raise ValueError('El porcentaje de avance debe estar entre 0 y 100.')
+    if executed_cases > test_cases:
+        raise ValueError('Los casos ejecutados no pueden ser mayores que los casos de prueba.')
+
+def apply_progress_update(project, values, user_id, statuses=None):
+    """Validar y aplicar avance, estado, casos y observación, registrando cada cambio.
+
+    Las claves ausentes conservan su valor. Si algo no es válido lanza
+    ValueError con el mensaje para el usuario, sin modificar el proyecto.
+    Devuelve los campos modificados ({campo: (anterior, nuevo)}).
+    """
+    status = values.get('status', project.status)
+    if status not in (statuses if statuses is not None else get_catalog_options('status')):
+        raise ValueError('El estado seleccionado no es válido.')
+    new_values = {
+        'progress': int_value(values, 'progress', project.progress),
+        'status': status,
+        'test_cases': int_value(values, 'test_cases', project.test_cases),
+        'executed_cases': int_value(values, 'executed_cases', project.executed_cases),
+        'observation': values.get('observation', project.observation),
+    }
+    validate_progress(new_values['progress'], new_values['test_cases'], new_values['executed_cases'])
+    
+    changes = {}
+    for field in PROGRESS_FIELDS:
+        old_value = getattr(project, field)
+        if old_value != new_values[field]:
+            setattr(project, field, new_values[field])
+            log_project_change(project.id, user_id, field, old_value, new_values[field])
+            changes[field] = (old_value, new_values[field])
+    notify_changes(project.id, user_id, changes)
+    return changes
+
+def apply_progress_batch(updates, user):
+    """Aplicar varias actualizaciones de avance en la transacción actual.
+
+    `updates` es una lista de dicts con `id`, los campos de PROGRESS_FIELDS
+    y, opcionalmente, `etag` (la versión que vio el usuario). Los permisos
+    se verifican con una sola consulta y el catálogo de estados se lee una
+    vez; el historial y los avisos se escriben en bloque con el commit, que
+    queda a cargo del llamador. Devuelve (proyectos modificados, errores
+    por fila como {'id', 'error'}).
+    """
+    errors, ids = [], set()
+    for values in updates:
+        try:
+            ids.add(int(values.get('id')))
+        except (TypeError, ValueError):
+            errors.append({'id': values.get('id'), 'error': 'Identificador de proyecto inválido.'})
+    
+    # Mismas reglas que update_progress: los analistas solo sus proyectos asignados
+    query = Project.query.filter(Project.id.in_(ids))
+    if user.role == 'Analista':
+        query = query.filter(Project.id.in_(
+            select(ProjectAnalyst.project_id).where(ProjectAnalyst.analyst_id == user.id)))
+    projects = {project.id: project for project in query.with_for_update(of=Project)}
+    
+    statuses = get_catalog_options('status')
+    updated = {}
+    for values in updates:
+        try:
+            project_id = int(values.get('id'))
+        except (TypeError, ValueError):
+            continue
+        project = projects.get(project_id)
+        if project is None:
+            errors.append({'id': project_id, 'error': 'Proyecto no encontrado o sin permisos para actualizarlo.'})
+            continue
+        if values.get('etag') and values['etag'] != project_etag(project.id, project.updated_at):
+            errors.append({'id': project_id, 'error': 'El proyecto fue modificado por otro usuario.'})
+            continue
+        try:
+            if apply_progress_update(project, values, user.id, statuses=statuses):
+                updated[project_id] = project
+        except ValueError as e:
+            errors.append({'id': project_id, 'error': str(e)})
+    return list(updated.values()), errors
+
+def apply_project_edit(project, values, user_id):
+    """Validar y aplicar la edición completa de un proyecto (supervisor o admin).
+
+    `values['analysts']`, si está presente, es la lista completa de ids de
+    analistas asignados. Lanza ValueError sin modificar el proyecto.
+    """
+    new_values = {
+        'gsf_code': values.get('gsf_code', project.gsf_code),
+        'invgate_code': values.get('invgate_code', project.invgate_code),
+        'name': values.get('name', project.name),
+        'priority': values.get('priority', project.priority) or None,
+        'estimated_hours': int_value(values, 'estimated_hours', None) if 'estimated_hours' in values
+                           else project.estimated_hours,
+        'start_date': date_value(values, 'start_date', project.start_date),
+        'end_date': date_value(values, 'end_date', project.end_date),
+        'status': values.get('status', project.status),
+        'progress': int_value(values, 'progress', project.progress),
+        'test_cases': int_value(values, 'test_cases', project.test_cases),
+        'executed_cases': int_value(values, 'executed_cases', project.executed_cases),
+    }
+    if not all([new_values['gsf_code'], new_values['invgate_code'], new_values['name']]):
+        raise ValueError('Los campos Código GSF, Código Invgate y Nombre son obligatorios.')
+    if new_values['priority'] and new_values['priority'] not in get_catalog_options('priority'):
+        raise ValueError('La priorización seleccionada no es válida.')
+    if new_values['status'] not in get_catalog_options('status'):
+        raise ValueError('El estado seleccionado no es válido.')
+    validate_progress(new_values['progress'], new_values['test_cases'], new_values['executed_cases'])
+    
+    analyst_ids = None
+    if 'analysts' in values:
+        try:
+            analyst_ids = {int(analyst_id) for analyst_id in values['analysts']}
+        except (TypeError, ValueError):
+            raise ValueError('La lista de analistas no es válida.')
+        valid_ids = {analyst_id for (analyst_id,) in db.session.query(User.id)
+                     .filter(User.id.in_(analyst_ids), User.role == 'Analista')}
+        if analyst_ids - valid_ids:
+            raise ValueError('Alguno de los analistas seleccionados no existe.')
+    
+    changes = {}
+    for field in EDIT_FIELDS:
+        old_value = getattr(project, field)
+        setattr(project, field, new_values[field])
+        if field in LOGGED_EDIT_FIELDS and str(old_value or '') != str(new_values[field] or ''):
+            log_project_change(project.id, user_id, field, old_value, new_values[field])
+            changes[field] = (old_value, new_values[field])
+    notify_changes(project.id, user_id, changes)
+    
+    # Actualizar analistas (solo altas y bajas, para mantener las estadísticas al día)
+    if analyst_ids is not None:
+        changed = False
+        for assignment in project.analysts:
+            if assignment.analyst_id in analyst_ids:
+                analyst_ids.discard(assignment.analyst_id)
+            else:
+                db.session.delete(assignment)
+                changed = True
+        for analyst_id in analyst_ids:
+            db.session.add(ProjectAnalyst(project_id=project.id, analyst_id=analyst_id))
+            changed = True
+        notify_assigned(project.id, analyst_ids, user_id)
+        if changed:
+            # La fila del proyecto no cambia, pero su representación (y su ETag) sí
+            project.updated_at = datetime.utcnow()
+
+@projects_bp.route('/projects/<int:project_id>')
+@login_required
+@conditional_page(detail_validators)
+def project_detail(project_id):
+    project = Project.query.get_or_404(project_id)
+    
+    # Verificar permisos
+    if not can_view_project(project):
+        flash('No tienes permisos para ver este proyecto.', 'danger')
+        return redirect(url_for('projects.projects_list'))
+    
+    # Solo los cambios más recientes; el resto se carga bajo demanda
+    logs, next_cursor = history_page(project_id, limit=current_app.config.get('HISTORY_PAGE_SIZE', 50))
+    evidences = Evidence.query.options(joinedload(Evidence.uploader)).filter_by(project_id=project_id) \
+        .order_by(Evidence.uploaded_at.desc()).all()
+    return render_template('projects/detail.html', project=project, logs=logs, next_cursor=next_cursor,
+                         evidences=evidences, evidence_usage=evidence_usage(project_id),
+                         evidence_quota=current_app.config.get('EVIDENCE_PROJECT_QUOTA', 1024 ** 3))
+
+@projects_bp.route('/projects/<int:project_id>/history')
+@login_required
+def project_history(project_id):
+    """Página del historial en JSON para el scroll infinito del detalle"""
+    project = Project.query.get_or_404(project_id)
+    if not can_view_project(project):
+        return jsonify({'error': 'No tienes permisos para ver este proyecto.'}), 403
+    
+    before = None
+    if request.args.get('before'):
+        before = decode_history_cursor(request.args['before'])
+        if before is None:
+            return jsonify({'error': 'Cursor inválido.'}), 400
+    
+    page_size = current_app.config.get('HISTORY_PAGE_SIZE', 50)
+    limit = min(request.args.get('limit', page_size, type=int) or page_size, 500)
+    logs, next_cursor = history_page(project_id, before=before, limit=limit)
+    return jsonify({
+        'entries': [{
+            'id': log.id,
+            'changed_at': log.changed_at.isoformat(),
+            'changed_at_display': log.changed_at.strftime('%d/%m/%Y %H:%M'),
+            'username': log.username,
+            'changed_field': log.changed_field,
+            'old_value': log.old_value,
+            'new_value': log.new_value,
+            'archived': log.archived,
+        } for log in logs],
+        'next_cursor': next_cursor,
+    })
+
+@projects_bp.route('/projects/<int:project_id>/edit', methods=['GET', 'POST'])
+@login_required
+@supervisor_required
+def edit_project(project_id):
+    project = Project.query.get_or_404(project_id)
+    
+    # Verificar que el supervisor es el creador
+    if project.created_by_id != current_user.id and current_user.role != 'Admin':
+        flash('No tienes permisos para editar este proyecto.', 'danger')
+        return redirect(url_for('projects.projects_list'))
+    
+    if request.method == 'POST':
+        values = request.form.to_dict()
+        values['analysts'] = request.form.getlist('analysts')
+        try:
+            apply_project_edit(project, values, current_user.id)
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('projects.edit_project', project_id=project_id))
+        
+        db.session.commit()
+        row_cache.invalidate(project_id)
+        flash(f'Proyecto "{project.name}" actualizado exitosamente.', 'success')
+        return redirect(url_for('projects.project_detail', project_id=project_id))
+    
+    analysts = User.query.filter_by(role='Analista', is_active=True).all()
+    assigned_analysts = [pa.analyst_id for pa in project.analysts]
+    priorities = get_catalog_options('priority')
+    statuses = get_catalog_options('status')
+    return render_template('projects/edit.html', project=project, analysts=analysts, 
+                         assigned_analysts=assigned_analysts, priorities=priorities, statuses=statuses)
+
+@projects_bp.route('/projects/<int:project_id>/update-progress', methods=['GET', 'POST'])
+@login_required
+def update_progress(project_id):
+    project = Project.query.get_or_404(project_id)
+    
+    # Verificar permisos (solo analistas asignados o supervisores/admin)
+    if current_user.role == 'Analista':
+        assigned = ProjectAnalyst.query.filter_by(project_id=project_id, analyst_id=current_user.id).first()
+        if not assigned:
+            flash('No tienes permisos para actualizar este proyecto.', 'danger')
+            return redirect(url_for('projects.projects_list'))
+    
+    if request.method == 'POST':
+        try:
+            apply_progress_update(project, request.form, current_user.id)
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('projects.project_detail', project_id=project_id))
+        
+        db.session.commit()
+        row_cache.invalidate(project_id)
+        flash('Progreso del proyecto actualizado exitosamente.', 'success')
+        return redirect(url_for('projects.project_detail', project_id=project_id))
+    
+    # Si es GET, mostrar formulario de actualización
+    statuses = get_catalog_options('status')
+    return render_template('projects/update_progress.html', project=project, statuses=statuses)
+
+@projects_bp.route('/projects/bulk-progress', methods=['GET', 'POST'])
+@login_required
+def bulk_progress():
+    """Actualizar el avance de varios proyectos a la vez (una sola transacción)"""
+    if request.method == 'POST':
+        # Solo llegan las filas modificadas: el formulario deshabilita las demás al enviar
+        updates = []
+        for project_id in request.form.getlist('id', type=int):
+            values = {field: request.form[f'{field}-{project_id}'] for field in PROGRESS_FIELDS
+                      if f'{field}-{project_id}' in request.form}
+            updates.append(dict(values, id=project_id, etag=request.form.get(f'etag-{project_id}')))
+        updated, errors = apply_progress_batch(updates, current_user)
+        updated_ids = [project.id for project in updated]
+        db.session.commit()
+        for project_id in updated_ids:
+            row_cache.invalidate(project_id)
+        
+        if updated_ids:
+            flash(f'{len(updated_ids)} proyecto(s) actualizados.', 'success')
+        elif not errors:
+            flash('No hubo cambios para guardar.', 'info')
+        codes = dict(db.session.query(Project.id, Project.gsf_code)
+                     .filter(Project.id.in_([e['id'] for e in errors if isinstance(e['id'], int)])))
+        for error in errors:
+            flash(f"{codes.get(error['id'], error['id'])}: {error['error']}", 'danger')
+        return redirect(url_for('projects.bulk_progress', **request.args))
+    
+    show_all = request.args.get('all') == '1'
+    query = scoped_projects_query(current_user)
+    if not show_all:
+        query = query.filter(Project.progress < 100)
+    limit = current_app.config.get('BULK_EDIT_LIMIT', 100)
+    projects = query.order_by(Project.updated_at.desc(), Project.id.desc()).limit(limit).all()
+    return render_template('projects/bulk_progress.html', projects=projects, statuses=get_catalog_options('status'),
+                         show_all=show_all, limit=limit, project_etag=project_etag)
+
+@projects_bp.route('/projects/<int:project_id>/delete', methods=['POST'])
+@login_required
+@supervisor_required
+def delete_project(project_id):
+    project = Project.query.get_or_404(project_id)
+    
+    # Verificar permisos
+    if project.created_by_id != current_user.id and current_user.role != 'Admin':
+        flash('No tienes permisos para eliminar este proyecto.', 'danger')
+        return redirect(url_for('projects.projects_list'))
+    
+    project_name = project.name
+    content_hashes = [evidence.content_hash for evidence in project.evidences]
+    
+    # El historial se borra por lotes; el resto de las relaciones, en cascada con el proyecto
+    delete_project_history(project_id, current_app.config.get('LOG_DELETE_CHUNK_SIZE', 5000))
+    db.session.delete(project)
+    db.session.commit()
+    row_cache.invalidate(project_id)
+    blob_store.release(content_hashes)
+    
+    flash(f'Proyecto "{project_name}" eliminado exitosamente.', 'info')
+    return redirect(url_for('projects.projects_list'))
+
+def evidence_usage(project_id):
+    """Espacio ocupado por el proyecto; un mismo contenido se cuenta una sola vez"""
+    blobs = db.session.query(Evidence.content_hash, Evidence.file_size) \
+        .filter(Evidence.project_id == project_id).distinct().subquery()
+    return db.session.query(func.coalesce(func.sum(blobs.c.file_size), 0)).scalar()
+
+def evidence_filename(name):
+    """Nombre original sin rutas (se conserva para mostrar y descargar)"""
+    name = os.path.basename((name or '').replace('\\', '/')).strip()
+    return name[-255:] or 'evidencia'
+
+@projects_bp.route('/projects/<int:project_id>/evidence', methods=['POST'])
+@login_required
+def upload_evidence(project_id):
+    """Subir una evidencia.
+
+    Acepta un formulario multipart (campo 'file') desde la página de detalle
+    o el archivo como cuerpo de la petición (nombre en ?filename= o en la
+    cabecera X-Filename) para scripts y archivos grandes. En ambos casos se
+    copia a disco por bloques sin cargarlo completo en memoria.
+    """
+    project = Project.query.get_or_404(project_id)
+    is_form = request.mimetype == 'multipart/form-data'
+    
+    def fail(message, status):
+        if is_form:
+            flash(message, 'danger')
+            return redirect(url_for('projects.project_detail', project_id=project_id))
+        return jsonify({'error': message}), status
+    
+    if not can_view_project(project):
+        return fail('No tienes permisos para subir evidencias a este proyecto.', 403)
+    
+    quota = current_app.config.get('EVIDENCE_PROJECT_QUOTA', 1024 ** 3)
+    remaining = quota - evidence_usage(project_id)
+    # Un contenido que el proyecto ya tiene no consume cuota, pero no se sabe hasta calcular el hash:
+    # algo más grande que esto no cabe como nuevo ni puede ser una evidencia existente
+    largest = db.session.query(func.coalesce(func.max(Evidence.file_size), 0)) \
+        .filter(Evidence.project_id == project_id).scalar()
+    max_bytes = max(remaining, largest)
+    too_large = 'El archivo supera el espacio disponible del proyecto.'
+    
+    if is_form:
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            return fail('Selecciona un archivo.', 400)
+        stream, filename, content_type = upload.stream, upload.filename, upload.mimetype
+    else:
+        if request.content_length is not None and request.content_length > max_bytes:
+            return fail(too_large, 413)
+        filename = request.args.get('filename') or request.headers.get('X-Filename')
+        if not filename:
+            return fail('Indica el nombre del archivo.', 400)
+        stream, content_type = request.stream, request.mimetype
+    
+    filename = evidence_filename(filename)
+    content_type = content_type if content_type and content_type != 'application/octet-stream' \
+        else (mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+    
+    try:
+        content_hash, size, created = blob_store.save_stream(stream, max_bytes=max_bytes)
+    except QuotaExceededError:
+        return fail(too_large, 413)
+    
+    already_in_project = db.session.query(Evidence.id).filter_by(
+        project_id=project_id, content_hash=content_hash).first() is not None
+    if not already_in_project and size > remaining:
+        # No se borra aquí: otra subida simultánea puede estar reutilizando el blob; lo recoge el barrido
+        return fail(too_large, 413)
+    
+    evidence = Evidence(
+        filename=filename,
+        file_path=blob_store.relative_path(content_hash),
+        file_size=size,
+        content_hash=content_hash,
+        content_type=content_type,
+        project_id=project_id,
+        uploaded_by_id=current_user.id
+    )
+    db.session.add(evidence)
+    log_project_change(project_id, current_user.id, 'evidencia', None, filename)
+    db.session.commit()
+    
+    if is_form:
+        flash(f'Evidencia "{filename}" subida correctamente.', 'success')
+        return redirect(url_for('projects.project_detail', project_id=project_id))
+    return jsonify({
+        'id': evidence.id,
+        'filename': filename,
+        'size': size,
+        'sha256': content_hash,
+        'deduplicated': not created,
+    }), 201
+
+# Tipos que se pueden mostrar en el navegador sin riesgo; el resto se descarga
+INLINE_CONTENT_TYPES = ('image/', 'video/', 'audio/', 'application/pdf')
+
+@projects_bp.route('/projects/<int:project_id>/evidence/<int:evidence_id>/download')
+@login_required
+def download_evidence(project_id, evidence_id):
+    """Descargar una evidencia con soporte de Range, ETag e If-None-Match.
+
+    El archivo se entrega con send_file (sendfile del servidor WSGI, o
+    X-Sendfile si USE_X_SENDFILE está activo) o, si se configura
+    EVIDENCE_ACCEL_REDIRECT_PREFIX, delegando la entrega a nginx con
+    X-Accel-Redirect.
+    """
+    evidence = Evidence.query.filter_by(id=evidence_id, project_id=project_id).first_or_404()
+    if not can_view_project(evidence.project):
+        flash('No tienes permisos para ver este proyecto.', 'danger')
+        return redirect(url_for('projects.projects_list'))
+    
+    relative_path = evidence.file_path
+    if evidence.content_hash:
+        relative_path = blob_store.relative_path(evidence.content_hash)
+    path = os.path.join(blob_store.root, relative_path)
+    if not os.path.isfile(path):
+        abort(404)
+    
+    content_type = evidence.content_type or mimetypes.guess_type(evidence.filename)[0] or 'application/octet-stream'
+    as_attachment = bool(request.args.get('download')) or not content_type.startswith(INLINE_CONTENT_TYPES)
+    max_age = current_app.config.get('EVIDENCE_CACHE_MAX_AGE', 86400)
+    
+    accel_prefix = current_app.config.get('EVIDENCE_ACCEL_REDIRECT_PREFIX')
+    if accel_prefix:
+        response = current_app.response_class(mimetype=content_type)
+        response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + relative_path.replace(os.sep, '/')
+        response.headers.set('Content-Disposition', 'attachment' if as_attachment else 'inline',
+                             filename=evidence.filename)
+        if evidence.content_hash:
+            response.set_etag(evidence.content_hash)
+        response.last_modified = evidence.uploaded_at
+        response.cache_control.max_age = max_age
+        response = response.make_conditional(request)
+    else:
+        response = send_file(path, mimetype=content_type, as_attachment=as_attachment,
+                             download_name=evidence.filename, conditional=True,
+                             etag=evidence.content_hash or True,
+                             last_modified=evidence.uploaded_at, max_age=max_age)
+        response.accept_ranges = 'bytes'
+    
+    # Contenido privado (requiere sesión); el hash garantiza que no cambia
+    response.cache_control.public = False
+    response.cache_control.private = True
+    if evidence.content_hash:
+        response.cache_control.immutable = True
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+@projects_bp.route('/projects/<int:project_id>/evidence/<int:evidence_id>/delete', methods=['POST'])
+@login_required
+def delete_evidence(project_id, evidence_id):
+    evidence = Evidence.query.filter_by(id=evidence_id, project_id=project_id).first_or_404()
+    project = evidence.project
+    
+    # Puede eliminarla quien la subió, el supervisor creador o un admin
+    allowed = current_user.role == 'Admin' or evidence.uploaded_by_id == current_user.id or \
+        (current_user.role == 'Supervisor' and project.created_by_id == current_user.id)
+    if not allowed:
+        flash('No tienes permisos para eliminar esta evidencia.', 'danger')
+        return redirect(url_for('projects.project_detail', project_id=project_id))
+    
+    filename = evidence.filename
+    content_hash = evidence.content_hash
+    db.session.delete(evidence)
+    log_project_change(project_id, current_user.id, 'evidencia', filename, None)
+    db.session.commit()
+    blob_store.release([content_hash])
+    
+    flash(f'Evidencia "{filename}" eliminada.', 'info')
+    return redirect(url_for('projects.project_detail', project_id=project_id))
\ No newline at end of file
@@ -0,0 +1,226 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from sqlalchemy import select, tuple_, func
+from sqlalchemy.orm import joinedload, selectinload, load_only
+from app import db
+from app.models import Project, ProjectAnalyst, User, Log
+from app.archive import HistoryEntry, archived_history
+from app.stats import stat_count
+
+# Columnas que necesitan las tablas de proyectos (listas y dashboards)
+LIST_COLUMNS = (
+    Project.id,
+    Project.gsf_code,
+    Project.invgate_code,
+    Project.name,
+    Project.priority,
+    Project.status,
+    Project.progress,
+    Project.test_cases,
+    Project.executed_cases,
+    Project.created_by_id,
+    Project.end_date,
+    Project.updated_at,
+)
+
+def projects_created_by(user_id):
+    """Proyectos creados por un usuario (supervisor)"""
+    return Project.query.filter(Project.created_by_id == user_id)
+
+def projects_assigned_to(user_id):
+    """Proyectos asignados a un analista (subconsulta para no duplicar filas)"""
+    assigned = select(ProjectAnalyst.project_id).where(ProjectAnalyst.analyst_id == user_id)
+    return Project.query.filter(Project.id.in_(assigned))
+
+def scoped_projects_query(user):
+    """Consulta de proyectos visibles para el usuario según su rol"""
+    if user.role == 'Admin':
+        return Project.query
+    if user.role == 'Supervisor':
+        return projects_created_by(user.id)
+    return projects_assigned_to(user.id)
+
+def scope_stat_key(user):
+    """Clave del contador de dashboard con la cantidad de proyectos visibles"""
+    if user.role == 'Admin':
+        return 'projects:total'
+    if user.role == 'Supervisor':
+        return f'creator:{user.id}'
+    return f'analyst:{user.id}'
+
+def scope_validators(query, stat_keys):
+    """(último updated_at, contadores...) de un conjunto de proyectos, en una sola consulta.
+
+    Los contadores vienen de los agregados del dashboard y detectan las
+    bajas, que no cambian el máximo de updated_at.
+    """
+    latest = query.with_entities(func.max(Project.updated_at)).scalar_subquery()
+    counts = [stat_count(key) for key in stat_keys]
+    return tuple(db.session.execute(select(latest, *counts)).one())
+
+def scope_version(user):
+    """Identifica los proyectos visibles de `user` y su versión (clave de las cachés por alcance)"""
+    key = scope_stat_key(user)
+    return (key,) + scope_validators(scoped_projects_query(user), [key])
+
+def project_validators(project_id):
+    """(updated_at, created_by_id, último cambio del historial) de un proyecto; None si no existe"""
+    last_change = select(func.max(Log.changed_at)).where(Log.project_id == project_id).scalar_subquery()
+    return db.session.execute(
+        select(Project.updated_at, Project.created_by_id, last_change).where(Project.id == project_id)
+    ).first()
+
+def with_list_loading(query):
+    """Carga anticipada de creador y analistas para evitar el N+1 en las plantillas"""
+    return query.options(
+        load_only(*LIST_COLUMNS),
+        joinedload(Project.creator).load_only(User.id, User.username),
+        selectinload(Project.analysts)
+            .load_only(ProjectAnalyst.id, ProjectAnalyst.project_id, ProjectAnalyst.analyst_id)
+            .joinedload(ProjectAnalyst.analyst)
+            .load_only(User.id, User.username),
+    )
+
+def project_list_query(user):
+    """Proyectos visibles para el usuario, listos para renderizar en tablas"""
+    return with_list_loading(scoped_projects_query(user))
+
+# Columnas permitidas para ordenar el listado paginado
+SORT_COLUMNS = {
+    'updated_at': Project.updated_at,
+    'end_date': Project.end_date,
+    'progress': Project.progress,
+}
+
+def filter_projects(query, status=None, priority=None, analyst_id=None, date_from=None, date_to=None):
+    """Aplicar filtros opcionales del listado.
+
+    El rango de fechas selecciona proyectos cuyo periodo (inicio-fin) se
+    solapa con [date_from, date_to].
+    """
+    if status:
+        query = query.filter(Project.status == status)
+    if priority:
+        query = query.filter(Project.priority == priority)
+    if analyst_id:
+        assigned = select(ProjectAnalyst.project_id).where(ProjectAnalyst.analyst_id == analyst_id)
+        query = query.filter(Project.id.in_(assigned))
+    if date_from:
+        query = query.filter(Project.end_date >= date_from)
+    if date_to:
+        query = query.filter(Project.start_date <= date_to)
+    return query
+
+def _pack_cursor(values):
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def _unpack_cursor(cursor):
+    return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+
+def encode_cursor(sort, value, project_id):
+    """Cursor opaco con la clave de ordenamiento del último elemento"""
+    if value is not None and sort != 'progress':
+        value = value.isoformat()
+    return _pack_cursor([value, project_id])
+
+def decode_cursor(sort, cursor):
+    """Decodificar un cursor; devuelve None si no es válido"""
+    try:
+        value, project_id = _unpack_cursor(cursor)
+        if value is not None:
+            if sort == 'end_date':
+                value = date.fromisoformat(value)
+            elif sort == 'updated_at':
+                value = datetime.fromisoformat(value)
+            else:
+                value = int(value)
+        return value, int(project_id)
+    except (ValueError, TypeError, binascii.Error):
+        return None
+
+class KeysetPage:
+    """Una página del listado con el cursor de la siguiente"""
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+def keyset_page(query, sort='updated_at', direction='desc', cursor=None, per_page=25):
+    """Paginación por clave (seek): el costo de cada página no depende de su posición.
+
+    Los valores nulos de la columna de orden van siempre al final y el id
+    desempata. Se recorren en dos tramos (valores no nulos y luego nulos) para
+    que cada consulta sea una búsqueda por rango sobre el índice (columna, id).
+    """
+    column = SORT_COLUMNS.get(sort, Project.updated_at)
+    descending = direction == 'desc'
+    id_order = Project.id.desc() if descending else Project.id.asc()
+
+    position = decode_cursor(sort, cursor) if cursor else None
+    items = []
+    if position is None or position[0] is not None:
+        # Tramo de valores no nulos
+        non_null = query.filter(column.isnot(None))
+        if position:
+            key = tuple_(column, Project.id)
+            non_null = non_null.filter(key < tuple(position) if descending else key > tuple(position))
+            position = None
+        non_null = non_null.order_by(column.desc() if descending else column.asc(), id_order)
+        items = non_null.limit(per_page + 1).all()
+
+    if len(items) <= per_page:
+        # Tramo de valores nulos, ordenados solo por id
+        nulls = query.filter(column.is_(None))
+        if position:
+            last_id = position[1]
+            nulls = nulls.filter(Project.id < last_id if descending else Project.id > last_id)
+        items += nulls.order_by(id_order).limit(per_page + 1 - len(items)).all()
+
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor(sort, getattr(last, column.key), last.id)
+    return KeysetPage(items, next_cursor)
+
+def encode_history_cursor(changed_at, log_id):
+    return _pack_cursor([changed_at.isoformat(), log_id])
+
+def decode_history_cursor(cursor):
+    """Posición (changed_at, id) del último registro mostrado; None si no es válida"""
+    try:
+        changed_at, log_id = _unpack_cursor(cursor)
+        return datetime.fromisoformat(changed_at), int(log_id)
+    except (ValueError, TypeError, binascii.Error):
+        return None
+
+def history_page(project_id, before=None, limit=50):
+    """Historial de un proyecto, del más reciente al más antiguo.
+
+    Trae el nombre del usuario en la misma consulta y devuelve
+    (registros, cursor_siguiente); `before` es una posición (changed_at, id).
+    Cuando se terminan los registros de la tabla log continúa con los
+    archivados, que son siempre más antiguos.
+    """
+    query = db.session.query(
+        Log.id, Log.changed_at, Log.changed_field, Log.old_value, Log.new_value, User.username
+    ).outerjoin(User, User.id == Log.user_id).filter(Log.project_id == project_id)
+    if before:
+        query = query.filter(tuple_(Log.changed_at, Log.id) < tuple(before))
+    rows = query.order_by(Log.changed_at.desc(), Log.id.desc()).limit(limit + 1).all()
+    entries = [HistoryEntry(*row, archived=False) for row in rows]
+    if len(entries) <= limit:
+        position = (entries[-1].changed_at, entries[-1].id) if entries else before
+        entries += archived_history(project_id, before=position, limit=limit + 1 - len(entries))
+
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = encode_history_cursor(entries[-1].changed_at, entries[-1].id)
+    return entries, next_cursor
@@ -0,0 +1,104 @@
+import re
+import unicodedata
+from sqlalchemy import column, func, literal_column, table, text
+from app.models import Project
+from app.queries import scoped_projects_query, with_list_loading
+
+# Peso de cada columna en el ranking: los códigos pesan más que el nombre y la observación
+WEIGHTS = {'gsf_code': 10.0, 'invgate_code': 10.0, 'name': 5.0, 'observation': 1.0}
+
+MAX_TERMS = 8
+
+project_fts = table('project_fts', column('rowid'))
+
+SQLITE_SCHEMA = [
+    # Índice FTS5 sobre la tabla project (contenido externo, sin duplicar el texto)
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS project_fts USING fts5(
+        {', '.join(WEIGHTS)}, content='project', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS project_fts_insert AFTER INSERT ON project BEGIN
+        INSERT INTO project_fts(rowid, gsf_code, invgate_code, name, observation)
+        VALUES (new.id, new.gsf_code, new.invgate_code, new.name, new.observation);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS project_fts_delete AFTER DELETE ON project BEGIN
+        INSERT INTO project_fts(project_fts, rowid, gsf_code, invgate_code, name, observation)
+        VALUES ('delete', old.id, old.gsf_code, old.invgate_code, old.name, old.observation);
+    END""",
+    # Solo los campos indexados: las actualizaciones de avance no tocan el índice
+    """CREATE TRIGGER IF NOT EXISTS project_fts_update
+    AFTER UPDATE OF gsf_code, invgate_code, name, observation ON project BEGIN
+        INSERT INTO project_fts(project_fts, rowid, gsf_code, invgate_code, name, observation)
+        VALUES ('delete', old.id, old.gsf_code, old.invgate_code, old.name, old.observation);
+        INSERT INTO project_fts(rowid, gsf_code, invgate_code, name, observation)
+        VALUES (new.id, new.gsf_code, new.invgate_code, new.name, new.observation);
+    END""",
+    "INSERT INTO project_fts(project_fts) VALUES ('rebuild')",
+]
+
+# Sin la extensión unaccent: acentos y separadores se normalizan con funciones inmutables
+ACCENTS = ('ÁÀÄÂÉÈËÊÍÌÏÎÓÒÖÔÚÙÜÛÑÇáàäâéèëêíìïîóòöôúùüûñç',
+           'AAAAEEEEIIIIOOOOUUUUNCaaaaeeeeiiiioooouuuunc')
+
+def _pg_words(column_sql):
+    return f"regexp_replace(translate(coalesce({column_sql}, ''), '{ACCENTS[0]}', '{ACCENTS[1]}'), '[^A-Za-z0-9]+', ' ', 'g')"
+
+POSTGRESQL_SCHEMA = [
+    # Columna generada: PostgreSQL la mantiene al día en cada INSERT/UPDATE
+    f"""ALTER TABLE project ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', {_pg_words("gsf_code || ' ' || invgate_code")}), 'A') ||
+        setweight(to_tsvector('simple', {_pg_words('name')}), 'B') ||
+        setweight(to_tsvector('simple', {_pg_words('observation')}), 'D')) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_project_search_vector ON project USING gin (search_vector)",
+]
+
+def create_search_index(connection):
+    """Crear el índice de búsqueda del motor en uso (idempotente)"""
+    statements = {'sqlite': SQLITE_SCHEMA, 'postgresql': POSTGRESQL_SCHEMA}.get(connection.dialect.name, [])
+    for statement in statements:
+        connection.execute(text(statement))
+
+def search_terms(q):
+    """Palabras de la búsqueda sin acentos; los separadores ('-', '/', espacios) se ignoran como en el índice"""
+    plain = ''.join(c for c in unicodedata.normalize('NFKD', (q or '').lower()) if not unicodedata.combining(c))
+    return re.findall(r'[a-z0-9]+', plain)[:MAX_TERMS]
+
+def _broad(session, key, match_filter, rank_limit):
+    """True si la búsqueda coincide con más de `rank_limit` proyectos (conteo acotado)"""
+    sample = session.query(key).filter(match_filter).limit(rank_limit + 1).subquery()
+    return session.query(func.count()).select_from(sample).scalar() > rank_limit
+
+def search_projects(user, q, limit=50, rank_limit=2000):
+    """Proyectos visibles para el usuario que contienen todas las palabras (como prefijo).
+
+    Se ordenan por relevancia; si coinciden más de `rank_limit` proyectos
+    (búsquedas muy genéricas) se ordenan del más nuevo al más antiguo para
+    no calcular el ranking de todos. Sin índice de texto completo se busca
+    con LIKE.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return []
+    query = with_list_loading(scoped_projects_query(user))
+    dialect = query.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        match_filter = literal_column('project_fts').op('MATCH')(' '.join(f'"{term}"*' for term in terms))
+        query = query.join(project_fts, project_fts.c.rowid == Project.id).filter(match_filter)
+        broad = _broad(query.session, project_fts.c.rowid, match_filter, rank_limit)
+        rank = func.bm25(literal_column('project_fts'), *WEIGHTS.values())
+        # Un solo criterio: FTS5 entrega los rowid ya ordenados y evita ordenar todas las coincidencias
+        query = query.order_by(project_fts.c.rowid.desc() if broad else rank)
+    elif dialect == 'postgresql':
+        tsquery = func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in terms))
+        vector = literal_column('project.search_vector')
+        match_filter = vector.op('@@')(tsquery)
+        query = query.filter(match_filter)
+        if not _broad(query.session, Project.id, match_filter, rank_limit):
+            query = query.order_by(func.ts_rank(vector, tsquery).desc())
+        query = query.order_by(Project.id.desc())
+    else:
+        for term in terms:
+            pattern = f'%{term}%'
+            query = query.filter(Project.gsf_code.ilike(pattern) | Project.invgate_code.ilike(pattern) |
+                                 Project.name.ilike(pattern) | Project.observation.ilike(pattern))
+        query = query.order_by(Project.updated_at.desc(), Project.id.desc())
+    return query.limit(limit).all()
@@ -0,0 +1,48 @@
+from sqlalchemy import insert, tuple_
+from app import db
+from app.models import User, Catalog
+from app.utils.cache import catalog_cache
+
+DEFAULT_CATALOGS = {
+    'priority': ['Regulatorio', 'Crítico', 'Alta', 'Media', 'Baja'],
+    'status': ['Pendiente', 'En Progreso', 'En Revisión', 'Completado', 'Bloqueado'],
+}
+
+def seed_admin():
+    """Crear el usuario admin si no existe; devuelve True si lo creó"""
+    if db.session.query(User.id).filter_by(username='admin').first():
+        return False
+    admin_user = User(
+        username='admin',
+        email='admin@qa.com',
+        role='Admin',
+        is_active=True
+    )
+    admin_user.set_password('admin123')
+    db.session.add(admin_user)
+    return True
+
+def seed_catalogs():
+    """Insertar en bloque los valores por defecto que falten; devuelve cuántos insertó"""
+    wanted = [(name, value) for name, values in DEFAULT_CATALOGS.items() for value in values]
+    existing = set(db.session.query(Catalog.name, Catalog.value)
+                   .filter(tuple_(Catalog.name, Catalog.value).in_(wanted)).all())
+    missing = [{'name': name, 'value': value} for name, value in wanted if (name, value) not in existing]
+    if missing:
+        db.session.execute(insert(Catalog), missing)
+    return len(missing)
+
+def seed():
+    """Datos por defecto (idempotente): devuelve (admin_creado, catálogos_insertados)"""
+    admin_created = seed_admin()
+    catalogs_created = seed_catalogs()
+    db.session.commit()
+    if catalogs_created:
+        catalog_cache.invalidate()
+    return admin_created, catalogs_created
+
+def init_db():
+    """Esquema al día y datos por defecto"""
+    from app.migrations import upgrade
+    applied = upgrade()
+    return applied, seed()
@@ -0,0 +1,375 @@
+from collections import defaultdict
+from sqlalchemy import event, inspect, select, func, bindparam, union_all, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from app import db
+from app.models import User, Project, ProjectAnalyst, DashboardStat, DashboardStatDelta
+from app.utils.jobs import PeriodicJob
+
+stat_table = DashboardStat.__table__
+delta_table = DashboardStatDelta.__table__
+
+# ---------------------------------------------------------------------------
+# Claves de los contadores
+#
+#   users:total, users:active, users:pending, users:role:<rol>
+#   projects:total, projects:status:<estado>
+#   creator:<id>[:completed|:not_started]   proyectos creados por un supervisor
+#   analyst:<id>[:completed|:not_started]   proyectos asignados a un analista
+#
+# Cada clave guarda la cantidad y la suma de % de avance (para promedios).
+# Las escrituras agregan filas a dashboard_stat_delta; fold_deltas() las suma
+# a dashboard_stat y las lecturas suman ambas tablas.
+# ---------------------------------------------------------------------------
+
+def _progress(value):
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def _scope_keys(prefix, progress):
+    keys = [prefix]
+    if progress == 100:
+        keys.append(f'{prefix}:completed')
+    elif progress == 0:
+        keys.append(f'{prefix}:not_started')
+    return keys
+
+def _project_keys(state):
+    progress = _progress(state['progress'])
+    keys = ['projects:total', f"projects:status:{state['status'] or 'Sin estado'}"]
+    keys += _scope_keys(f"creator:{state['created_by_id']}", progress)
+    return keys, progress
+
+def _analyst_keys(analyst_id, state):
+    progress = _progress(state['progress'])
+    return _scope_keys(f'analyst:{analyst_id}', progress), progress
+
+def _user_keys(state):
+    keys = ['users:total', 'users:active' if state['is_active'] else 'users:pending']
+    if state['role']:
+        keys.append(f"users:role:{state['role']}")
+    return keys
+
+class Deltas:
+    def __init__(self):
+        self.values = defaultdict(lambda: [0, 0])
+
+    def add(self, keys, sign, progress=0):
+        for key in keys:
+            self.values[key][0] += sign
+            self.values[key][1] += sign * progress
+
+    def nonzero(self):
+        return {k: v for k, v in self.values.items() if v[0] or v[1]}
+
+# ---------------------------------------------------------------------------
+# Mantenimiento incremental
+# ---------------------------------------------------------------------------
+
+PROJECT_FIELDS = ('progress', 'status', 'created_by_id')
+USER_FIELDS = ('is_active', 'role')
+
+def _state(obj, fields, old=False):
+    """Valores actuales del objeto o, con old=True, los previos al flush"""
+    state = {}
+    attrs = inspect(obj).attrs
+    for field in fields:
+        value = getattr(obj, field)
+        if old:
+            history = attrs[field].history
+            if history.deleted:
+                value = history.deleted[0]
+        state[field] = value
+    return state
+
+def _changed(obj, fields):
+    attrs = inspect(obj).attrs
+    return any(attrs[field].history.has_changes() for field in fields)
+
+def collect_deltas(session, connection):
+    """Calcular los cambios de contadores provocados por un flush"""
+    deltas = Deltas()
+    touched = {}                    # project_id -> (estado_anterior, estado_nuevo)
+    added = defaultdict(set)        # project_id -> analistas asignados en este flush
+    removed = defaultdict(set)      # project_id -> analistas desasignados en este flush
+
+    for obj in session.new:
+        if isinstance(obj, User):
+            deltas.add(_user_keys(_state(obj, USER_FIELDS)), +1)
+        elif isinstance(obj, Project):
+            touched[obj.id] = (None, _state(obj, PROJECT_FIELDS))
+        elif isinstance(obj, ProjectAnalyst):
+            added[obj.project_id].add(int(obj.analyst_id))
+
+    for obj in session.dirty:
+        if isinstance(obj, User) and _changed(obj, USER_FIELDS):
+            deltas.add(_user_keys(_state(obj, USER_FIELDS, old=True)), -1)
+            deltas.add(_user_keys(_state(obj, USER_FIELDS)), +1)
+        elif isinstance(obj, Project) and _changed(obj, PROJECT_FIELDS):
+            touched[obj.id] = (_state(obj, PROJECT_FIELDS, old=True), _state(obj, PROJECT_FIELDS))
+
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            deltas.add(_user_keys(_state(obj, USER_FIELDS, old=True)), -1)
+        elif isinstance(obj, Project):
+            touched[obj.id] = (_state(obj, PROJECT_FIELDS, old=True), None)
+        elif isinstance(obj, ProjectAnalyst):
+            removed[obj.project_id].add(int(obj.analyst_id))
+
+    for old, new in touched.values():
+        if old:
+            keys, progress = _project_keys(old)
+            deltas.add(keys, -1, progress)
+        if new:
+            keys, progress = _project_keys(new)
+            deltas.add(keys, +1, progress)
+
+    project_ids = set(touched) | set(added) | set(removed)
+    if not project_ids:
+        return deltas
+
+    # Estado actual (ya escrito por el flush) de asignaciones y proyectos no modificados
+    current = defaultdict(set)
+    rows = connection.execute(
+        select(ProjectAnalyst.project_id, ProjectAnalyst.analyst_id)
+        .where(ProjectAnalyst.project_id.in_(project_ids)))
+    for project_id, analyst_id in rows:
+        current[project_id].add(analyst_id)
+
+    untouched = project_ids - set(touched)
+    if untouched:
+        rows = connection.execute(
+            select(Project.id, Project.progress, Project.status, Project.created_by_id)
+            .where(Project.id.in_(untouched)))
+        for row in rows:
+            state = dict(zip(PROJECT_FIELDS, row[1:]))
+            touched[row[0]] = (state, state)
+
+    for project_id in project_ids:
+        old, new = touched.get(project_id, (None, None))
+        after = current[project_id]
+        before = (after - added[project_id]) | removed[project_id]
+        if old:
+            for analyst_id in before:
+                keys, progress = _analyst_keys(analyst_id, old)
+                deltas.add(keys, -1, progress)
+        if new:
+            for analyst_id in after:
+                keys, progress = _analyst_keys(analyst_id, new)
+                deltas.add(keys, +1, progress)
+    return deltas
+
+def new_projects_deltas(projects, assignments):
+    """Deltas de proyectos insertados sin el ORM (importación masiva).
+
+    `projects` son diccionarios con id, progress, status y created_by_id;
+    `assignments` son pares (project_id, analyst_id).
+    """
+    deltas = Deltas()
+    states = {}
+    for values in projects:
+        states[values['id']] = values
+        keys, progress = _project_keys(values)
+        deltas.add(keys, +1, progress)
+    for project_id, analyst_id in set(assignments):
+        keys, progress = _analyst_keys(analyst_id, states[project_id])
+        deltas.add(keys, +1, progress)
+    return deltas
+
+def _insert_ignoring_duplicates(connection):
+    if connection.dialect.name == 'sqlite':
+        return sqlite_insert(stat_table).on_conflict_do_nothing()
+    if connection.dialect.name == 'postgresql':
+        return postgresql_insert(stat_table).on_conflict_do_nothing()
+    return stat_table.insert()
+
+def apply_deltas(connection, deltas):
+    """Registrar los deltas como filas nuevas (sin actualizar filas compartidas)"""
+    values = deltas.nonzero()
+    if values:
+        connection.execute(delta_table.insert(), [
+            {'key': key, 'count': dc, 'progress_sum': dp} for key, (dc, dp) in sorted(values.items())])
+
+def _add_to_stats(connection, values):
+    """Sumar {clave: [cantidad, suma]} a la tabla de agregados (crea las claves que falten).
+
+    Las claves se actualizan en orden para que dos transacciones no se
+    bloqueen en orden inverso.
+    """
+    keys = sorted(key for key, (dc, dp) in values.items() if dc or dp)
+    if not keys:
+        return
+    existing = set(connection.execute(
+        select(stat_table.c.key).where(stat_table.c.key.in_(keys))).scalars())
+    missing = [{'key': key, 'count': 0, 'progress_sum': 0} for key in keys if key not in existing]
+    if missing:
+        # Otro proceso pudo crear la misma clave al mismo tiempo
+        connection.execute(_insert_ignoring_duplicates(connection), missing)
+    connection.execute(
+        stat_table.update()
+        .where(stat_table.c.key == bindparam('k'))
+        .values(count=stat_table.c.count + bindparam('dc'),
+                progress_sum=stat_table.c.progress_sum + bindparam('dp')),
+        [{'k': key, 'dc': values[key][0], 'dp': values[key][1]} for key in keys])
+
+def fold_deltas(connection):
+    """Pasar los deltas pendientes a dashboard_stat; devuelve cuántos se sumaron.
+
+    El DELETE ... RETURNING es la primera sentencia: dos procesos que
+    ejecutan esto a la vez nunca suman la misma fila.
+    """
+    values = defaultdict(lambda: [0, 0])
+    rows = connection.execute(delta_table.delete().returning(
+        delta_table.c.key, delta_table.c.count, delta_table.c.progress_sum)).all()
+    for key, dc, dp in rows:
+        values[key][0] += dc
+        values[key][1] += dp
+    _add_to_stats(connection, values)
+    return len(rows)
+
+def _before_flush(session, flush_context, instances):
+    # Cargar los campos de los objetos a eliminar mientras la fila aún existe
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            _state(obj, USER_FIELDS)
+        elif isinstance(obj, Project):
+            _state(obj, PROJECT_FIELDS)
+        elif isinstance(obj, ProjectAnalyst):
+            obj.project_id, obj.analyst_id
+
+def _after_flush(session, flush_context):
+    connection = session.connection()
+    apply_deltas(connection, collect_deltas(session, connection))
+
+# ---------------------------------------------------------------------------
+# Reconciliación completa
+# ---------------------------------------------------------------------------
+
+def compute_stats(connection):
+    """Recalcular todos los contadores desde las tablas base"""
+    deltas = Deltas()
+    for is_active, role, total in connection.execute(
+            select(User.is_active, User.role, func.count()).group_by(User.is_active, User.role)):
+        for key in _user_keys({'is_active': is_active, 'role': role}):
+            deltas.values[key][0] += total
+
+    rows = connection.execute(
+        select(Project.status, Project.created_by_id, Project.progress, func.count())
+        .group_by(Project.status, Project.created_by_id, Project.progress))
+    for status, created_by_id, progress, total in rows:
+        keys, progress = _project_keys({'status': status, 'created_by_id': created_by_id, 'progress': progress})
+        for key in keys:
+            deltas.values[key][0] += total
+            deltas.values[key][1] += total * progress
+
+    assignments = select(ProjectAnalyst.project_id, ProjectAnalyst.analyst_id).distinct().subquery()
+    rows = connection.execute(
+        select(assignments.c.analyst_id, Project.progress, func.count())
+        .join(Project, Project.id == assignments.c.project_id)
+        .group_by(assignments.c.analyst_id, Project.progress))
+    for analyst_id, progress, total in rows:
+        keys, progress = _analyst_keys(analyst_id, {'progress': progress})
+        for key in keys:
+            deltas.values[key][0] += total
+            deltas.values[key][1] += total * progress
+    return deltas.values
+
+def reconcile_stats(connection):
+    """Reemplazar los agregados por los valores recalculados; devuelve las claves corregidas.
+
+    Los escritores quedan en espera hasta el commit: un delta confirmado
+    entre fold_deltas() y el recálculo se contaría dos veces. En SQLite el
+    DELETE inicial ya toma el bloqueo de escritura de toda la base.
+    """
+    if connection.dialect.name == 'postgresql':
+        # EXCLUSIVE deja leer la tabla pero no insertar deltas; espera a las transacciones que ya lo hicieron
+        connection.execute(text(f'LOCK TABLE {delta_table.name} IN EXCLUSIVE MODE'))
+    fold_deltas(connection)
+    expected = compute_stats(connection)
+    stored = {key: [c, p] for key, c, p in connection.execute(select(stat_table))}
+    drift = [key for key in set(expected) | set(stored)
+             if expected.get(key, [0, 0]) != stored.get(key, [0, 0])]
+    if drift:
+        connection.execute(stat_table.delete().where(stat_table.c.key.in_(drift)))
+        rows = [{'key': key, 'count': expected[key][0], 'progress_sum': expected[key][1]}
+                for key in drift if key in expected and any(expected[key])]
+        if rows:
+            connection.execute(stat_table.insert(), rows)
+    return drift
+
+# ---------------------------------------------------------------------------
+# Lectura
+# ---------------------------------------------------------------------------
+
+def _stat_rows(condition):
+    """Filas (clave, cantidad, suma) de los agregados y de los deltas pendientes"""
+    return db.session.execute(union_all(
+        select(stat_table.c.key, stat_table.c.count, stat_table.c.progress_sum).where(condition(stat_table)),
+        select(delta_table.c.key, delta_table.c.count, delta_table.c.progress_sum).where(condition(delta_table))))
+
+def get_stats(keys):
+    """Contadores solicitados en una sola consulta: {clave: (cantidad, suma_avance)}"""
+    keys = list(keys)
+    values = {key: [0, 0] for key in keys}
+    for key, count, progress_sum in _stat_rows(lambda table: table.c.key.in_(keys)):
+        values[key][0] += count
+        values[key][1] += progress_sum
+    return {key: tuple(value) for key, value in values.items()}
+
+def get_stats_with_prefix(prefix):
+    values = defaultdict(lambda: [0, 0])
+    for key, count, progress_sum in _stat_rows(lambda table: table.c.key.startswith(prefix, autoescape=True)):
+        values[key[len(prefix):]][0] += count
+        values[key[len(prefix):]][1] += progress_sum
+    return {key: tuple(value) for key, value in values.items() if value[0]}
+
+def stat_count(key):
+    """Cantidad de una clave (agregado más deltas pendientes) como subconsulta escalar"""
+    stored = select(stat_table.c.count).where(stat_table.c.key == key).scalar_subquery()
+    pending = select(func.sum(delta_table.c.count)).where(delta_table.c.key == key).scalar_subquery()
+    return func.coalesce(stored, 0) + func.coalesce(pending, 0)
+
+def scope_summary(prefix):
+    """Resumen de un supervisor ('creator:<id>') o analista ('analyst:<id>')"""
+    stats = get_stats([prefix, f'{prefix}:completed', f'{prefix}:not_started'])
+    total, progress_sum = stats[prefix]
+    completed = stats[f'{prefix}:completed'][0]
+    return {
+        'total': total,
+        'completed': completed,
+        'not_started': stats[f'{prefix}:not_started'][0],
+        'in_progress': total - completed,
+        'avg_progress': (progress_sum / total) if total else 0,
+    }
+
+# ---------------------------------------------------------------------------
+# Extensión
+# ---------------------------------------------------------------------------
+
+class DashboardStats:
+    """Registra los eventos, suma los deltas pendientes y, si se configura, reconcilia"""
+    def __init__(self):
+        self.fold_job = PeriodicJob('stats-fold', self.fold)
+        self.reconcile_job = PeriodicJob('stats-reconcile', self.reconcile)
+
+    def init_app(self, app):
+        app.extensions['dashboard_stats'] = self
+        self.fold_job.init_app(app, app.config.get('STATS_FOLD_INTERVAL', 60))
+        self.reconcile_job.init_app(app, app.config.get('STATS_RECONCILE_INTERVAL', 0))
+
+    def fold(self, app):
+        with db.engine.begin() as connection:
+            fold_deltas(connection)
+
+    def reconcile(self, app):
+        with db.engine.begin() as connection:
+            drift = reconcile_stats(connection)
+        if drift:
+            app.logger.warning('Estadísticas corregidas: %s', ', '.join(sorted(drift)))
+
+dashboard_stats = DashboardStats()
+
+event.listen(db.session, 'before_flush', _before_flush)
+event.listen(db.session, 'after_flush', _after_flush)
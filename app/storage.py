@@ -0,0 +1,173 @@
+import hashlib
+import os
+import tempfile
+import time
+from sqlalchemy import select
+from app import db
+from app.utils.jobs import PeriodicJob
+
+class QuotaExceededError(Exception):
+    """El archivo supera el espacio disponible para el proyecto"""
+
+class BlobStore:
+    """Almacenamiento de evidencias direccionado por contenido (SHA-256).
+
+    Cada archivo se guarda una sola vez en blobs/ab/cd/<hash>; las filas de
+    Evidence que apuntan al mismo contenido comparten el archivo. Un blob sin
+    evidencias se borra solo cuando no se usó en los últimos
+    EVIDENCE_RELEASE_GRACE segundos; los que quedan así los recoge sweep().
+    """
+    def __init__(self):
+        self.root = None
+        self.chunk_size = 1024 * 1024
+        self.release_grace = 300
+        self.job = PeriodicJob('evidence-sweep', self._scheduled)
+
+    def init_app(self, app):
+        self.root = app.config.get('EVIDENCE_STORAGE_DIR') or os.path.join(app.instance_path, 'evidence')
+        self.chunk_size = app.config.get('EVIDENCE_CHUNK_SIZE', 1024 * 1024)
+        self.release_grace = app.config.get('EVIDENCE_RELEASE_GRACE', 300)
+        app.extensions['blob_store'] = self
+        self.job.init_app(app, app.config.get('EVIDENCE_SWEEP_INTERVAL', 3600))
+
+    @staticmethod
+    def relative_path(content_hash):
+        return os.path.join('blobs', content_hash[:2], content_hash[2:4], content_hash)
+
+    def _tmp_dir(self):
+        # Se crea en el primer uso, no al crear la app
+        directory = os.path.join(self.root, 'tmp')
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def path(self, content_hash):
+        return os.path.join(self.root, self.relative_path(content_hash))
+
+    def exists(self, content_hash):
+        return os.path.exists(self.path(content_hash))
+
+    def save_stream(self, stream, max_bytes=None):
+        """Copiar un flujo a disco por bloques calculando el hash al vuelo.
+
+        Devuelve (hash, tamaño, creado). Si el contenido ya existía, el
+        archivo temporal se descarta y no se ocupa espacio adicional.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir())
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise QuotaExceededError()
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            content_hash = digest.hexdigest()
+            final_path = self.path(content_hash)
+            try:
+                # Marca de uso reciente para que release() y sweep() no lo borren mientras se registra
+                os.utime(final_path)
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(tmp_path, final_path)
+                return content_hash, size, True
+            os.remove(tmp_path)
+            return content_hash, size, False
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def release(self, content_hashes):
+        """Eliminar los blobs que ya no referencia ninguna evidencia (llamar después del commit)"""
+        content_hashes = {h for h in content_hashes if h}
+        if content_hashes:
+            self._remove_unreferenced(content_hashes, time.time() - self.release_grace)
+
+    def sweep(self):
+        """Eliminar los blobs huérfanos y los temporales abandonados; devuelve la cantidad borrada.
+
+        Recoge lo que release() dejó dentro del período de gracia, las subidas
+        rechazadas por cuota y los archivos de procesos interrumpidos.
+        """
+        grace_limit = time.time() - self.release_grace
+        # Una subida lenta sigue escribiendo su temporal: solo se borran los de más de un día
+        tmp_limit = min(grace_limit, time.time() - 24 * 3600)
+        removed = 0
+        for entry in os.scandir(self._tmp_dir()):
+            try:
+                if not entry.is_file():
+                    continue
+                if entry.name.endswith('.sweep'):
+                    # Apartado por un barrido interrumpido: vuelve a su lugar y se evalúa como los demás.
+                    # El rename conserva mtime; ctime indica cuándo se apartó.
+                    if entry.stat().st_ctime >= grace_limit:
+                        continue
+                    content_hash = entry.name[:-len('.sweep')]
+                    os.makedirs(os.path.dirname(self.path(content_hash)), exist_ok=True)
+                    os.replace(entry.path, self.path(content_hash))
+                elif entry.stat().st_mtime < tmp_limit:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        candidates = []
+        blobs_dir = os.path.join(self.root, 'blobs')
+        for dirpath, _, filenames in os.walk(blobs_dir):
+            for filename in filenames:
+                try:
+                    if os.path.getmtime(os.path.join(dirpath, filename)) < grace_limit:
+                        candidates.append(filename)
+                except FileNotFoundError:
+                    pass
+        for start in range(0, len(candidates), 500):
+            removed += self._remove_unreferenced(candidates[start:start + 500], grace_limit)
+        return removed
+
+    def _referenced(self, content_hashes):
+        """Hashes con alguna evidencia; con una conexión propia para ver lo último confirmado"""
+        from app.models import Evidence
+        with db.engine.connect() as connection:
+            return set(connection.execute(
+                select(Evidence.content_hash).where(Evidence.content_hash.in_(list(content_hashes))).distinct()
+            ).scalars())
+
+    def _remove_unreferenced(self, content_hashes, grace_limit):
+        """Borrar los blobs sin evidencias que no se usaron desde grace_limit.
+
+        Cada archivo se aparta a tmp/ (rename atómico) y se vuelve a comprobar:
+        una subida que lo reutiliza mientras tanto lo marca o crea su propia
+        copia, y en ese caso se restaura. Como el contenido es el mismo,
+        restaurarlo sobre esa copia no cambia nada.
+        """
+        removed = 0
+        for content_hash in set(content_hashes) - self._referenced(content_hashes):
+            path = self.path(content_hash)
+            aside = os.path.join(self.root, 'tmp', f'{content_hash}.sweep')
+            try:
+                if os.path.getmtime(path) >= grace_limit:
+                    continue
+                os.replace(path, aside)
+            except FileNotFoundError:
+                continue
+            # Otro proceso pudo restaurarlo entre tanto
+            try:
+                if os.path.getmtime(aside) >= grace_limit or self._referenced([content_hash]):
+                    os.replace(aside, path)
+                else:
+                    os.remove(aside)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def _scheduled(self, app):
+        removed = self.sweep()
+        if removed:
+            app.logger.info('Evidencias: %s archivo(s) huérfano(s) eliminado(s)', removed)
+
+blob_store = BlobStore()
@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from app.metrics import cache_requests
+
+class VersionSignal:
+    """Señal de invalidación compartida entre procesos.
+
+    Cada invalidación reemplaza atómicamente un archivo en la carpeta
+    instance; los procesos comparan (inodo, mtime) con un simple stat, sin
+    consultar la base de datos.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.path = None
+
+    def init_app(self, app):
+        self.path = os.path.join(app.instance_path, self.filename)
+
+    def current(self):
+        try:
+            st = os.stat(self.path)
+        except (OSError, TypeError):
+            return None
+        return (st.st_ino, st.st_mtime_ns)
+
+    def bump(self):
+        if not self.path:
+            return
+        tmp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}'
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(tmp_path, 'w') as f:
+            f.write(str(time.time_ns()))
+        os.replace(tmp_path, self.path)
+
+class CatalogCache:
+    """Caché en memoria de los valores activos de los catálogos"""
+    def __init__(self):
+        self.signal = VersionSignal('catalog_cache.version')
+        self._lock = threading.Lock()
+        self._values = None
+        self._version = None
+
+    def init_app(self, app):
+        self.signal.init_app(app)
+        self._values = None
+        app.extensions['catalog_cache'] = self
+
+    def _load(self):
+        from app.models import Catalog
+        values = {}
+        rows = Catalog.query.with_entities(Catalog.name, Catalog.value) \
+            .filter_by(is_active=True).order_by(Catalog.id).all()
+        for name, value in rows:
+            values.setdefault(name, []).append(value)
+        return {name: tuple(items) for name, items in values.items()}
+
+    def options(self, catalog_name):
+        """Valores activos de un catálogo (se recarga solo si cambió la versión)"""
+        version = self.signal.current()
+        values = self._values
+        if values is None or version != self._version:
+            cache_requests.inc(cache='catalog', result='miss')
+            with self._lock:
+                if self._values is None or version != self._version:
+                    self._values = self._load()
+                    self._version = version
+                values = self._values
+        else:
+            cache_requests.inc(cache='catalog', result='hit')
+        return list(values.get(catalog_name, ()))
+
+    def invalidate(self):
+        """Invalidar en este proceso y avisar al resto; llamar después del commit"""
+        with self._lock:
+            self._values = None
+        self.signal.bump()
+
+catalog_cache = CatalogCache()
+
+class UserCache:
+    """Caché LRU con expiración de la identidad de los usuarios (id, nombre, rol).
+
+    Evita consultar la tabla de usuarios en cada petición autenticada. Los
+    cambios de usuarios invalidan la caché de todos los procesos con la
+    misma señal de archivo que los catálogos.
+    """
+    def __init__(self):
+        self.signal = VersionSignal('user_cache.version')
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # id -> (expira, usuario)
+        self._version = None
+        self.ttl = 300
+        self.max_size = 1024
+
+    def init_app(self, app):
+        self.signal.init_app(app)
+        self.ttl = app.config.get('USER_CACHE_TTL', 300)
+        self.max_size = app.config.get('USER_CACHE_SIZE', 1024)
+        with self._lock:
+            self._entries.clear()
+        app.extensions['user_cache'] = self
+
+    def _load(self, user_id):
+        from app.models import User, CachedUser
+        row = User.query.with_entities(User.id, User.username, User.role, User.is_active) \
+            .filter_by(id=user_id).first()
+        return CachedUser(*row) if row else None
+
+    def get(self, user_id):
+        """Usuario en caché o recién cargado; None si no existe"""
+        version = self.signal.current()
+        now = time.monotonic()
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                hit = entry[1]
+            else:
+                hit = None
+        if hit is not None:
+            cache_requests.inc(cache='user', result='hit')
+            return hit
+        cache_requests.inc(cache='user', result='miss')
+        user = self._load(user_id)
+        if user is not None and self.ttl and self.max_size:
+            with self._lock:
+                # Si hubo una invalidación mientras se cargaba, se descarta en la próxima lectura
+                self._entries[user_id] = (now + self.ttl, user)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self):
+        """Invalidar en este proceso y avisar al resto; llamar después del commit"""
+        with self._lock:
+            self._entries.clear()
+        self.signal.bump()
+
+user_cache = UserCache()
@@ -0,0 +1,86 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import request, session, make_response, render_template
+from flask_login import current_user
+from markupsafe import Markup
+
+def page_etag(*parts):
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+def _cacheable():
+    # Una página con mensajes flash pendientes se muestra una sola vez: no se valida
+    return request.method == 'GET' and '_flashes' not in session
+
+def conditional_page(validators):
+    """Responder 304 si la página no cambió desde la última visita del usuario.
+
+    `validators` recibe los mismos argumentos que la vista y devuelve una
+    tupla con lo que determina el contenido (o None para no validar). El
+    ETag combina esa tupla con la URL, el usuario y las versiones de las
+    cachés de usuarios y catálogos. Va después de los decoradores de acceso.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            parts = validators(*args, **kwargs) if _cacheable() else None
+            if parts is None:
+                return f(*args, **kwargs)
+            from app.utils.cache import catalog_cache, user_cache
+            etag = page_etag(request.endpoint, request.full_path, current_user.id, current_user.role,
+                             user_cache.signal.current(), catalog_cache.signal.current(), *parts)
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Cookie')
+            return response
+        return decorated_function
+    return decorator
+
+class FragmentCache:
+    """Caché LRU en memoria de fragmentos HTML ya renderizados.
+
+    Las claves incluyen la versión de los datos (p. ej. updated_at), así que
+    un fragmento desactualizado nunca se vuelve a usar; invalidate() solo
+    libera la memoria de inmediato.
+    """
+    def __init__(self, max_size=2000):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def init_app(self, app):
+        self.max_size = app.config.get('FRAGMENT_CACHE_SIZE', 2000)
+        self.clear()
+
+    def get_or_render(self, key, template, **context):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                return html
+        html = Markup(render_template(template, **context))
+        if self.max_size:
+            with self._lock:
+                self._entries[key] = html
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return html
+
+    def invalidate(self, project_id):
+        """Descartar los fragmentos de un proyecto (claves que empiezan con su id)"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == project_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+row_cache = FragmentCache()
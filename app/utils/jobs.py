@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+try:
+    import fcntl
+except ImportError:     # Windows: un solo proceso, cada tarea corre siempre
+    fcntl = None
+
+class PeriodicJob:
+    """Tarea periódica en un hilo del proceso.
+
+    No arranca al crear la app (ni en los comandos de la CLI): se inicia con
+    la primera petición de cada proceso, así los workers creados con fork
+    (gunicorn --preload) tienen su propio hilo. Entre los workers de una
+    misma carpeta instance, un archivo con la hora de la última ejecución
+    evita que cada uno repita la tarea en el mismo intervalo.
+    """
+    def __init__(self, name, task):
+        self.name = name
+        self.task = task
+        self.interval = 0
+        self._app = None
+        self._lock = threading.Lock()
+        self._timer = None
+        self._pid = None
+
+    def init_app(self, app, interval):
+        with self._lock:
+            if self._timer and self._pid == os.getpid():
+                self._timer.cancel()
+            self._timer = None
+            self._pid = None
+            self._app = app
+            self.interval = interval or 0
+        if self.interval:
+            app.before_request(self.ensure_started)
+
+    def ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid or not self.interval:
+            return
+        with self._lock:
+            if self._pid != pid:
+                self._pid = pid
+                self._schedule()
+
+    def _schedule(self):
+        self._timer = threading.Timer(self.interval, self._run)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _run(self):
+        app = self._app
+        with app.app_context():
+            try:
+                if self._claim(app):
+                    self.task(app)
+            except Exception:
+                app.logger.exception('Error en la tarea periódica %s', self.name)
+        with self._lock:
+            if self._app is app and self._pid == os.getpid():
+                self._schedule()
+
+    def _claim(self, app):
+        """True si ningún otro proceso ejecutó la tarea en este intervalo"""
+        if fcntl is None:
+            return True
+        directory = os.path.join(app.instance_path, 'jobs')
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f'{self.name}.last'), 'a+') as stamp:
+            fcntl.flock(stamp, fcntl.LOCK_EX)
+            stamp.seek(0)
+            try:
+                last = float(stamp.read() or 0)
+            except ValueError:
+                last = 0
+            now = time.time()
+            # Margen para que las diferencias de fase entre workers no salteen un intervalo
+            if now - last < self.interval * 0.9:
+                return False
+            stamp.seek(0)
+            stamp.truncate()
+            stamp.write(repr(now))
+            return True
@@ -0,0 +1,194 @@
+"""Generador determinista de datos de prueba en volumen.
+
+Con la escala por defecto crea 500 usuarios (50 supervisores y 450
+analistas), 50 000 proyectos, 200 000 asignaciones y 2 000 000 de
+registros de historial, con inserciones en bloque. El historial de cada
+proyecto es coherente con su estado final (avance, estado y casos), y
+las mismas opciones producen siempre los mismos datos. Al terminar se
+recalculan los contadores de los dashboards.
+
+    python bench/data.py --database-url sqlite:///bench.db [--scale 1.0] [--seed 1]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select, text
+from werkzeug.security import generate_password_hash
+from app import create_app, db
+from app.models import User, Project, ProjectAnalyst, Log
+from app.seed import DEFAULT_CATALOGS
+
+PASSWORD = 'benchmark-password'
+
+VOLUMES = {'users': 500, 'projects': 50000, 'assignments': 200000, 'logs': 2000000}
+LABELS = {'users': 'usuarios', 'projects': 'proyectos', 'assignments': 'asignaciones', 'logs': 'registros de historial'}
+SUPERVISOR_SHARE = 0.1
+CHUNK = 1000   # proyectos por lote (con sus asignaciones e historial)
+
+WORDS = ['migración', 'portal', 'clientes', 'pagos', 'reportes', 'integración', 'móvil', 'batch', 'seguridad',
+         'auditoría', 'core', 'bancario', 'tarjetas', 'créditos', 'api', 'facturación', 'nómina', 'legal']
+
+# Fecha fija: los datos no dependen del día en que se generan
+END = datetime(2026, 1, 1)
+SPAN = timedelta(days=730)
+
+def volumes(scale):
+    return {name: max(1, int(count * scale)) for name, count in VOLUMES.items()}
+
+def describe(counts):
+    return ', '.join(f'{count} {LABELS[name]}' for name, count in counts.items())
+
+def supervisor_name(i):
+    return f'bench_sup{i}'
+
+def analyst_name(i):
+    return f'bench_ana{i}'
+
+def is_generated(session):
+    """True si la base ya tiene los datos del generador"""
+    return session.query(User.id).filter_by(username=supervisor_name(0)).first() is not None
+
+def _history(rnd, created_at, entries, statuses):
+    """Cambios de un proyecto desde su estado inicial: (estado final, registros sin ids)"""
+    state = {'progress': 0, 'status': statuses[0], 'test_cases': 0, 'executed_cases': 0}
+    changes = []
+    for when in sorted(created_at + (END - created_at) * rnd.random() for _ in range(entries)):
+        roll = rnd.random()
+        if roll < 0.5:
+            field, value = 'progress', min(100, state['progress'] + rnd.randint(1, 10))
+        elif roll < 0.7:
+            field, value = 'status', rnd.choice(statuses)
+        elif roll < 0.85 or state['executed_cases'] >= state['test_cases']:
+            field, value = 'test_cases', state['test_cases'] + rnd.randint(1, 20)
+        else:
+            field, value = 'executed_cases', min(state['test_cases'], state['executed_cases'] + rnd.randint(1, 10))
+        if value == state[field]:
+            field, value = 'test_cases', state['test_cases'] + 1
+        changes.append((field, state[field], value, when))
+        state[field] = value
+    return state, changes
+
+def _insert_users(connection, rnd, count):
+    pwhash = generate_password_hash(PASSWORD)
+    supervisors = max(1, int(count * SUPERVISOR_SHARE))
+    rows = []
+    for i in range(count):
+        username = supervisor_name(i) if i < supervisors else analyst_name(i - supervisors)
+        rows.append({
+            'username': username,
+            'email': f'{username}@bench.qa',
+            'password_hash': pwhash,
+            'role': 'Supervisor' if i < supervisors else 'Analista',
+            'is_active': True,
+            'created_at': END - SPAN - timedelta(days=rnd.randint(1, 60)),
+        })
+    connection.execute(User.__table__.insert(), rows)
+    ids = dict(connection.execute(
+        select(User.username, User.id).where(User.username.in_([row['username'] for row in rows]))).all())
+    return ([ids[supervisor_name(i)] for i in range(supervisors)],
+            [ids[analyst_name(i)] for i in range(count - supervisors)])
+
+def _reset_sequence(connection):
+    # En PostgreSQL los ids explícitos de los proyectos no avanzan la secuencia
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text("SELECT setval(pg_get_serial_sequence('project', 'id'), (SELECT max(id) FROM project))"))
+
+def generate(session, scale=1.0, seed=1, report=None):
+    """Insertar los datos del generador; devuelve la cantidad de filas por tabla"""
+    counts = volumes(scale)
+    rnd = random.Random(seed)
+    statuses = DEFAULT_CATALOGS['status']
+    priorities = DEFAULT_CATALOGS['priority']
+    connection = session.connection()
+
+    supervisors, analysts = _insert_users(connection, rnd, counts['users'])
+    per_project = min(counts['assignments'] // counts['projects'], len(analysts))
+    extra_assignments = counts['assignments'] - per_project * counts['projects']
+    logs_per_project, extra_logs = divmod(counts['logs'], counts['projects'])
+    first_id = (connection.execute(select(func.max(Project.id))).scalar() or 0) + 1
+
+    inserted = {'users': counts['users'], 'projects': 0, 'assignments': 0, 'logs': 0}
+    for start in range(0, counts['projects'], CHUNK):
+        projects, assignments, logs = [], [], []
+        for i in range(start, min(start + CHUNK, counts['projects'])):
+            project_id = first_id + i
+            created_at = END - SPAN + SPAN * rnd.random() * 0.9
+            creator = supervisors[i % len(supervisors)]
+            team = rnd.sample(analysts, min(len(analysts), per_project + (1 if i < extra_assignments else 0)))
+            state, changes = _history(rnd, created_at, logs_per_project + (1 if i < extra_logs else 0), statuses)
+            start_date = (created_at + timedelta(days=rnd.randint(0, 30))).date()
+            projects.append(dict(
+                state,
+                id=project_id,
+                gsf_code=f'GSF-{i:06d}',
+                invgate_code=f'INV-{rnd.randint(1, 999999)}',
+                name=' '.join(rnd.sample(WORDS, 3)),
+                priority=rnd.choice(priorities),
+                estimated_hours=rnd.randint(8, 400),
+                start_date=start_date,
+                end_date=start_date + timedelta(days=rnd.randint(15, 180)),
+                observation=' '.join(rnd.sample(WORDS, 6)) if i % 3 == 0 else None,
+                created_by_id=creator,
+                created_at=created_at,
+                updated_at=changes[-1][3] if changes else created_at,
+            ))
+            assignments.extend({'project_id': project_id, 'analyst_id': analyst_id, 'assigned_at': created_at}
+                               for analyst_id in team)
+            actors = team or [creator]
+            logs.extend({
+                'project_id': project_id,
+                'user_id': rnd.choice(actors),
+                'changed_field': field,
+                'old_value': str(old),
+                'new_value': str(new),
+                'changed_at': when,
+            } for field, old, new, when in changes)
+        connection.execute(Project.__table__.insert(), projects)
+        if assignments:
+            connection.execute(ProjectAnalyst.__table__.insert(), assignments)
+        if logs:
+            connection.execute(Log.__table__.insert(), logs)
+        inserted['projects'] += len(projects)
+        inserted['assignments'] += len(assignments)
+        inserted['logs'] += len(logs)
+        if report:
+            report(inserted)
+    _reset_sequence(connection)
+
+    from app.stats import reconcile_stats
+    reconcile_stats(connection)
+    session.commit()
+    return inserted
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplica todos los volúmenes')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': args.database_url})
+    with app.app_context():
+        from app.seed import init_db
+        init_db()
+        if is_generated(db.session):
+            print('La base ya tiene datos generados')
+            return
+        start = time.perf_counter()
+
+        def report(inserted):
+            print(f'\r{inserted["projects"]} proyectos, {inserted["logs"]} registros de historial', end='', flush=True)
+
+        inserted = generate(db.session, args.scale, args.seed, report)
+        print(f'\n{describe(inserted)} '
+              f'en {time.perf_counter() - start:.1f} s')
+        db.engine.dispose()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Inicios de sesión por segundo y por núcleo.
+
+Para cada método de hash mide la verificación aislada (un hilo = un
+núcleo) y el flujo completo de POST /login con varios hilos concurrentes,
+con y sin el pool acotado de verificación.
+
+    python bench/login.py [--methods pbkdf2:sha256:600000 pbkdf2:sha256:260000]
+                          [--threads 8] [--seconds 5] [--workers 4]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash, check_password_hash
+from app import create_app, db
+from app.models import User
+
+PASSWORD = 'benchmark-password'
+
+def cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def verify_rate(method, seconds):
+    pwhash = generate_password_hash(PASSWORD, method=method)
+    count, deadline = 0, time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        check_password_hash(pwhash, PASSWORD)
+        count += 1
+    return count / seconds
+
+def login_rate(method, threads, seconds, workers, users=200):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(tmp, "bench.db")}',
+            'PASSWORD_HASH_METHOD': method,
+            'PASSWORD_HASH_WORKERS': workers,
+        })
+        with app.app_context():
+            from app.seed import init_db
+            init_db()
+            pwhash = generate_password_hash(PASSWORD, method=method)
+            db.session.execute(insert(User), [
+                {'username': f'bench{i}', 'email': f'bench{i}@qa.com', 'password_hash': pwhash,
+                 'role': 'Analista', 'is_active': True} for i in range(users)])
+            db.session.commit()
+
+        counts = [0] * threads
+        failures = [0] * threads
+        deadline = time.perf_counter() + seconds
+
+        def run(n):
+            client = app.test_client()
+            i = n
+            while time.perf_counter() < deadline:
+                response = client.post('/login', data={'username': f'bench{i % users}', 'password': PASSWORD})
+                if response.status_code == 302:
+                    counts[n] += 1
+                    client.get('/logout')
+                else:
+                    failures[n] += 1
+                i += threads
+
+        pool = [threading.Thread(target=run, args=(n,)) for n in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        with app.app_context():
+            db.engine.dispose()
+        return sum(counts) / seconds, sum(failures)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--methods', nargs='+', default=['pbkdf2:sha256:600000', 'pbkdf2:sha256:260000',
+                                                         'scrypt:32768:8:1'])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--workers', type=int, default=cpu_count())
+    args = parser.parse_args()
+
+    cores = cpu_count()
+    usable = min(cores, args.threads)
+    print(f'núcleos: {cores}  hilos: {args.threads}  pool: {args.workers}')
+    print(f'{"método":<24} {"verif/s/núcleo":>15} {"login/s":>9} {"login/s/núcleo":>15} '
+          f'{"login/s (pool)":>15} {"rechazos":>9}')
+    for method in args.methods:
+        verify = verify_rate(method, min(args.seconds, 2))
+        inline, _ = login_rate(method, args.threads, args.seconds, workers=0)
+        pooled, rejected = login_rate(method, args.threads, args.seconds, workers=args.workers)
+        print(f'{method:<24} {verify:>15.1f} {inline:>9.1f} {inline / usable:>15.1f} '
+              f'{pooled:>15.1f} {rejected:>9}')
+
+if __name__ == '__main__':
+    main()
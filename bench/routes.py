@@ -0,0 +1,234 @@
+"""Latencia y consultas por petición de las rutas principales bajo carga.
+
+Cada escenario (listado, detalle, dashboards, actualización de avance e
+inicio de sesión) se ejecuta durante --seconds en --processes procesos a
+la vez, cada uno con su propia app y clientes de prueba con sesión
+iniciada. Informa p50/p95/p99, consultas por petición y peticiones por
+segundo, y los compara con una línea base guardada: el código de salida
+es 1 si algún escenario empeoró.
+
+Sin --database-url se genera una base SQLite temporal con bench/data.py
+(--scale reduce los volúmenes); con una base ya generada se reutiliza.
+
+    python bench/routes.py [--database-url URL] [--scale 1.0] [--processes 4] [--seconds 5]
+                           [--scenarios project_detail update_progress]
+                           [--baseline bench/baseline.json] [--save-baseline] [--tolerance 0.2]
+"""
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from app import create_app, db
+from app.models import User, Project, ProjectAnalyst
+from bench.data import PASSWORD, analyst_name, supervisor_name, describe, generate, is_generated
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+ADMIN_PASSWORD = 'admin123'
+SAMPLE = 200   # proyectos de cada usuario que recorren los escenarios
+
+# nombre: (rol de la sesión, función (contexto, i) -> (método, ruta, datos), estado esperado)
+SCENARIOS = {
+    'auth.login': (None, lambda ctx, i: ('POST', '/login', {'username': ctx.analyst_login(i), 'password': PASSWORD}), 302),
+    'projects_list:admin': ('admin', lambda ctx, i: ('GET', '/projects', None), 200),
+    'projects_list:supervisor': ('supervisor', lambda ctx, i: ('GET', '/projects', None), 200),
+    'projects_list:analista': ('analyst', lambda ctx, i: ('GET', '/projects', None), 200),
+    'project_detail': ('supervisor', lambda ctx, i: ('GET', f'/projects/{ctx.pick("supervisor", i)}', None), 200),
+    'admin_dashboard': ('admin', lambda ctx, i: ('GET', '/admin/dashboard', None), 200),
+    'supervisor_dashboard': ('supervisor', lambda ctx, i: ('GET', '/supervisor/dashboard', None), 200),
+    'analyst_dashboard': ('analyst', lambda ctx, i: ('GET', '/analyst/dashboard', None), 200),
+    'update_progress': ('analyst', lambda ctx, i: (
+        'POST', f'/projects/{ctx.pick("analyst", i)}/update-progress', {'progress': (i * 37 + ctx.worker) % 101}), 302),
+}
+
+class Context:
+    """App, clientes con sesión iniciada y proyectos de cada usuario en un proceso"""
+    def __init__(self, database_url, worker):
+        self.worker = worker
+        self.queries = 0
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': database_url, 'METRICS_SHARED': False})
+        # El login es lento a propósito (hash de contraseña): no llenar la salida de avisos
+        logging.getLogger('app.profiler').setLevel(logging.ERROR)
+        with self.app.app_context():
+            supervisors = User.query.filter(User.username.like('bench_sup%')).count()
+            analysts = User.query.filter(User.username.like('bench_ana%')).count()
+            self.usernames = {
+                'admin': 'admin',
+                'supervisor': supervisor_name(worker % supervisors),
+                'analyst': analyst_name(worker % analysts),
+            }
+            self.analysts = analysts
+            ids = dict(User.query.with_entities(User.username, User.id)
+                       .filter(User.username.in_(list(self.usernames.values()))).all())
+            self.projects = {
+                'supervisor': [row.id for row in Project.query.with_entities(Project.id)
+                               .filter_by(created_by_id=ids[self.usernames['supervisor']]).limit(SAMPLE)],
+                'analyst': [row.project_id for row in ProjectAnalyst.query.with_entities(ProjectAnalyst.project_id)
+                            .filter_by(analyst_id=ids[self.usernames['analyst']]).limit(SAMPLE)],
+            }
+            event.listen(db.engine, 'before_cursor_execute', self._count)
+        self.clients = {}
+        for role, username in self.usernames.items():
+            client = self.app.test_client()
+            password = ADMIN_PASSWORD if role == 'admin' else PASSWORD
+            response = client.post('/login', data={'username': username, 'password': password})
+            if response.status_code != 302:
+                raise RuntimeError(f'No se pudo iniciar sesión como {username}')
+            # La primera página después del login trae el mensaje de bienvenida
+            client.get('/')
+            self.clients[role] = client
+        self.anonymous = self.app.test_client()
+
+    def _count(self, *args):
+        self.queries += 1
+
+    def pick(self, role, i):
+        return self.projects[role][i % len(self.projects[role])]
+
+    def analyst_login(self, i):
+        return analyst_name((self.worker + i * 7) % self.analysts)
+
+    def request(self, name, i):
+        """Ejecutar una petición del escenario: (ms, consultas, respuesta esperada)"""
+        role, build, expected = SCENARIOS[name]
+        client = self.clients[role] if role else self.anonymous
+        method, path, data = build(self, i)
+        self.queries = 0
+        start = time.perf_counter()
+        response = client.open(path, method=method, data=data)
+        elapsed = (time.perf_counter() - start) * 1000
+        queries = self.queries
+        if role is None and response.status_code == 302:
+            client.get('/logout')
+        return elapsed, queries, response.status_code == expected
+
+_context = None
+
+def _init_worker(database_url, counter):
+    global _context
+    with counter.get_lock():
+        worker = counter.value
+        counter.value += 1
+    _context = Context(database_url, worker)
+
+def _run(args):
+    name, seconds = args
+    _context.request(name, 0)   # calentamiento
+    timings, queries, errors = [], [], 0
+    i, deadline = 1, time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        elapsed, count, ok = _context.request(name, i)
+        timings.append(elapsed)
+        queries.append(count)
+        errors += not ok
+        i += 1
+    return timings, queries, errors
+
+def percentile(values, p):
+    return values[max(0, math.ceil(p * len(values)) - 1)]
+
+def summarize(runs, seconds):
+    timings = sorted(t for run in runs for t in run[0])
+    queries = [q for run in runs for q in run[1]]
+    return {
+        'requests': len(timings),
+        'errors': sum(run[2] for run in runs),
+        'p50_ms': percentile(timings, 0.50),
+        'p95_ms': percentile(timings, 0.95),
+        'p99_ms': percentile(timings, 0.99),
+        'queries': statistics.mean(queries),
+        'rps': len(timings) / seconds,
+    }
+
+def run_scenarios(database_url, names, processes, seconds):
+    """{escenario: resumen}; los procesos ejecutan juntos un escenario a la vez"""
+    counter = multiprocessing.Value('i', 0)
+    results = {}
+    with multiprocessing.Pool(processes, _init_worker, (database_url, counter)) as pool:
+        for name in names:
+            results[name] = summarize(pool.map(_run, [(name, seconds)] * processes), seconds)
+            print(f'{name:<26} {format_result(results[name])}', flush=True)
+    return results
+
+def format_result(result):
+    return (f'{result["p50_ms"]:>8.2f} {result["p95_ms"]:>8.2f} {result["p99_ms"]:>8.2f} '
+            f'{result["queries"]:>9.1f} {result["rps"]:>8.1f} {result["errors"]:>7}')
+
+def compare(results, baseline, tolerance):
+    """Escenarios que empeoraron respecto de la línea base: [(escenario, motivo)]"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        # Las consultas por petición son deterministas; la latencia admite ruido
+        if result['queries'] > base['queries'] + 0.5:
+            regressions.append((name, f'consultas {base["queries"]:.1f} → {result["queries"]:.1f}'))
+        if result['p95_ms'] > base['p95_ms'] * (1 + tolerance) and result['p95_ms'] - base['p95_ms'] > 1:
+            regressions.append((name, f'p95 {base["p95_ms"]:.2f} → {result["p95_ms"]:.2f} ms'))
+        if result['errors'] > base.get('errors', 0):
+            regressions.append((name, f'{result["errors"]} respuestas inesperadas'))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', help='Por defecto, un SQLite temporal generado con bench/data.py')
+    parser.add_argument('--scale', type=float, default=1.0, help='Volumen de la base generada (1.0 = 50 000 proyectos)')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5, help='Duración de cada escenario')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='Guardar estos resultados como línea base')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Aumento de p95 aceptado (0.2 = 20 %%)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+        with app.app_context():
+            from app.seed import init_db
+            init_db()
+            if not is_generated(db.session):
+                start = time.perf_counter()
+                inserted = generate(db.session, args.scale)
+                print(f'Datos generados ({describe(inserted)}) '
+                      f'en {time.perf_counter() - start:.1f} s')
+            dialect = db.engine.dialect.name
+            db.engine.dispose()
+
+        print(f'{args.processes} procesos, {args.seconds:g} s por escenario, {dialect}')
+        print(f'{"escenario":<26} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"consultas":>9} {"pet/s":>8} {"errores":>7}')
+        results = run_scenarios(url, args.scenarios, args.processes, args.seconds)
+
+    meta = {'database': dialect, 'processes': args.processes, 'scale': args.scale}
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2, ensure_ascii=False)
+        print(f'Línea base guardada en {args.baseline}')
+        return 0
+    if not os.path.exists(args.baseline):
+        print('Sin línea base para comparar (usar --save-baseline)')
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('meta') != meta:
+        print(f'Aviso: la línea base se midió con {baseline.get("meta")}')
+    regressions = compare(results, baseline.get('results', {}), args.tolerance)
+    for name, reason in regressions:
+        print(f'REGRESIÓN {name}: {reason}')
+    if not regressions:
+        print('Sin regresiones respecto de la línea base')
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Latencia de la búsqueda de proyectos.
+
+Carga N proyectos con palabras al azar (insertados en bloque, el índice de
+texto completo se mantiene con los triggers o la columna generada) y mide
+search_projects() para búsquedas por código, por palabra y genéricas, como
+admin y como supervisor.
+
+    python bench/search.py [--projects 100000] [--runs 30] [--database-url URL]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from app import create_app, db
+from app.models import User, Project
+
+WORDS = ['migración', 'portal', 'clientes', 'pagos', 'reportes', 'integración', 'móvil', 'batch', 'seguridad',
+         'auditoría', 'core', 'bancario', 'tarjetas', 'créditos', 'api', 'facturación', 'nómina', 'legal']
+
+QUERIES = [
+    ('código exacto', 'GSF-004217'),
+    ('prefijo de código', 'GSF-0421'),
+    ('dos palabras', 'portal pagos'),
+    ('palabra sin acento', 'facturacion'),
+    ('prefijo genérico', 'gsf'),
+]
+
+def load(projects, seed=1):
+    rnd = random.Random(seed)
+    supervisors = []
+    for i in range(10):
+        user = User(username=f'bench_sup{i}', email=f'bench_sup{i}@example.com', role='Supervisor', is_active=True,
+                    password_hash='x')
+        db.session.add(user)
+        supervisors.append(user)
+    db.session.flush()
+    rows = [{
+        'gsf_code': f'GSF-{i:06d}',
+        'invgate_code': f'INV-{rnd.randint(1, 999999)}',
+        'name': ' '.join(rnd.sample(WORDS, 3)),
+        'observation': ' '.join(rnd.sample(WORDS, 6)) if i % 3 == 0 else None,
+        'status': 'Pendiente',
+        'progress': 0,
+        'created_by_id': supervisors[i % len(supervisors)].id,
+    } for i in range(projects)]
+    for start in range(0, len(rows), 5000):
+        db.session.execute(insert(Project), rows[start:start + 5000])
+    db.session.commit()
+    return supervisors[0]
+
+def measure(search, user, q, runs):
+    search(user, q)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        results = search(user, q)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1], len(results)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--projects', type=int, default=100000)
+    parser.add_argument('--runs', type=int, default=30)
+    parser.add_argument('--database-url', help='Por defecto, un SQLite temporal')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+        with app.app_context():
+            from app.seed import init_db
+            from app.search import search_projects
+            init_db()
+            start = time.perf_counter()
+            supervisor = load(args.projects)
+            print(f'{args.projects} proyectos cargados en {time.perf_counter() - start:.1f} s')
+            admin = User.query.filter_by(username='admin').one()
+
+            print(f'{"búsqueda":<20} {"usuario":<10} {"mediana ms":>10} {"p95 ms":>8} {"resultados":>10}')
+            for name, q in QUERIES:
+                for role, user in (('admin', admin), ('supervisor', supervisor)):
+                    median, p95, count = measure(search_projects, user, q, args.runs)
+                    print(f'{name:<20} {role:<10} {median:>10.2f} {p95:>8.2f} {count:>10}')
+            db.engine.dispose()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Tiempo de arranque de la aplicación.
+
+Compara create_app() (sin acceso a la base) con el arranque anterior, en el
+que cada worker creaba el esquema y consultaba uno a uno los catálogos por
+defecto, y con `init_db()`, que ahora se ejecuta una sola vez con
+`flask init-db`.
+
+    python bench/startup.py [--runs 50] [--database-url URL]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from app import create_app, db
+
+def legacy_init():
+    """Arranque anterior: create_all/migraciones y una consulta por valor de catálogo"""
+    from app.migrations import upgrade
+    from app.models import User, Catalog
+    from app.seed import DEFAULT_CATALOGS
+    upgrade()
+    User.query.filter_by(username='admin').first()
+    for name, values in DEFAULT_CATALOGS.items():
+        for value in values:
+            Catalog.query.filter_by(name=name, value=value).first()
+    db.session.commit()
+
+def current_init():
+    from app.seed import init_db
+    init_db()
+
+def measure(runs, config, init=None):
+    timings, queries = [], []
+    for _ in range(runs):
+        count = [0]
+        start = time.perf_counter()
+        app = create_app(config)
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', lambda *args: count.__setitem__(0, count[0] + 1))
+            if init:
+                init()
+            db.engine.dispose()
+        timings.append((time.perf_counter() - start) * 1000)
+        queries.append(count[0])
+    timings.sort()
+    return {
+        'median_ms': statistics.median(timings),
+        'p95_ms': timings[int(len(timings) * 0.95) - 1],
+        'queries': statistics.median(queries),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--database-url', help='Por defecto, un SQLite temporal')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        config = {'SQLALCHEMY_DATABASE_URI': url}
+        # Base ya inicializada, como en un despliegue normal
+        app = create_app(config)
+        with app.app_context():
+            from app.seed import init_db
+            init_db()
+            db.engine.dispose()
+
+        results = [
+            ('create_app() con inicialización (antes)', measure(args.runs, config, legacy_init)),
+            ('create_app() + init_db()', measure(args.runs, config, current_init)),
+            ('create_app() (ahora)', measure(args.runs, config)),
+        ]
+
+    print(f'{"escenario":<40} {"mediana ms":>10} {"p95 ms":>8} {"consultas":>9}')
+    for name, result in results:
+        print(f'{name:<40} {result["median_ms"]:>10.2f} {result["p95_ms"]:>8.2f} {result["queries"]:>9.0f}')
+
+if __name__ == '__main__':
+    main()
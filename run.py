@@ -1,6 +1,10 @@
-from app import create_app
-
-app = create_app()
-
-if __name__ == '__main__':
+from app import create_app
+
+app = create_app()
+
+if __name__ == '__main__':
+    # Servidor de desarrollo: dejar la base lista (en producción usar `flask init-db`)
+    with app.app_context():
+        from app.seed import init_db
+        init_db()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,58 @@
+import os
+import pytest
+from flask import g
+from sqlalchemy import text
+from app import create_app, db
+
+# URL de una base PostgreSQL descartable; sin ella solo se prueba con SQLite
+POSTGRES_URL = os.environ.get('QA_TEST_POSTGRES_URL')
+
+# Consultas por petición en las vistas más usadas; no dependen de la cantidad
+# de proyectos, así que superarlas indica una consulta N+1
+QUERY_BUDGETS = {
+    'projects.projects_list': 7,
+    'projects.project_detail': 12,
+    'projects.update_progress': 8,
+    'main.admin_dashboard': 5,
+    'main.supervisor_dashboard': 5,
+    'main.analyst_dashboard': 7,
+}
+
+@pytest.fixture(params=['sqlite', 'postgresql'])
+def database_url(request, tmp_path):
+    if request.param == 'sqlite':
+        return f'sqlite:///{tmp_path / "qa_test.db"}'
+    if not POSTGRES_URL:
+        pytest.skip('QA_TEST_POSTGRES_URL no está definida')
+    return POSTGRES_URL
+
+@pytest.fixture
+def app(database_url, tmp_path):
+    """App con el esquema recién creado y los datos por defecto"""
+    # Carpeta instance propia: versiones de caché, notificaciones, métricas y evidencias no tocan el repositorio
+    app = create_app({
+        'TESTING': True,
+        'SECRET_KEY': 'test',
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'METRICS_ENABLED': False,
+        'QUERY_BUDGETS': dict(QUERY_BUDGETS),
+    }, instance_path=str(tmp_path / 'instance'))
+    # Las peticiones reutilizan el contexto de la app de abajo: sin esto, el usuario que
+    # Flask-Login deja en g pasaría de un cliente de prueba al siguiente
+    app.teardown_request(lambda exc: g.pop('_login_user', None))
+    with app.app_context():
+        if db.engine.dialect.name == 'postgresql':
+            with db.engine.begin() as connection:
+                connection.execute(text('DROP SCHEMA public CASCADE'))
+                connection.execute(text('CREATE SCHEMA public'))
+        from app.seed import init_db
+        init_db()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def admin_client(app):
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    return client
@@ -0,0 +1,48 @@
+import logging
+import os
+import time
+from datetime import datetime
+import pytest
+from app import db
+from app.audit import AuditBatcher
+from app.models import Log
+from tests.test_history import create_project
+
+def test_batcher_thread_is_started_per_process(app, admin_client):
+    project_id = create_project(admin_client)
+    def entries(value):
+        return [{'project_id': project_id, 'user_id': 1, 'changed_field': 'avance', 'old_value': '',
+                 'new_value': value, 'changed_at': datetime.utcnow()}]
+
+    batcher = AuditBatcher(app, max_queue=10, flush_interval=0.05)
+    assert batcher._thread is None
+    batcher.put_many(entries('10'))
+    first_thread, first_queue = batcher._thread, batcher.queue
+    assert first_thread.is_alive()
+    while not first_queue.empty():
+        time.sleep(0.01)
+
+    # Lo que ve un worker después del fork: otro pid, sin el hilo del padre
+    batcher._pid = -1
+    batcher.put_many(entries('20'))
+    assert batcher._thread is not first_thread and batcher.queue is not first_queue
+    batcher.stop()
+    first_thread.join(5)
+    values = [value for (value,) in Log.query.filter_by(changed_field='avance').with_entities(Log.new_value)]
+    assert sorted(values) == ['10', '20']
+
+def test_entries_of_deleted_projects_are_dropped(app, admin_client, caplog):
+    if db.engine.dialect.name == 'sqlite':
+        pytest.skip('SQLite no verifica las claves foráneas')
+    project_id = create_project(admin_client)
+    def entry(project_id, value):
+        return {'project_id': project_id, 'user_id': 1, 'changed_field': 'avance', 'old_value': '',
+                'new_value': value, 'changed_at': datetime.utcnow()}
+
+    batcher = AuditBatcher(app)
+    with caplog.at_level(logging.WARNING):
+        batcher._write([entry(project_id, '10'), entry(project_id + 1, '20'), entry(project_id, '30')])
+    values = [value for (value,) in Log.query.filter_by(changed_field='avance').with_entities(Log.new_value)]
+    assert sorted(values) == ['10', '30']
+    assert not os.path.exists(batcher.spool_path)
+    assert 'descartado' in caplog.text
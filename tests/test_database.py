@@ -0,0 +1,38 @@
+from sqlalchemy import text
+from app import db
+from app.database import engine_options, normalize_database_url
+
+def test_normalize_database_url():
+    assert normalize_database_url('postgres://u:p@host/qa') == 'postgresql+psycopg://u:p@host/qa'
+    assert normalize_database_url('postgresql://u:p@host/qa') == 'postgresql+psycopg://u:p@host/qa'
+    assert normalize_database_url('postgresql+psycopg2://u:p@host/qa') == 'postgresql+psycopg2://u:p@host/qa'
+    assert normalize_database_url('sqlite:///qa.db') == 'sqlite:///qa.db'
+
+def test_engine_options_per_backend():
+    sqlite = engine_options({'SQLALCHEMY_DATABASE_URI': 'sqlite:///qa.db', 'SQLITE_BUSY_TIMEOUT': 2000})
+    assert sqlite == {'connect_args': {'timeout': 2.0}}
+    postgres = engine_options({'SQLALCHEMY_DATABASE_URI': 'postgresql://host/qa', 'DB_POOL_SIZE': 3,
+                               'SQLALCHEMY_ENGINE_OPTIONS': {'pool_recycle': 60}})
+    assert postgres['pool_size'] == 3
+    assert postgres['pool_recycle'] == 60
+    assert postgres['pool_pre_ping'] is True
+
+def test_engine_is_tuned_for_the_backend(app):
+    with db.engine.connect() as connection:
+        if connection.dialect.name == 'sqlite':
+            assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert connection.execute(text('PRAGMA synchronous')).scalar() == 1
+            assert connection.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+        else:
+            assert db.engine.pool.size() == 10
+            assert db.engine.pool._pre_ping
+
+def test_project_round_trip(admin_client):
+    response = admin_client.post('/projects/create', data={
+        'gsf_code': 'GSF-1', 'invgate_code': 'INV-1', 'name': 'Proyecto de prueba',
+        'priority': 'Alta', 'status': 'Pendiente',
+    })
+    assert response.status_code == 302
+    items = admin_client.get('/api/v1/projects').json['items']
+    assert [item['name'] for item in items] == ['Proyecto de prueba']
+    assert admin_client.get('/api/v1/projects/search?q=prueba').json['items'][0]['gsf_code'] == 'GSF-1'
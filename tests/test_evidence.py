@@ -0,0 +1,86 @@
+import html
+import json
+import os
+import time
+from app import db
+from app.models import Evidence
+from app.storage import blob_store
+from tests.test_history import create_project
+
+def upload(client, project_id, data, filename='evidencia.txt'):
+    return client.post(f'/projects/{project_id}/evidence?filename={filename}', data=data,
+                       content_type='application/octet-stream')
+
+def age(path, seconds=3600):
+    old = time.time() - seconds
+    os.utime(path, (old, old))
+
+def test_filename_is_escaped_in_delete_confirmation(admin_client):
+    project_id = create_project(admin_client)
+    filename = "x');alert(document.cookie);('.txt"
+    response = admin_client.post(f'/projects/{project_id}/evidence?filename={filename}', data=b'contenido',
+                                 content_type='application/octet-stream')
+    assert response.status_code == 201
+
+    page = admin_client.get(f'/projects/{project_id}').get_data(as_text=True)
+    handler = next(line for line in page.splitlines() if 'onsubmit="return confirm(' in line)
+    assert "');alert(" not in handler
+    script = html.unescape(handler.split('onsubmit="', 1)[1].split('"', 1)[0])
+    assert script.startswith('return confirm(') and script.endswith(')')
+    assert json.loads(script[len('return confirm('):-1]) == f'¿Eliminar la evidencia {filename}?'
+
+def test_sweep_removes_only_unreferenced_blobs(app, admin_client):
+    project_id = create_project(admin_client)
+    kept = upload(admin_client, project_id, b'se queda').json['sha256']
+    dropped = upload(admin_client, project_id, b'se borra').json['sha256']
+    evidence = Evidence.query.filter_by(content_hash=dropped).one()
+    assert admin_client.post(f'/projects/{project_id}/evidence/{evidence.id}/delete').status_code == 302
+    # Dentro del período de gracia release() no lo borra
+    assert blob_store.exists(dropped)
+
+    stale_tmp = os.path.join(blob_store.root, 'tmp', 'subida-interrumpida')
+    open(stale_tmp, 'wb').close()
+    for path in (blob_store.path(kept), blob_store.path(dropped)):
+        age(path)
+    age(stale_tmp, 2 * 24 * 3600)
+    assert blob_store.sweep() == 2
+    assert blob_store.exists(kept) and not blob_store.exists(dropped) and not os.path.exists(stale_tmp)
+
+def test_sweep_keeps_blobs_reused_after_the_check(app, admin_client):
+    project_id = create_project(admin_client)
+    content_hash = upload(admin_client, project_id, b'compartido').json['sha256']
+    Evidence.query.delete()
+    db.session.commit()
+    age(blob_store.path(content_hash))
+
+    # Otra subida del mismo contenido llega justo después de que el barrido lo aparta
+    checked, calls = blob_store._referenced, []
+    def reupload_during_sweep(content_hashes):
+        calls.append(content_hashes)
+        if len(calls) == 2:
+            assert upload(admin_client, project_id, b'compartido').json['deduplicated'] is False
+        return checked(content_hashes)
+    blob_store._referenced = reupload_during_sweep
+    try:
+        assert blob_store.sweep() == 0
+    finally:
+        del blob_store._referenced
+    assert len(calls) == 2 and blob_store.exists(content_hash)
+    assert Evidence.query.filter_by(content_hash=content_hash).count() == 1
+
+def test_quota_counts_only_new_content(app, admin_client):
+    project_id = create_project(admin_client)
+    app.config['EVIDENCE_PROJECT_QUOTA'] = 20
+    stored = upload(admin_client, project_id, b'0123456789ab')
+    assert stored.status_code == 201
+
+    # Quedan 8 bytes: un contenido nuevo más grande no entra aunque no llegue a la cuota
+    assert upload(admin_client, project_id, b'contenido nuevo').status_code == 413
+    assert upload(admin_client, project_id, b'corto').status_code == 201
+
+    # Repetir una evidencia del proyecto no ocupa espacio, aunque ahora supere la cuota
+    app.config['EVIDENCE_PROJECT_QUOTA'] = 5
+    again = upload(admin_client, project_id, b'0123456789ab', filename='copia.txt')
+    assert again.status_code == 201
+    assert again.json['sha256'] == stored.json['sha256'] and again.json['deduplicated']
+    assert upload(admin_client, project_id, b'0123456789abcdef').status_code == 413
@@ -0,0 +1,63 @@
+from datetime import datetime
+from app import db
+from app.history import as_of_cache, project_snapshotter
+from app.models import Log, Project, ProjectSnapshot
+
+def create_project(client, **values):
+    data = dict({'gsf_code': 'GSF-1', 'invgate_code': 'INV-1', 'name': 'Proyecto', 'priority': 'Alta',
+                 'status': 'Pendiente', 'test_cases': '10', 'executed_cases': '0'}, **values)
+    assert client.post('/projects/create', data=data).status_code == 302
+    return db.session.query(Project.id).filter_by(gsf_code=data['gsf_code']).scalar()
+
+def backdate(project_id, when):
+    db.session.query(Project).filter_by(id=project_id).update({'created_at': when})
+    db.session.query(Log).filter_by(project_id=project_id).update({'changed_at': when})
+    db.session.commit()
+
+def state(client, at, project_id):
+    items = client.get(f'/api/v1/projects/as-of?at={at}').json['items']
+    return next((item for item in items if item['id'] == project_id), None)
+
+def test_edit_of_cases_is_reverted_for_past_dates(admin_client):
+    project_id = create_project(admin_client)
+    backdate(project_id, datetime(2020, 1, 1))
+    response = admin_client.patch(f'/api/v1/projects/{project_id}', json={'test_cases': 50, 'executed_cases': 40})
+    assert response.status_code == 200
+
+    past = state(admin_client, '2021-01-01', project_id)
+    assert (past['test_cases'], past['executed_cases']) == (10, 0)
+    today = state(admin_client, datetime.utcnow().date().isoformat(), project_id)
+    assert (today['test_cases'], today['executed_cases']) == (50, 40)
+    assert state(admin_client, '2019-12-31', project_id) is None
+
+def test_state_is_the_same_with_and_without_snapshots(admin_client):
+    project_id = create_project(admin_client)
+    backdate(project_id, datetime(2020, 1, 1))
+    assert project_snapshotter.run() == 1
+    admin_client.patch(f'/api/v1/projects/{project_id}/progress', json={'progress': 30, 'status': 'En Progreso'})
+    admin_client.patch(f'/api/v1/projects/{project_id}', json={'name': 'Renombrado', 'test_cases': 20})
+
+    today = datetime.utcnow().date().isoformat()
+    with_snapshots = [state(admin_client, at, project_id) for at in ('2021-01-01', today)]
+    assert with_snapshots[0]['name'] == 'Proyecto' and with_snapshots[0]['progress'] == 0
+    assert (with_snapshots[1]['name'], with_snapshots[1]['progress'], with_snapshots[1]['test_cases']) == \
+        ('Renombrado', 30, 20)
+
+    db.session.query(ProjectSnapshot).delete()
+    db.session.commit()
+    as_of_cache.clear()
+    assert [state(admin_client, at, project_id) for at in ('2021-01-01', today)] == with_snapshots
+
+def test_cached_states_are_paged_and_invalidated(admin_client):
+    ids = [create_project(admin_client, gsf_code=f'GSF-{number}') for number in range(5)]
+    today = datetime.utcnow().date().isoformat()
+    first = admin_client.get(f'/api/v1/projects/as-of?at={today}&limit=2').json
+    second = admin_client.get(f'/api/v1/projects/as-of?at={today}&limit=2&offset=2').json
+    assert [item['id'] for item in first['items'] + second['items']] == ids[:4]
+    assert (first['total'], first['summary'], second['next_offset']) == (5, {'Pendiente': 5}, 4)
+    assert len(as_of_cache._entries) == 1
+
+    admin_client.patch(f'/api/v1/projects/{ids[0]}/progress', json={'progress': 50, 'status': 'En Progreso'})
+    changed = admin_client.get(f'/api/v1/projects/as-of?at={today}&status=En Progreso').json
+    assert [item['id'] for item in changed['items']] == [ids[0]]
+    assert changed['summary'] == {'Pendiente': 4, 'En Progreso': 1}
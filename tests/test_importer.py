@@ -0,0 +1,14 @@
+from app.importer import ProjectImporter
+from app.models import Project, User
+
+def test_out_of_range_numbers_are_row_errors(app):
+    admin_id = User.query.filter_by(username='admin').one().id
+    base = {'gsf_code': 'GSF', 'invgate_code': 'INV', 'name': 'Proyecto'}
+    rows = [(2, dict(base, test_cases='inf')), (3, dict(base, estimated_hours='1e400')),
+            (4, dict(base, test_cases='99999999999')), (5, dict(base, estimated_hours='-3000000000')),
+            (6, dict(base, test_cases='12', executed_cases='3.0'))]
+    result = ProjectImporter(admin_id, batch_size=2).run(rows)
+    assert result.errors == [(2, 'Casos de prueba debe ser un número'), (3, 'Horas estimadas debe ser un número'),
+                             (4, 'Casos de prueba está fuera de rango'), (5, 'Horas estimadas está fuera de rango')]
+    assert result.created == 1
+    assert Project.query.filter_by(gsf_code='GSF').one().executed_cases == 3
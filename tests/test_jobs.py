@@ -0,0 +1,34 @@
+import threading
+from app import create_app
+from app.utils.jobs import PeriodicJob
+
+def test_create_app_has_no_side_effects(tmp_path):
+    threads = threading.active_count()
+    create_app(instance_path=str(tmp_path / 'instance'), test_config={
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "qa.db"}',
+        'METRICS_ENABLED': True,
+        'METRICS_DIR': str(tmp_path / 'metrics'),
+        'EVIDENCE_STORAGE_DIR': str(tmp_path / 'evidence'),
+        'SNAPSHOT_INTERVAL': 60,
+        'LOG_ARCHIVE_INTERVAL': 60,
+        'STATS_RECONCILE_INTERVAL': 60,
+    })
+    assert threading.active_count() == threads
+    assert not any((tmp_path / name).exists() for name in ('metrics', 'evidence', 'instance'))
+
+def test_job_starts_with_the_first_request_and_runs_once_per_interval(app):
+    runs = []
+    workers = [PeriodicJob('prueba', lambda app: runs.append(1)) for _ in range(2)]
+    for job in workers:
+        job.init_app(app, 60)
+    assert all(job._timer is None for job in workers)
+
+    app.test_client().get('/login')
+    assert all(job._timer is not None for job in workers)
+    # Dos workers con la misma carpeta instance: solo uno ejecuta la tarea en el intervalo
+    with app.app_context():
+        claimed = [job._claim(app) for job in workers]
+    assert claimed == [True, False]
+    for job in workers:
+        job.init_app(app, 0)
+    assert all(job._timer is None for job in workers)
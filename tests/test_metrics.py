@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+from app import db
+from app.metrics import AGGREGATE_FILE, DEFAULT_BUCKETS, MetricsRegistry, _FileStore, http_latency
+
+def test_exposition_requires_token_outside_debug(app):
+    client = app.test_client()
+    app.testing = False
+    assert client.get('/metrics').status_code == 403
+
+    app.config['METRICS_TOKEN'] = 'secreto'
+    assert client.get('/metrics').status_code == 401
+    response = client.get('/metrics', headers={'Authorization': 'Bearer secreto'})
+    assert response.status_code == 200 and '# TYPE qa_http_requests_total counter' in response.get_data(as_text=True)
+
+def test_exposition_without_token_in_debug_is_local_only(app):
+    client = app.test_client()
+    app.debug = True
+    assert client.get('/metrics').status_code == 200
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '10.0.0.8'}).status_code == 403
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+def test_counters_of_dead_processes_are_merged(app, tmp_path):
+    tmp_path = tmp_path / 'metrics'
+    tmp_path.mkdir()
+    key = ('qa_prueba_total', (('result', 'ok'),))
+    for pid in (dead_pid(), dead_pid()):
+        store = _FileStore(str(tmp_path / f'counter_{pid}.db'))
+        store.add(key, 2)
+        store.close()
+        _FileStore(str(tmp_path / f'gauge_{pid}.db')).close()
+
+    registry = MetricsRegistry()
+    counter = registry.counter('qa_prueba_total', 'Prueba', ('result',))
+    app.config.update(METRICS_DIR=str(tmp_path), METRICS_ENABLED=True, METRICS_LATENCY_BUCKETS=(0.1, 1.0))
+    registry.init_app(app, db)
+    counter.inc(result='ok')
+    assert set(os.listdir(tmp_path)) == {AGGREGATE_FILE, f'counter_{os.getpid()}.db',
+                                         f'gauge_{os.getpid()}.db', 'merge.lock'}
+    assert registry.collect()['counter'][key] == 5.0
+    assert registry.histogram('qa_prueba_seconds', 'Prueba').buckets == (0.1, 1.0)
+
+    # Otra app del mismo proceso no cambia la carpeta ni los buckets
+    app.config.update(METRICS_DIR=str(tmp_path / 'otra'), METRICS_LATENCY_BUCKETS=(5.0,))
+    registry.init_app(app, db)
+    assert registry.directory == str(tmp_path) and registry.buckets == (0.1, 1.0)
+    assert http_latency.buckets == DEFAULT_BUCKETS
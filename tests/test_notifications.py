@@ -0,0 +1,12 @@
+def test_unread_count_is_polled_by_default(app, admin_client):
+    page = admin_client.get('/notifications').get_data(as_text=True)
+    assert '/notifications/unread-count' in page and 'EventSource' not in page
+    assert admin_client.get('/notifications/stream').status_code == 404
+
+def test_stream_is_opt_in(app, admin_client):
+    app.config['NOTIFICATIONS_STREAM'] = True
+    app.config['NOTIFICATIONS_STREAM_TIMEOUT'] = 0
+    assert 'EventSource' in admin_client.get('/notifications').get_data(as_text=True)
+    response = admin_client.get('/notifications/stream')
+    assert response.mimetype == 'text/event-stream'
+    assert 'event: unread\ndata: 0' in response.get_data(as_text=True)
@@ -0,0 +1,85 @@
+import pytest
+from app import db
+from app.models import User, Project, ProjectAnalyst
+from app.profiler import profiler, QueryBudgetExceeded
+
+def add_user(username, role):
+    user = User(username=username, email=f'{username}@example.com', role=role, is_active=True)
+    user.set_password('secret123')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def login(app, username, password='secret123'):
+    client = app.test_client()
+    assert client.post('/login', data={'username': username, 'password': password}).status_code == 302
+    return client
+
+def add_projects(count, supervisor_id, analyst_id):
+    start = db.session.query(Project).count()
+    projects = [Project(gsf_code=f'GSF-{number}', invgate_code=f'INV-{number}', name=f'Proyecto {number}',
+                        status='Pendiente', progress=number % 101, created_by_id=supervisor_id)
+                for number in range(start, start + count)]
+    db.session.add_all(projects)
+    db.session.flush()
+    assignments = [ProjectAnalyst(project_id=project.id, analyst_id=analyst_id) for project in projects]
+    db.session.add_all(assignments)
+    db.session.commit()
+    # Las peticiones comparten la sesión del test: con los objetos en ella, las relaciones no consultarían
+    for instance in projects + assignments:
+        db.session.expunge(instance)
+
+def test_hot_endpoints_stay_within_budget(app, admin_client):
+    supervisor, analyst = add_user('supervisor', 'Supervisor'), add_user('analista', 'Analista')
+    add_projects(3, supervisor.id, analyst.id)
+    profiler.reset()
+    project_id = db.session.query(Project.id).filter_by(gsf_code='GSF-0').scalar()
+    requests = {
+        admin_client: ['/projects', '/admin/dashboard', f'/projects/{project_id}',
+                       f'/projects/{project_id}/update-progress'],
+        login(app, 'supervisor'): ['/projects', '/supervisor/dashboard', f'/projects/{project_id}'],
+        login(app, 'analista'): ['/projects', '/analyst/dashboard', f'/projects/{project_id}'],
+    }
+    for client, urls in requests.items():
+        for url in urls:
+            assert client.get(url).status_code == 200, url
+    response = admin_client.post(f'/projects/{project_id}/update-progress',
+                                 data={'progress': '50', 'status': 'En Progreso'})
+    assert response.status_code == 302
+
+    stats = dict(profiler.snapshot())
+    for endpoint, budget in app.config['QUERY_BUDGETS'].items():
+        assert stats[endpoint]['requests'] > 0, endpoint
+        assert stats[endpoint]['max_queries'] <= budget, endpoint
+
+def test_request_over_budget_fails(admin_client):
+    profiler.reset()
+    profiler.budgets['projects.projects_list'] = 1
+    with pytest.raises(QueryBudgetExceeded, match='projects.projects_list'):
+        admin_client.get('/projects')
+    assert dict(profiler.snapshot())['projects.projects_list']['over_budget'] == 1
+
+def test_query_count_does_not_grow_with_projects(app, admin_client):
+    # Sin el corte de la paginación, una consulta por fila se notaría en la cuenta
+    app.config.update(PROJECTS_PER_PAGE=1000, DASHBOARD_LIST_LIMIT=1000)
+    supervisor_id, analyst_id = add_user('supervisor', 'Supervisor').id, add_user('analista', 'Analista').id
+    clients = {'admin': admin_client, 'supervisor': login(app, 'supervisor'), 'analista': login(app, 'analista')}
+    requests = [('admin', '/projects'), ('admin', '/admin/dashboard'),
+                ('supervisor', '/projects'), ('supervisor', '/supervisor/dashboard'),
+                ('analista', '/projects'), ('analista', '/analyst/dashboard')]
+
+    def query_counts():
+        counts = {}
+        for username, url in requests:
+            profiler.reset()
+            assert clients[username].get(url).status_code == 200, url
+            [(endpoint, stats)] = profiler.snapshot()
+            counts[(username, endpoint)] = stats['max_queries']
+        return counts
+
+    # Primera pasada sin proyectos para calentar las cachés de catálogos y usuarios
+    query_counts()
+    add_projects(30, supervisor_id, analyst_id)
+    few = query_counts()
+    add_projects(270, supervisor_id, analyst_id)
+    assert query_counts() == few
@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import inspect, text
+from app import db
+from app.migrations import create_missing_indexes, explain_hot_queries, upgrade
+
+# Índice que debe usar cada consulta crítica (o cualquiera de una tupla)
+EXPECTED_INDEXES = {
+    'Dashboard de analista': 'ix_project_analyst_analyst',
+    'Permiso de analista': ('ix_project_analyst_analyst', 'ix_project_analyst_project'),
+    'Proyectos de supervisor': 'ix_project_created_by_updated',
+    'Historial del proyecto': 'ix_log_project_changed',
+    'Historial archivado': 'ix_log_archive_project_last',
+    'Foto anterior a una fecha': 'ix_project_snapshot_project_end',
+    'Catálogo activo': 'ix_catalog_name_active',
+    'Estado en uso': 'ix_project_status',
+    'Prioridad en uso': 'ix_project_priority',
+    'Listado por fecha fin': 'ix_project_end_date',
+    'Contador pendiente': 'ix_dashboard_stat_delta_key',
+}
+
+def uses(name, lines):
+    expected = EXPECTED_INDEXES[name]
+    return any(index in line for index in ((expected,) if isinstance(expected, str) else expected) for line in lines)
+
+def plans():
+    if db.engine.dialect.name == 'postgresql':
+        # Con tablas vacías el planificador prefiere recorrerlas; así se verifica que existe un camino por índice
+        db.session.execute(text('SET enable_seqscan = off'))
+    return {name: (lines, uses_index) for name, lines, uses_index in explain_hot_queries()}
+
+def test_every_hot_query_is_checked(app):
+    assert set(plans()) == set(EXPECTED_INDEXES)
+
+@pytest.mark.parametrize('name', sorted(EXPECTED_INDEXES))
+def test_hot_query_uses_its_index(app, name):
+    lines, uses_index = plans()[name]
+    assert uses_index, lines
+    assert uses(name, lines), lines
+
+def test_migration_restores_missing_index(app, database_url):
+    if not database_url.startswith('sqlite'):
+        pytest.skip('EXPLAIN QUERY PLAN es de SQLite')
+    with db.engine.begin() as connection:
+        connection.execute(text('DROP INDEX ix_project_analyst_analyst'))
+        connection.execute(text('DROP INDEX ix_project_created_by_updated'))
+    before = plans()
+    db.session.rollback()
+    for name in ('Dashboard de analista', 'Proyectos de supervisor'):
+        assert not uses(name, before[name][0])
+
+    with db.engine.begin() as connection:
+        create_missing_indexes(connection)
+    after = plans()
+    for name in ('Dashboard de analista', 'Proyectos de supervisor'):
+        assert uses(name, after[name][0])
+
+def test_upgrade_is_idempotent(app):
+    assert upgrade() == []
+    indexes = {index['name'] for index in inspect(db.engine).get_indexes('project')}
+    assert {'ix_project_created_by_updated', 'ix_project_status', 'ix_project_priority'} <= indexes
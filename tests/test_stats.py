@@ -0,0 +1,52 @@
+import threading
+from app import db, stats
+from app.models import DashboardStat, DashboardStatDelta, Project
+from app.stats import fold_deltas, get_stats, get_stats_with_prefix, reconcile_stats
+from tests.test_history import create_project
+
+def test_pending_deltas_are_counted_and_folded(admin_client):
+    for number in range(3):
+        create_project(admin_client, gsf_code=f'GSF-{number}')
+    # Las escrituras no tocan dashboard_stat
+    assert db.session.get(DashboardStat, 'projects:total') is None
+    assert DashboardStatDelta.query.count() > 0
+    before = (get_stats(['projects:total', 'creator:1']), get_stats_with_prefix('projects:status:'))
+    assert before[0]['projects:total'] == (3, 0) and before[1] == {'Pendiente': (3, 0)}
+
+    with db.engine.begin() as connection:
+        assert fold_deltas(connection) > 0
+    db.session.commit()
+    assert DashboardStatDelta.query.count() == 0
+    assert (get_stats(['projects:total', 'creator:1']), get_stats_with_prefix('projects:status:')) == before
+
+    admin_client.patch('/api/v1/projects/1/progress', json={'progress': 100, 'status': 'Completado'})
+    with db.engine.begin() as connection:
+        assert reconcile_stats(connection) == []
+    assert get_stats_with_prefix('projects:status:') == {'Pendiente': (2, 0), 'Completado': (1, 100)}
+
+def test_reconcile_holds_back_writers(app, admin_client, monkeypatch):
+    create_project(admin_client, gsf_code='GSF-0')
+
+    def add_project():
+        with app.app_context():
+            db.session.add(Project(gsf_code='GSF-1', invgate_code='INV-1', name='Concurrente',
+                                   status='Pendiente', created_by_id=1))
+            db.session.commit()
+
+    # Otro proceso crea un proyecto entre fold_deltas() y el recálculo
+    writer = threading.Thread(target=add_project)
+    compute = stats.compute_stats
+    def compute_after_write(connection):
+        writer.start()
+        writer.join(0.5)
+        assert writer.is_alive()
+        return compute(connection)
+    monkeypatch.setattr(stats, 'compute_stats', compute_after_write)
+    with db.engine.begin() as connection:
+        reconcile_stats(connection)
+    writer.join()
+
+    monkeypatch.setattr(stats, 'compute_stats', compute)
+    assert get_stats(['projects:total'])['projects:total'] == (2, 0)
+    with db.engine.begin() as connection:
+        assert reconcile_stats(connection) == []